@@ -0,0 +1,257 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+
+class TransportCore:
+    """
+    Общий цикл asyncio для всех источников данных.
+    Один поток обслуживает дескрипторы всех COM-портов и UDP сокетов: данные передаются
+    получателю сразу по готовности дескриптора, без опроса с таймаутом, а закрытие
+    источника не ждет завершения отдельного потока чтения.
+    """
+
+    def __init__(self):
+        """Инициализация объекта TransportCore."""
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Запускает поток цикла событий, если он еще не запущен."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def stop(self):
+        """Останавливает цикл событий. Открытые источники должны быть закрыты заранее."""
+        with self._lock:
+            if not self._thread:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if not self.in_loop_thread():
+                self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def in_loop_thread(self) -> bool:
+        """Проверяет, выполняется ли вызов в потоке цикла событий."""
+        return bool(self._thread) and threading.get_ident() == self._thread.ident
+
+    def call(self, func, *args):
+        """
+        Выполняет функцию в потоке цикла событий и возвращает ее результат.
+        Из самого потока цикла функция вызывается сразу.
+        """
+        if self.in_loop_thread():
+            return func(*args)
+        self.start()
+        future = concurrent.futures.Future()
+
+        def run():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(run)
+        return future.result()
+
+    def open_serial(self, ser, on_data, on_error, ring=None) -> "SerialChannel":
+        """
+        Подключает открытый порт pyserial к циклу событий.
+        :param ser: Открытый объект serial.Serial.
+        :param on_data: Callback, получающий очередную порцию данных (bytes).
+        :param on_error: Callback, получающий текст ошибки; после ошибки чтение прекращается.
+        :param ring: Кольцевой буфер (RingBuffer), в память которого порт читается напрямую,
+                     без промежуточных объектов; on_data в этом случае не вызывается.
+        :return: Канал, закрываемый методом close.
+        """
+        channel = SerialChannel(self, ser, on_data, on_error, ring)
+        self.call(channel.attach)
+        return channel
+
+    def open_udp(self, sock, on_data, on_error) -> "UDPChannel":
+        """
+        Подключает привязанный неблокирующий UDP сокет к циклу событий.
+        :param sock: Сокет, уже настроенный и привязанный к адресу.
+        :param on_data: Callback, получающий очередную датаграмму (bytes).
+        :param on_error: Callback, получающий текст ошибки.
+        :return: Канал, закрываемый методом close.
+        :raises RuntimeError: Если вызван из потока цикла событий.
+        """
+        if self.in_loop_thread():
+            raise RuntimeError("Открытие UDP канала из потока цикла событий не поддерживается")
+        self.start()
+        channel = UDPChannel(self, on_data, on_error)
+        coro = self._loop.create_datagram_endpoint(lambda: channel, sock=sock)
+        asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+        return channel
+
+    @property
+    def loop(self):
+        """Цикл событий ядра."""
+        return self._loop
+
+    def _run_loop(self, ready):
+        """Цикл событий в отдельном потоке."""
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+
+class SerialChannel:
+    """
+    Чтение COM-порта в цикле событий.
+    На POSIX дескриптор порта регистрируется в цикле через add_reader. Там, где у цикла
+    нет чтения дескрипторов (Windows), порт читается блокирующим вызовом в пуле потоков.
+    Если задан кольцевой буфер, данные читаются прямо в его память, иначе передаются в on_data.
+    """
+
+    # Максимальный размер порции, читаемой за одно событие
+    READ_SIZE = 65536
+
+    def __init__(self, core: TransportCore, ser, on_data, on_error, ring=None):
+        """Инициализация объекта SerialChannel."""
+        self._core = core
+        self._ser = ser
+        self._on_data = on_data
+        self._on_error = on_error
+        # Кольцевой буфер, в который данные читаются без промежуточных объектов
+        self._ring = ring
+        self._fd = None
+        self._closed = threading.Event()
+
+    def attach(self):
+        """Регистрирует порт в цикле событий. Вызывается в потоке цикла."""
+        loop = self._core.loop
+        fd = getattr(self._ser, "fd", None)
+        if fd is not None and os.name == "posix":
+            try:
+                loop.add_reader(fd, self._on_readable)
+                self._fd = fd
+                return
+            except NotImplementedError:
+                pass
+        loop.run_in_executor(None, self._read_blocking)
+
+    def close(self):
+        """Прекращает чтение порта. Порт закрывает его владелец."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._fd is not None:
+            self._core.call(self._detach)
+        else:
+            # Прерываем ожидание блокирующего чтения
+            cancel_read = getattr(self._ser, "cancel_read", None)
+            if cancel_read:
+                try:
+                    cancel_read()
+                except Exception:
+                    pass
+
+    def _detach(self):
+        """Снимает дескриптор с цикла событий."""
+        if self._fd is not None:
+            self._core.loop.remove_reader(self._fd)
+            self._fd = None
+
+    def _on_readable(self):
+        """Читает доступные данные по готовности дескриптора."""
+        try:
+            if self._ring is not None:
+                # Данные читаются прямо в свободную часть кольцевого буфера
+                self._ring.write_from(self._read_fd_into)
+                return
+            data = os.read(self._fd, self.READ_SIZE)
+        except BlockingIOError:
+            return
+        except (EOFError, OSError) as e:
+            self._fail(f"Ошибка чтения данных: {e}")
+            return
+        if not data:
+            # Дескриптор готов, но данных нет: устройство отключено
+            self._fail("Ошибка чтения данных: устройство отключено или порт закрыт")
+            return
+        self._on_data(data)
+
+    def _read_fd_into(self, view) -> int:
+        """
+        Читает доступные данные дескриптора в view.
+        :raises EOFError: Если дескриптор готов, но данных нет (устройство отключено).
+        """
+        length = os.readv(self._fd, [view])
+        if not length:
+            raise EOFError("устройство отключено или порт закрыт")
+        return length
+
+    def _read_waiting_into(self, view) -> int:
+        """Читает в view уже принятые портом данные, но не меньше одного байта (pyserial readinto)."""
+        ser = self._ser
+        with view[:max(min(ser.in_waiting, len(view)), 1)] as part:
+            return ser.readinto(part)
+
+    def _read_blocking(self):
+        """Чтение порта в пуле потоков для платформ без add_reader."""
+        ser = self._ser
+        ring = self._ring
+        while not self._closed.is_set():
+            try:
+                if ring is not None:
+                    # Кольцевой буфер допускает запись из любого потока
+                    ring.write_from(self._read_waiting_into)
+                    continue
+                data = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                if not self._closed.is_set():
+                    self._core.loop.call_soon_threadsafe(self._fail, f"Ошибка чтения данных: {e}")
+                return
+            if data and not self._closed.is_set():
+                self._core.loop.call_soon_threadsafe(self._on_data, data)
+
+    def _fail(self, message: str):
+        """Прекращает чтение после ошибки и сообщает о ней."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._detach()
+        self._on_error(message)
+
+
+class UDPChannel(asyncio.DatagramProtocol):
+    """Прием датаграмм UDP сокета в цикле событий."""
+
+    def __init__(self, core: TransportCore, on_data, on_error):
+        """Инициализация объекта UDPChannel."""
+        self._core = core
+        self._on_data = on_data
+        self._on_error = on_error
+        self._transport = None
+
+    def close(self):
+        """Прекращает прием и закрывает сокет."""
+        if self._transport is not None:
+            self._core.call(self._transport.close)
+            self._transport = None
+
+    def connection_made(self, transport):
+        """Сохраняет транспорт созданного канала."""
+        self._transport = transport
+
+    def datagram_received(self, data, addr):
+        """Передает принятую датаграмму получателю."""
+        if data:
+            self._on_data(data)
+
+    def error_received(self, exc):
+        """Сообщает об ошибке сокета."""
+        self._on_error(f"Ошибка чтения UDP данных: {exc}")
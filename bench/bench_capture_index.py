@@ -0,0 +1,138 @@
+"""
+Замер открытия интервала времени в большом файле захвата: чтение по индексу и полный перебор файла.
+Файл захвата заданного размера (по умолчанию 2 ГБ) создается один раз и используется повторно.
+Для каждой из нескольких случайных минут замеряется время до первой порции минуты и до конца минуты.
+Полный перебор замеряется на том же файле с временно переименованным индексом.
+    python bench/bench_capture_index.py
+    python bench/bench_capture_index.py --size-gb 0.5 --folder /tmp/o2cap_bench --cold
+"""
+import argparse
+import datetime
+import glob
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import capture_file
+from decoded_frame import WALL_CLOCK_ANCHOR_NS
+
+# Линии захвата
+LINKS = ("rs485-0", "rs485-1")
+# Размеры порций сырых данных
+CHUNK_SIZES = (64, 200, 700, 1500, 2048)
+# Интервал между порциями, нс (около 330 порций в секунду)
+CHUNK_INTERVAL_NS = 3_000_000
+# Количество замеряемых минут
+WINDOWS = 5
+
+
+def find_capture(folder: str, size: int) -> str:
+    """Возвращает путь к уже созданному файлу захвата не меньше заданного размера или пустую строку."""
+    for path in glob.glob(os.path.join(folder, "*" + capture_file.EXTENSION)):
+        if os.path.getsize(path) >= size * 0.99:
+            return path
+    return ""
+
+
+def make_capture(folder: str, size: int) -> str:
+    """
+    Пишет файл захвата заданного размера через CaptureWriter.
+    :return: Путь к файлу захвата.
+    """
+    rnd = random.Random(1)
+    payloads = [rnd.randbytes(length) for length in CHUNK_SIZES]
+    writer = capture_file.CaptureWriter(folder, on_error=lambda message: None)
+    writer.start()
+    rx_ns = time.monotonic_ns()
+    index = 0
+    started = time.perf_counter()
+    while writer.written_bytes < size:
+        for _ in range(4096):
+            rx_ns += CHUNK_INTERVAL_NS
+            writer.write_data(LINKS[index & 1], rx_ns, payloads[index % len(payloads)])
+            index += 1
+        # Очередь записи отбрасывает порции сверх своего объема, даем потоку записи ее разобрать
+        while writer.queue.queue_bytes > writer.queue.max_bytes // 2:
+            time.sleep(0.001)
+    writer.stop()
+    if writer.queue.dropped_frames:
+        print(f"Очередь записи потеряла порций: {writer.queue.dropped_frames}")
+    print(f"Создан файл захвата {writer.current_path}: {writer.written_bytes / 1e9:.2f} ГБ "
+          f"за {time.perf_counter() - started:.1f} с")
+    return writer.current_path
+
+
+def drop_caches():
+    """Сбрасывает страничный кэш ОС (Linux, нужны права root), чтобы файл читался с диска."""
+    try:
+        subprocess.run(["sync"], check=False)
+        with open("/proc/sys/vm/drop_caches", "w") as file:
+            file.write("3\n")
+    except OSError as e:
+        print(f"Не удалось сбросить кэш: {e}")
+
+
+def open_window(path: str, minute: datetime.datetime, cold: bool) -> tuple:
+    """
+    Открывает файл и перебирает порции одной линии за минуту.
+    :return: Время до первой порции и до конца минуты в секундах, количество порций.
+    """
+    if cold:
+        drop_caches()
+    started = time.perf_counter()
+    with capture_file.CaptureReader(path) as reader:
+        start_ns = reader.time_of_day_ns(minute.strftime("%H:%M:00"))
+        chunks = reader.data_chunks(LINKS[1], start_ns, start_ns + 60 * 1_000_000_000)
+        next(chunks)
+        first_time = time.perf_counter() - started
+        count = 1 + sum(1 for _ in chunks)
+        total_time = time.perf_counter() - started
+    return first_time, total_time, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер открытия интервала времени в файле захвата")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="Размер файла захвата, ГБ")
+    parser.add_argument("--folder", default=os.path.join(tempfile.gettempdir(), "o2cap_bench"),
+                        help="Директория файла захвата")
+    parser.add_argument("--cold", action="store_true", help="Сбрасывать кэш ОС перед каждым замером")
+    args = parser.parse_args()
+
+    size = int(args.size_gb * 1e9)
+    path = find_capture(args.folder, size) or make_capture(args.folder, size)
+    index = capture_file.index_path(path)
+    print(f"Файл захвата {os.path.getsize(path) / 1e9:.2f} ГБ, индекс {os.path.getsize(index) / 1e3:.0f} КБ")
+
+    with capture_file.CaptureReader(path) as reader:
+        first_ns = reader.first_ns()
+    first = datetime.datetime.fromtimestamp((first_ns + WALL_CLOCK_ANCHOR_NS) / 1e9)
+    record_size = sum(CHUNK_SIZES) // len(CHUNK_SIZES) + capture_file.RECORD_HEADER.size
+    length_ns = size // record_size * CHUNK_INTERVAL_NS
+    minutes_total = max(int(length_ns / 60e9) - 2, 2)
+    rnd = random.Random(7)
+    minutes = [first + datetime.timedelta(minutes=rnd.randrange(1, minutes_total)) for _ in range(WINDOWS)]
+
+    results = {}
+    for label in ("по индексу", "полный перебор"):
+        if label == "полный перебор":
+            os.replace(index, index + ".off")
+        try:
+            results[label] = [open_window(path, minute, args.cold) for minute in minutes]
+        finally:
+            if label == "полный перебор":
+                os.replace(index + ".off", index)
+        firsts = ", ".join(f"{first_time * 1e3:.0f}" for first_time, _, _ in results[label])
+        totals = ", ".join(f"{total_time * 1e3:.0f}" for _, total_time, _ in results[label])
+        print(f"  {label:15}: до первой порции {firsts} мс; вся минута {totals} мс")
+    same = [count for *_, count in results["по индексу"]] == [count for *_, count in results["полный перебор"]]
+    print(f"Порции минут совпадают: {'да' if same else 'нет'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
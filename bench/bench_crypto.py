@@ -0,0 +1,114 @@
+"""
+Проверка и замер расшифровки Orion2 (AES-CFB-128).
+Orion2Cipher сверяется с векторами, полученными прежней реализацией _decrypt_aes (побайтное
+совпадение), и сравнивается с ней по времени на пакетах типичной длины.
+    python bench/bench_crypto.py
+    python bench/bench_crypto.py --write-vectors    # пересоздать векторы прежней реализацией
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Crypto.Cipher import AES
+
+from orion2_crypto import Orion2Cipher
+
+# Файл векторов: ключ, начальный вектор, шифрованные и расшифрованные данные (hex)
+VECTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "orion2_crypto_vectors.json")
+# Длины данных замера: служебный пакет и пакет данных
+BENCH_LENGTHS = (20, 60)
+
+
+def legacy_decrypt_aes(init_vector_str, key_str, data_str):
+    """Прежняя расшифровка DataProcessing._decrypt_aes (строки hex на входе, список байт на выходе)."""
+    key = bytes.fromhex(key_str)
+    init_vector = bytes.fromhex(init_vector_str)
+    cipher = AES.new(key, AES.MODE_ECB)
+    encrypted_data = cipher.encrypt(init_vector)
+    first_vector = True
+    xor_result = ""
+    old_data = ""
+    decoded = []
+    while len(data_str) > 0:
+        data = bytes.fromhex(data_str[:32])
+        data_str = data_str[32:]
+        if not first_vector:
+            encrypted_data = cipher.encrypt(old_data)
+
+        def xor_bytes(a, b):
+            return bytes(x ^ y for x, y in zip(a, b))
+
+        if len(encrypted_data) == 16:
+            xor_result = xor_bytes(encrypted_data[:16], data) + encrypted_data[16:]
+        decoded += xor_result
+        old_data = data
+        first_vector = False
+    return decoded
+
+
+def write_vectors(count: int = 130, seed: int = 4):
+    """Создает векторы прежней реализацией: все длины до 64 байт и случайные до 255 байт."""
+    rnd = random.Random(seed)
+    lengths = list(range(65)) + [rnd.randrange(65, 256) for _ in range(count - 65)]
+    vectors = []
+    for length in lengths:
+        key = rnd.randbytes(16)
+        init_vector = rnd.randbytes(16)
+        data = rnd.randbytes(length)
+        plain = bytes(legacy_decrypt_aes(init_vector.hex(), key.hex(), data.hex()))
+        vectors.append({"key": key.hex(), "iv": init_vector.hex(), "data": data.hex(), "plain": plain.hex()})
+    with open(VECTORS_PATH, "w", encoding="utf-8") as file:
+        json.dump(vectors, file, indent=0)
+    print(f"Записано векторов: {len(vectors)} в {VECTORS_PATH}")
+
+
+def check_vectors() -> bool:
+    """Сверяет Orion2Cipher с векторами прежней реализации."""
+    with open(VECTORS_PATH, encoding="utf-8") as file:
+        vectors = json.load(file)
+    cipher = Orion2Cipher()
+    failed = 0
+    for vector in vectors:
+        plain = cipher.decrypt(bytes.fromhex(vector["key"]), bytes.fromhex(vector["iv"]),
+                               bytes.fromhex(vector["data"]))
+        if plain != bytes.fromhex(vector["plain"]):
+            failed += 1
+            print(f"Расхождение: длина {len(vector['data']) // 2}, ключ {vector['key']}")
+    print(f"Векторов: {len(vectors)}, расхождений: {failed}")
+    return not failed
+
+
+def bench():
+    """Время расшифровки одного пакета прежней реализацией и Orion2Cipher."""
+    rnd = random.Random(5)
+    key = rnd.randbytes(16)
+    init_vector = rnd.randbytes(16)
+    cipher = Orion2Cipher()
+    for length in BENCH_LENGTHS:
+        data = rnd.randbytes(length)
+        key_str, iv_str, data_str = key.hex(), init_vector.hex(), data.hex()
+        cases = (
+            ("прежняя _decrypt_aes", lambda: legacy_decrypt_aes(iv_str, key_str, data_str)),
+            ("Orion2Cipher", lambda: cipher.decrypt(key, init_vector, data)),
+        )
+        for label, function in cases:
+            number = 20000
+            best = min(timeit.repeat(function, number=number, repeat=3)) / number
+            print(f"{length:3} байт, {label:20}: {best * 1e6:6.2f} мкс")
+
+
+def main():
+    if "--write-vectors" in sys.argv[1:]:
+        write_vectors()
+        return 0
+    ok = check_vectors()
+    bench()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Замер сборки пакетов Orion2 из порций чтения порта: прежняя склейка bytes с поиском маркера
+от начала буфера и Orion2Framer. Пакеты в секунду сравниваются с потоком линии 115200 бод.
+    python bench/bench_framer.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orion2_framer import Orion2Framer
+import orion2_stream
+
+# Размеры порций чтения порта
+CHUNK_SIZES = (1, 16, 4096)
+
+
+class LegacyAssembler:
+    """
+    Прежний разбор: дописывание порции к bytes, поиск следующего маркера от начала буфера
+    и восстановление подмененных байт целого пакета. Порция передается вызовом, как и в Orion2Framer.
+    """
+
+    def __init__(self):
+        self._data = b""
+
+    def feed(self, chunk) -> list:
+        data_bytes = self._data + chunk
+        frames = []
+        while True:
+            end = data_bytes.find(b"\xFF", 2)
+            if end == -1:
+                break
+            frames.append(data_bytes[:end].replace(b"\xFE\x01", b"\xFF").replace(b"\xFE\x02", b"\xFE"))
+            data_bytes = data_bytes[end:]
+        self._data = data_bytes
+        return frames
+
+
+def legacy_frames(chunks) -> int:
+    """Прежний разбор."""
+    assembler = LegacyAssembler()
+    count = 0
+    for chunk, _ in chunks:
+        count += len(assembler.feed(chunk))
+    return count
+
+
+def framer_frames(chunks) -> int:
+    """Разбор Orion2Framer с отметками приема, как их передает обработка данных."""
+    framer = Orion2Framer()
+    count = 0
+    for chunk, marks in chunks:
+        count += len(framer.feed(chunk, 0, None, marks))
+    return count
+
+
+def measure(functions, chunks, rounds: int = 9) -> list:
+    """
+    Замеряет функции разбора поочередно, чтобы колебания нагрузки машины влияли на них одинаково.
+    :return: Список (количество пакетов, лучшее время разбора в секундах) в порядке функций.
+    """
+    results = [(0, None)] * len(functions)
+    for _ in range(rounds):
+        for index, function in enumerate(functions):
+            started = time.perf_counter()
+            count = function(chunks)
+            elapsed = time.perf_counter() - started
+            best = results[index][1]
+            results[index] = (count, elapsed if best is None else min(best, elapsed))
+    return results
+
+
+def with_marks(chunks) -> list:
+    """Снабжает порции отметкой приема, как их кладет в очередь поток чтения порта."""
+    rx_ns = time.monotonic_ns()
+    return [(chunk, [(0, rx_ns + index)]) for index, chunk in enumerate(chunks)]
+
+
+def main():
+    line_rate = orion2_stream.line_bytes_per_second()
+    streams = {
+        "короткие пакеты": orion2_stream.make_stream(orion2_stream.make_frames(3000)),
+        "пакеты до 255 байт": orion2_stream.make_stream(orion2_stream.make_frames(3000, 4, 254)),
+        "пакеты 64 КБ": orion2_stream.make_stream(orion2_stream.make_frames(4, 65536, 65537)),
+    }
+    for name, stream in streams.items():
+        frames_per_byte = stream.count(b"\xFF") / len(stream)
+        print(f"{name}: {len(stream)} байт, на линии {orion2_stream.BAUDRATE} бод: "
+              f"{line_rate * frames_per_byte:.1f} пакетов/с")
+        for size in CHUNK_SIZES:
+            chunks = with_marks(orion2_stream.split_chunks(stream, size))
+            results = measure((legacy_frames, framer_frames), chunks)
+            for label, (count, elapsed) in zip(("прежний", "Orion2Framer"), results):
+                print(f"  порция {size:5} байт, {label:12}: {count / elapsed:12.0f} пакетов/с, "
+                      f"{len(stream) / elapsed / line_rate:8.1f} x скорости линии")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Замер задержки от записи последнего байта пачки в порт до вывода строки (update_data_area).
+Порт эмулируется псевдотерминалом, поэтому замер работает только на POSIX.
+Пакет выдается по паузе на линии (Orion2Framer.idle_timeout), для сравнения - без сброса по паузе,
+как до его появления: последний пакет пачки ждет маркер следующего.
+    python bench/bench_idle_flush.py
+    python bench/bench_idle_flush.py --count 100 --baud 1200 115200
+"""
+import argparse
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing import DataProcessing
+from orion2_framer import Orion2Framer
+from ring_buffer import RingBuffer
+from serial_port import SerialPort
+
+# Пакет Orion2 без подмененных байт: маркер, адрес, длина и данные
+FRAME = bytes([0xFF, 0x03, 0x05, 0x01, 0x02, 0x03])
+# Сколько ждать вывода строки, секунд
+SHOW_TIMEOUT = 1.0
+# Пауза между пачками, секунд
+BURST_INTERVAL = 0.05
+# Пауза на линии в режиме без сброса: дольше ожидания вывода строки
+NO_FLUSH_TIMEOUT = 10.0
+
+
+class Value:
+    """Значение с методом get, как у переменных tkinter."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class MeasureGui:
+    """Интерфейс, отмечающий время вывода строки."""
+
+    def __init__(self):
+        self.encoding = Value("O2")
+        self.selected_tab = "COM-порт"
+        self.req_ack_counters = [0] * 32
+        self.search_counters = [0] * 32
+        self.get_id_counters = [0] * 32
+        self.mac_addr = [""] * 32
+        self.shown = threading.Event()
+        self.shown_at = 0.0
+
+    def update_message_area(self, message):
+        pass
+
+    def update_data_area(self, data):
+        self.shown_at = time.perf_counter()
+        self.shown.set()
+
+
+def measure(baudrate: int, idle_timeout: float, count: int, use_ring: bool) -> list:
+    """
+    Пишет по одному пакету в псевдотерминал и ждет вывода строки.
+    :return: Задержки в миллисекундах, None - строка не выведена за SHOW_TIMEOUT.
+    """
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    data_queue = RingBuffer(1 << 16) if use_ring else queue.Queue()
+    gui = MeasureGui()
+    processing = DataProcessing(data_queue, None, gui)
+    port = SerialPort(data_queue)
+    port.open_port(os.ttyname(slave), baudrate, 8, "N", 1, timeout=0.1)
+    processing.start_data_processing(idle_timeout=idle_timeout)
+    latencies = []
+    try:
+        for _ in range(count):
+            gui.shown.clear()
+            os.write(master, FRAME)
+            written_at = time.perf_counter()
+            if gui.shown.wait(SHOW_TIMEOUT):
+                latencies.append((gui.shown_at - written_at) * 1e3)
+            else:
+                latencies.append(None)
+            time.sleep(BURST_INTERVAL)
+    finally:
+        port.close_port()
+        processing.stop_data_processing()
+        os.close(master)
+        os.close(slave)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    """Выводит медиану, 95-й процентиль и максимум задержки."""
+    shown = sorted(value for value in latencies if value is not None)
+    text = f"  {label:31}: выведено {len(shown)}/{len(latencies)}"
+    if shown:
+        p95 = shown[max(int(len(shown) * 0.95) - 1, 0)]
+        text += f", медиана {statistics.median(shown):6.1f} мс, p95 {p95:6.1f} мс, максимум {shown[-1]:6.1f} мс"
+    print(text)
+
+
+def main():
+    if os.name != "posix":
+        print("Замер использует псевдотерминал и работает только на POSIX")
+        return 1
+    parser = argparse.ArgumentParser(description="Задержка вывода последнего пакета пачки")
+    parser.add_argument("--count", type=int, default=50, help="Пачек в каждом замере")
+    parser.add_argument("--baud", type=int, nargs="+", default=[1200, 9600, 115200], help="Скорости линии")
+    args = parser.parse_args()
+
+    for baudrate in args.baud:
+        idle_timeout = Orion2Framer.idle_timeout(baudrate)
+        print(f"{baudrate} бод, пауза на линии {idle_timeout * 1e3:.1f} мс:")
+        for use_ring in (False, True):
+            source = "кольцевой буфер" if use_ring else "очередь"
+            report(f"сброс по паузе, {source}", measure(baudrate, idle_timeout, args.count, use_ring))
+    # Без сброса по паузе строка пакета выводится только с маркером следующей пачки,
+    # поэтому замеряется одна пачка: следующая вывела бы строку предыдущей
+    report("без сброса по паузе", measure(args.baud[-1], NO_FLUSH_TIMEOUT, 1, False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
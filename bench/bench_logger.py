@@ -0,0 +1,139 @@
+"""
+Замер записи лога: устойчивая скорость в строках в секунду, системные вызовы записи и открытия
+файла на 1000 записей. FileLogger сравнивается с прежней записью (открытие файла на каждые 10 строк,
+построчная буферизация, одна запись из очереди за раз).
+Системные вызовы записи считаются по /proc/self/io (только Linux), открытия - подменой open.
+    python bench/bench_logger.py
+    python bench/bench_logger.py --records 500000
+"""
+import argparse
+import builtins
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_logger
+from file_logger import FileLogger
+
+# Типичная строка разобранного пакета
+LINE = "12:34:56.789012  FF 80 1F 03 12 34 56 78 9A BC  12  345  ->  Запрос  :SMode  Адрес 3 данные 01 02 03"
+# Счетчик открытий файлов
+opened_files = [0]
+
+
+def counting_open(*args, **kwargs):
+    """open, считающий открытия файлов."""
+    opened_files[0] += 1
+    return builtins.open(*args, **kwargs)
+
+
+class LegacyFileLogger:
+    """Прежняя запись лога: буфер из 10 строк, файл открывается заново на каждую запись буфера."""
+
+    def __init__(self, data_queue, folder_path):
+        self._data_queue = data_queue
+        self._stop_event = threading.Event()
+        self._log_thread = None
+        self._buffer = []
+        self._buffer_size = 10
+        self._current_log_path = os.path.join(folder_path, "legacy_log.txt")
+
+    def start(self):
+        with counting_open(self._current_log_path, "a", encoding="utf-8"):
+            pass
+        self._stop_event.clear()
+        self._log_thread = threading.Thread(target=self._logging_worker, daemon=True)
+        self._log_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._log_thread.join(timeout=1.0)
+        self._flush_buffer()
+
+    def _logging_worker(self):
+        while not self._stop_event.is_set():
+            try:
+                data = self._data_queue.get(timeout=1)
+                self._buffer.append(data + "\n")
+                if len(self._buffer) >= self._buffer_size:
+                    self._flush_buffer()
+            except queue.Empty:
+                continue
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+        with counting_open(self._current_log_path, "a", encoding="utf-8", buffering=1) as log_file:
+            log_file.writelines(self._buffer)
+        self._buffer.clear()
+
+
+def write_syscalls():
+    """Количество системных вызовов записи процесса или None, если ОС его не сообщает."""
+    try:
+        with builtins.open("/proc/self/io") as file:
+            for line in file:
+                if line.startswith("syscw"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run(make_logger, records: int) -> dict:
+    """
+    Пишет records строк через очередь и ждет, пока все они окажутся в файле.
+    :return: Строк в секунду, вызовов записи и открытий файла на 1000 записей.
+    """
+    data_queue = queue.Queue(maxsize=100000)
+    folder = tempfile.mkdtemp()
+    logger = make_logger(data_queue, folder)
+    logger.start()
+    expected = records * len((LINE + os.linesep).encode("utf-8"))
+    writes_before = write_syscalls()
+    opened_before = opened_files[0]
+    started = time.perf_counter()
+
+    def produce():
+        for _ in range(records):
+            data_queue.put(LINE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    while os.path.getsize(logger._current_log_path) < expected:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    writes_after = write_syscalls()
+    opened = opened_files[0] - opened_before
+    logger.stop()
+    writes = None if writes_before is None else (writes_after - writes_before) * 1000 / records
+    return {"rate": records / elapsed, "writes": writes, "opens": opened * 1000 / records}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер записи лога")
+    parser.add_argument("--records", type=int, default=200000, help="Количество записей")
+    args = parser.parse_args()
+
+    # Открытия файлов FileLogger считаются так же, как у прежней записи
+    file_logger.open = counting_open
+
+    def make_file_logger(data_queue, folder):
+        # Без смены файла, чтобы сравнивать только запись
+        return FileLogger(data_queue, on_error=lambda message: None, folder_path=folder, file_size_limit=0)
+
+    print(f"записей: {args.records}")
+    for label, make_logger in (("прежний", LegacyFileLogger), ("FileLogger", make_file_logger)):
+        result = run(make_logger, args.records)
+        writes = "н/д" if result["writes"] is None else f"{result['writes']:7.1f}"
+        print(f"  {label:10}: {result['rate']:9.0f} строк/с, вызовов записи на 1000 записей {writes}, "
+              f"открытий файла на 1000 записей {result['opens']:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
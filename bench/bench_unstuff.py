@@ -0,0 +1,103 @@
+"""
+Замер восстановления подмененных байт Orion2 (FE 01 -> FF, FE 02 -> FE): прежняя двойная замена
+replace по собранному пакету и восстановление в Orion2Framer по мере поступления байт.
+Поток насыщен байтами подмены, порции нечетной длины разрезают пары FE 01/FE 02 между чтениями.
+Короткие пакеты Orion2Framer восстанавливает той же заменой replace, поэтому отдельно замеряются
+длинные пакеты (больше TAIL_LIMIT) и участки кольцевого буфера: они проходят через буфер пакета
+с восстановлением байт за один проход. Пакеты обеих реализаций сверяются побайтно.
+    python bench/bench_unstuff.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orion2_framer import Orion2Framer
+import orion2_stream
+
+# Размеры порций чтения порта
+CHUNK_SIZES = (1, 7, 255, 4096)
+# Доли байт FE и FF в теле пакетов
+ESCAPE_SHARES = (0.0, 0.05, 0.25, 0.5)
+# Потоки: название и параметры make_frames (количество, наименьшая и наибольшая длина пакета)
+STREAMS = (
+    ("короткие пакеты", (3000, 4, 64)),
+    ("длинные пакеты", (40, 2000, 8000)),
+)
+# Объем общего буфера, в который копируется порция в режиме кольцевого буфера
+RING_SIZE = 8192
+
+
+def legacy_unstuff(chunks) -> list:
+    """Прежний разбор: пакет собирается целиком, затем подмененные байты восстанавливаются двумя replace."""
+    data_bytes = b""
+    frames = []
+    for chunk in chunks:
+        data_bytes += chunk
+        while True:
+            end = data_bytes.find(b"\xFF", 2)
+            if end == -1:
+                break
+            frames.append(data_bytes[:end].replace(b"\xFE\x01", b"\xFF").replace(b"\xFE\x02", b"\xFE"))
+            data_bytes = data_bytes[end:]
+    return frames
+
+
+def framer_unstuff(chunks) -> list:
+    """Разбор Orion2Framer с восстановлением байт по мере поступления порций."""
+    framer = Orion2Framer()
+    frames = []
+    for chunk in chunks:
+        frames += [frame for _, frame in framer.feed(chunk)]
+    return frames
+
+
+def framer_unstuff_ring(chunks) -> list:
+    """Разбор Orion2Framer участков общего буфера, как при чтении порта в кольцевой буфер."""
+    framer = Orion2Framer()
+    buffer = bytearray(RING_SIZE)
+    frames = []
+    for chunk in chunks:
+        buffer[:len(chunk)] = chunk
+        frames += [frame for _, frame in framer.feed(buffer, 0, len(chunk))]
+    return frames
+
+
+def measure(function, chunks) -> tuple:
+    """Возвращает пакеты и лучшее из пяти время разбора в секундах."""
+    best = None
+    frames = []
+    for _ in range(5):
+        started = time.perf_counter()
+        frames = function(chunks)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return frames, best
+
+
+def main():
+    ok = True
+    for share in ESCAPE_SHARES:
+        for label, (count, min_len, max_len) in STREAMS:
+            frames = orion2_stream.make_frames(count, min_len, max_len, escape_share=share)
+            stream = orion2_stream.make_stream(frames)
+            escape_percent = stream.count(b"\xFE") * 100 / len(stream)
+            print(f"{label}, доля FE/FF в теле {share:.2f}: {len(stream)} байт, "
+                  f"байт FE в потоке {escape_percent:.1f}%")
+            for size in CHUNK_SIZES:
+                chunks = orion2_stream.split_chunks(stream, size)
+                legacy, legacy_time = measure(legacy_unstuff, chunks)
+                text = f"  порция {size:5} байт: прежний {len(stream) / legacy_time / 1e6:6.2f} МБ/с"
+                for mode, function in (("Orion2Framer", framer_unstuff), ("кольцевой буфер", framer_unstuff_ring)):
+                    frames, framer_time = measure(function, chunks)
+                    if frames != legacy:
+                        ok = False
+                        print(f"  порция {size:5} байт, {mode}: пакеты не совпадают")
+                    text += f", {mode} {len(stream) / framer_time / 1e6:6.2f} МБ/с"
+                print(text)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
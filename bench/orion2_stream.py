@@ -0,0 +1,48 @@
+"""
+Синтетический поток Orion2 для замеров: пакеты со случайными данными и подменой байт,
+как их передает линия.
+"""
+import random
+
+# Маркер начала пакета
+START_BYTE = 0xFF
+# Скорость линии, для которой пересчитываются замеры
+BAUDRATE = 115200
+# Бит на символ при 8N1
+CHAR_BITS = 10
+
+
+def stuff(data: bytes) -> bytes:
+    """Подменяет байты FE и FF в теле пакета (FE -> FE 02, FF -> FE 01)."""
+    return data.replace(b"\xFE", b"\xFE\x02").replace(b"\xFF", b"\xFE\x01")
+
+
+def make_frames(count: int = 3000, min_len: int = 4, max_len: int = 64, seed: int = 1,
+                escape_share: float = 0.0) -> list:
+    """
+    Создает пакеты без подмены байт: маркер, адрес и случайное тело.
+    :param escape_share: Доля байт FE и FF в теле сверх равномерного распределения.
+    :return: Список пакетов (bytes), каждый начинается с 0xFF.
+    """
+    rnd = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        body = bytes(rnd.choice((0xFE, 0xFF)) if rnd.random() < escape_share else rnd.randrange(256)
+                     for _ in range(rnd.randrange(min_len, max_len)))
+        frames.append(bytes([START_BYTE, rnd.randrange(1, 32)]) + body)
+    return frames
+
+
+def make_stream(frames: list) -> bytes:
+    """Собирает поток линии из пакетов с подменой байт и завершающим маркером."""
+    return b"".join(frame[:1] + stuff(frame[1:]) for frame in frames) + bytes([START_BYTE])
+
+
+def split_chunks(data: bytes, size: int) -> list:
+    """Нарезает поток на порции чтения порта заданного размера."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def line_bytes_per_second(baudrate: int = BAUDRATE) -> float:
+    """Пропускная способность линии в байтах в секунду."""
+    return baudrate / CHAR_BITS
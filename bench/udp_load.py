@@ -0,0 +1,138 @@
+"""
+Локальный генератор нагрузки UDP: отдельный процесс шлет датаграммы на 127.0.0.1 без пауз,
+прием UDPConnection сравнивается с прежним приемом (одна recvfrom(1024) на пробуждение селектора).
+Выводится устойчивая скорость приема в датаграммах в секунду, потери и обрезанные датаграммы.
+    python bench/udp_load.py
+    python bench/udp_load.py --count 200000 --sizes 64 1400 8000
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import selectors
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from udp_connection import UDPConnection
+
+# Адрес приема
+HOST = "127.0.0.1"
+# Пауза без данных, после которой прием считается законченным
+IDLE_SECONDS = 0.5
+
+
+class LegacyUDPConnection(UDPConnection):
+    """Прежний прием: буфер 1024 байта, одна датаграмма на пробуждение, без настройки сокета."""
+
+    def _setup_socket(self):
+        self.reset_stats()
+        self.buffer_size = 1024
+
+    def _read_udp(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._sock, selectors.EVENT_READ)
+        while not self._close_event.is_set():
+            try:
+                if self._sock is None or not self.is_open():
+                    break
+                events = selector.select(timeout=0.1)
+                for key, _ in events:
+                    data, addr = key.fileobj.recvfrom(self.buffer_size)
+                    self.wakeups += 1
+                    self.datagrams += 1
+                    self.received_bytes += len(data)
+                    if data:
+                        self._data_queue.put((time.monotonic_ns(), data), timeout=0.1)
+            except BlockingIOError:
+                continue
+
+
+def send_datagrams(port: int, size: int, count: int):
+    """Отправляет count датаграмм размера size без пауз (выполняется в отдельном процессе)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    for _ in range(count):
+        try:
+            sock.sendto(payload, (HOST, port))
+        except (BlockingIOError, ConnectionRefusedError):
+            pass
+    sock.close()
+
+
+def free_port() -> int:
+    """Возвращает свободный UDP порт."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def run(connection_class, size: int, count: int) -> dict:
+    """
+    Принимает поток датаграмм указанным классом соединения.
+    :return: Статистика соединения, время от первой до последней принятой датаграммы и скорость приема.
+    """
+    data_queue = queue.Queue()
+    connection = connection_class(data_queue)
+    port = free_port()
+    connection.open_connection(HOST, port)
+    # Потребитель очереди, как поток обработки данных
+    timing = {"first": None, "last": None}
+    stop = threading.Event()
+
+    def consume():
+        while not stop.is_set():
+            try:
+                data_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            now = time.perf_counter()
+            if timing["first"] is None:
+                timing["first"] = now
+            timing["last"] = now
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    sender = multiprocessing.Process(target=send_datagrams, args=(port, size, count))
+    sender.start()
+    sender.join()
+    # Ждем, пока прием не затихнет
+    received = -1
+    while received != connection.datagrams:
+        received = connection.datagrams
+        time.sleep(IDLE_SECONDS)
+    stop.set()
+    consumer.join()
+    connection.close_connection()
+
+    stats = connection.get_stats()
+    elapsed = (timing["last"] - timing["first"]) if timing["first"] is not None else 0
+    stats["elapsed"] = elapsed
+    stats["rate"] = stats["datagrams"] / elapsed if elapsed else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный замер приема UDP")
+    parser.add_argument("--count", type=int, default=100000, help="Датаграмм в каждом замере")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1400, 8000], help="Размеры датаграмм")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(f"датаграммы {size} байт, отправлено {args.count}:")
+        for label, connection_class in (("прежний", LegacyUDPConnection), ("UDPConnection", UDPConnection)):
+            stats = run(connection_class, size, args.count)
+            lost = args.count - stats["datagrams"]
+            truncated = stats["truncated"] if connection_class is UDPConnection else \
+                (stats["datagrams"] if size > 1024 else 0)
+            print(f"  {label:13}: принято {stats['datagrams']:7} ({stats['rate']:8.0f} датаграмм/с), "
+                  f"потеряно {lost:7}, обрезано {truncated:7}, "
+                  f"датаграмм на пробуждение {stats['avg_drained']:6.1f}, "
+                  f"отброшено ядром {stats['kernel_drops']}")
+
+
+if __name__ == "__main__":
+    main()
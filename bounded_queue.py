@@ -0,0 +1,203 @@
+import queue
+
+from spill_buffer import SpillBuffer
+
+
+def default_item_size(item) -> int:
+    """
+    Размер элемента очереди в байтах для ограничения по объему.
+    Для кортежей (например, ('text', запись) очереди гуи) учитывается последний элемент,
+    для записей разобранных пакетов - сырые данные пакета.
+    """
+    if isinstance(item, tuple):
+        item = item[-1] if item else b""
+    if isinstance(item, (bytes, bytearray, memoryview, str)):
+        return len(item)
+    packet = getattr(item, "packet", None)
+    if packet is not None:
+        return len(packet)
+    return 0
+
+
+class BoundedQueue(queue.Queue):
+    """
+    Очередь с ограничением по количеству элементов и по объему в байтах.
+    При переполнении поступает согласно политике: блокирует отправителя, вытесняет самые старые
+    элементы, отбрасывает новый элемент или сбрасывает новые элементы во временный файл на диске
+    (SpillBuffer), откуда они по порядку дочитываются, когда обработка догоняет поток.
+    Потерянные элементы и байты считаются точно.
+    """
+
+    # Политики переполнения
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    SPILL = "spill"
+    POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, SPILL)
+
+    def __init__(self, maxsize: int = 0, max_bytes: int = 0, policy: str = BLOCK, name: str = "",
+                 item_size=None, spill_dir: str = None):
+        """
+        Инициализация объекта BoundedQueue.
+        :param maxsize: Максимальное количество элементов в памяти (0 - без ограничения).
+        :param max_bytes: Максимальный объем элементов в памяти в байтах (0 - без ограничения).
+        :param policy: Политика переполнения (block, drop_oldest, drop_newest, spill).
+        :param name: Имя очереди для сообщений о потерях.
+        :param item_size: Функция размера элемента в байтах, по умолчанию default_item_size.
+        :param spill_dir: Директория временного файла для политики spill, по умолчанию системная.
+                          Порог сброса на диск задают maxsize и max_bytes.
+        :raises ValueError: Если политика неизвестна.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения очереди: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.name = name
+        self._item_size = item_size or default_item_size
+        # Буфер сброса на диск для политики spill
+        self.spill = SpillBuffer(spill_dir)
+        self._reported_episodes = 0
+        self._reported_catch_ups = 0
+
+        # Точный учет потерь
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+        self._reported_frames = 0
+        # Учет сброса на диск
+        self.spilled_frames = 0
+        self.spilled_bytes = 0
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        """Инициализация хранилища элементов (вызывается из queue.Queue)."""
+        super()._init(maxsize)
+        # Объем элементов в памяти
+        self.queue_bytes = 0
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """
+        Добавляет элемент в очередь согласно политике переполнения.
+        :raises queue.Full: Только для политики block, если место не освободилось за время ожидания;
+                            элемент в этом случае учитывается как потерянный.
+        """
+        size = self._item_size(item)
+        with self.not_full:
+            if self._is_full(size):
+                if self.policy == self.BLOCK:
+                    if not block or not self.not_full.wait_for(lambda: not self._is_full(size), timeout):
+                        self._count_drop(size)
+                        raise queue.Full
+                elif self.policy == self.DROP_NEWEST:
+                    self._count_drop(size)
+                    return
+                elif self.policy == self.DROP_OLDEST:
+                    while self.queue and self._is_full(size):
+                        self._count_drop(self._item_size(self._pop_memory()))
+                    # Элемент больше всего допустимого объема в очередь не помещается
+                    if self._is_full(size):
+                        self._count_drop(size)
+                        return
+                else:
+                    self.spill.append(item, size)
+                    self.spilled_frames += 1
+                    self.spilled_bytes += size
+                    self.unfinished_tasks += 1
+                    self.not_empty.notify()
+                    return
+            self._put_memory(item, size)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def clear(self):
+        """Удаляет все элементы очереди без учета их как потерянных."""
+        with self.mutex:
+            self.queue.clear()
+            self.queue_bytes = 0
+            self.spill.clear()
+            self.not_full.notify_all()
+
+    def get_stats(self) -> dict:
+        """Возвращает заполнение очереди, счетчики потерь и метрики сброса на диск."""
+        with self.mutex:
+            return {
+                "items": len(self.queue),
+                "bytes": self.queue_bytes,
+                "dropped_frames": self.dropped_frames,
+                "dropped_bytes": self.dropped_bytes,
+                "spilled_frames": self.spilled_frames,
+                "spilled_bytes": self.spilled_bytes,
+                "spill_oldest_age": self.spill.oldest_age(),
+                **{f"spill_{key}": value for key, value in self.spill.get_stats().items()},
+            }
+
+    def loss_text(self) -> str:
+        """Строка с потерями очереди для окна сообщений и лог-файла."""
+        return f"Потери очереди {self.name}: {self.dropped_frames} порций, {self.dropped_bytes} байт"
+
+    def new_loss_text(self) -> str:
+        """Возвращает строку потерь, если с прошлого вызова были новые потери, иначе пустую строку."""
+        dropped_frames = self.dropped_frames
+        if dropped_frames == self._reported_frames:
+            return ""
+        self._reported_frames = dropped_frames
+        return self.loss_text()
+
+    def new_spill_text(self) -> str:
+        """
+        Возвращает строку о начале сброса на диск или о завершении догона, если с прошлого вызова
+        такое событие произошло, иначе пустую строку.
+        """
+        with self.mutex:
+            spill = self.spill
+            if spill.episodes != self._reported_episodes:
+                self._reported_episodes = spill.episodes
+                if spill.depth_items:
+                    return f"Обработка отстает, очередь {self.name} сбрасывается на диск"
+            if spill.episodes != self._reported_catch_ups and not spill.depth_items:
+                self._reported_catch_ups = spill.episodes
+                return (f"Очередь {self.name} догнала поток за {spill.last_catch_up:.1f} с, "
+                        f"максимум на диске {spill.max_depth_bytes} байт, отставание до {spill.max_lag:.1f} с")
+            return ""
+
+    def _is_full(self, size: int) -> bool:
+        """Проверяет, переполнит ли элемент заданного размера очередь в памяти."""
+        # Пока на диске есть элементы, новые идут туда же, чтобы не нарушить порядок
+        if self.spill.depth_items:
+            return True
+        if 0 < self.maxsize <= len(self.queue):
+            return True
+        # Один элемент больше лимита пропускаем в пустую очередь, иначе он не пройдет никогда
+        return bool(self.max_bytes and self.queue and self.queue_bytes + size > self.max_bytes)
+
+    def _count_drop(self, size: int):
+        """Учитывает потерянный элемент."""
+        self.dropped_frames += 1
+        self.dropped_bytes += size
+
+    def _qsize(self):
+        """Количество элементов в памяти и на диске."""
+        return len(self.queue) + self.spill.depth_items
+
+    def _put(self, item):
+        """Добавляет элемент в память (для совместимости с queue.Queue)."""
+        self._put_memory(item, self._item_size(item))
+
+    def _put_memory(self, item, size: int):
+        """Добавляет элемент в память."""
+        if not self.queue:
+            # Очередь могли очистить снаружи через queue.clear(), объем восстанавливаем по факту
+            self.queue_bytes = 0
+        self.queue.append(item)
+        self.queue_bytes += size
+
+    def _get(self):
+        """Забирает самый старый элемент: сначала из памяти, затем с диска."""
+        if self.queue:
+            return self._pop_memory()
+        return self.spill.pop()
+
+    def _pop_memory(self):
+        """Забирает самый старый элемент из памяти."""
+        item = self.queue.popleft()
+        self.queue_bytes = self.queue_bytes - self._item_size(item) if self.queue else 0
+        return item
@@ -0,0 +1,314 @@
+"""
+Захват и расшифровка без графического интерфейса.
+
+Примеры запуска:
+    python capture_daemon.py --serial /dev/ttyUSB0 --baudrate 115200 --log-dir /var/log/cum_port
+    python capture_daemon.py --udp 0.0.0.0:5000 --encoding O2
+    python capture_daemon.py --serial /dev/ttyUSB0 --capture-dir /var/log/cum_port/captures
+    python capture_daemon.py --config capture.ini
+
+Файл настроек (INI):
+    [capture]
+    log_dir = /var/log/cum_port
+    log_fsync = 1.0
+    log_max_mb = 5
+    log_compress = 6
+    log_keep_mb = 1024
+    log_keep_days = 30
+    encoding = O2
+    reorder_window = 0.05
+    spill_dir = /var/tmp
+    ring_kb = 0
+    capture_dir = /var/log/cum_port/captures
+    capture_frames = no
+
+    [link rs485-1]
+    type = serial
+    port = /dev/ttyUSB0
+    baudrate = 115200
+    bytesize = 8
+    parity = N
+    stopbits = 1
+
+    [link gw-1]
+    type = udp
+    ip = 0.0.0.0
+    port = 5000
+    encoding = O2
+
+Останавливается по SIGTERM или Ctrl+C: линии закрываются, принятые данные разбираются до конца
+(в том числе сброшенные на диск), записи сливаются в лог-файл.
+"""
+import argparse
+import configparser
+import datetime
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+# Свои реализации
+from bounded_queue import BoundedQueue
+from capture_file import CaptureWriter
+from capture_manager import CaptureManager
+from file_logger import FileLogger
+from log_archiver import LogArchiver
+from udp_address import parse_address
+
+# Кодировки данных
+ENCODINGS = ("O2", "HEX", "ASCII")
+
+
+class CaptureDaemon:
+    """Захват с линий связи в лог-файл без графического интерфейса."""
+
+    def __init__(self, links: list, log_dir: str = "logs", reorder_window: float = 0.05, stats_interval: float = 0,
+                 spill_dir: str = None, capture_dir: str = None, capture_frames: bool = False,
+                 log_fsync: float = 0, log_max_bytes: int = 5 * 1024 * 1024, log_compress: int = 0,
+                 log_keep_bytes: int = 0, log_keep_age: float = 0, ring_size: int = 0):
+        """
+        Инициализация объекта CaptureDaemon.
+        :param links: Список настроек линий: словари с ключами id, type ("serial" или "udp"),
+                      encoding и параметрами открытия источника.
+        :param log_dir: Директория лог-файлов.
+        :param reorder_window: Окно упорядочивания записей разных линий в секундах
+                               (период подтверждения времени простаивающими линиями).
+        :param stats_interval: Период вывода статистики в секундах (0 - не выводить).
+        :param spill_dir: Директория временных файлов, куда уходят данные, если обработка отстает.
+        :param capture_dir: Директория двоичных файлов захвата сырых данных (None - не записывать).
+        :param capture_frames: Записывать в файл захвата также разобранные записи.
+        :param log_fsync: Период сброса лог-файла на диск (os.fsync) в секундах (0 - не сбрасывать).
+        :param log_max_bytes: Размер лог-файла в байтах, после которого начинается новый файл.
+        :param log_compress: Степень сжатия законченных лог-файлов gzip (0 - не сжимать).
+        :param log_keep_bytes: Суммарный объем хранимых законченных лог-файлов в байтах (0 - без ограничения).
+        :param log_keep_age: Срок хранения законченных лог-файлов в секундах (0 - без ограничения).
+        :param ring_size: Размер кольцевого буфера линий COM-портов в байтах (0 - очередь со сбросом на диск).
+        """
+        # Обработчики ждут запись в файл, записи лога не теряются
+        self.log_queue = BoundedQueue(maxsize=100000, policy=BoundedQueue.BLOCK, name="лога")
+        self.stats_interval = stats_interval
+        self._stop_event = threading.Event()
+        self.log_archiver = None
+        # Ограничения хранения применяются и без сжатия
+        if log_compress or log_keep_bytes or log_keep_age:
+            self.log_archiver = LogArchiver(log_dir, on_error=self.report, level=log_compress,
+                                            max_total_bytes=log_keep_bytes, max_age=log_keep_age)
+        self.file_logger = FileLogger(self.log_queue, on_error=self.report,
+                                      on_file_rotated=self._on_log_rotated, folder_path=log_dir,
+                                      fsync_interval=log_fsync, file_size_limit=log_max_bytes,
+                                      archiver=self.log_archiver)
+        self.capture_writer = None
+        if capture_dir:
+            self.capture_writer = CaptureWriter(capture_dir, on_error=self.report, with_frames=capture_frames)
+        self.capture = CaptureManager(logger_queue=self.log_queue, on_message=self.report,
+                                      reorder_window=reorder_window, spill_dir=spill_dir,
+                                      capture_writer=self.capture_writer, ring_size=ring_size)
+        for link in links:
+            settings = dict(link)
+            link_id = settings.pop("id")
+            kind = settings.pop("type")
+            if kind == "serial":
+                self.capture.add_serial_link(link_id, **settings)
+            else:
+                self.capture.add_udp_link(link_id, **settings)
+
+    @staticmethod
+    def report(message: str):
+        """Выводит сообщение с отметкой времени."""
+        print(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  {message}", flush=True)
+
+    def run(self):
+        """Запускает захват и ждет сигнала остановки."""
+        if self.log_archiver:
+            self.log_archiver.start()
+        self.file_logger.start()
+        if self.capture_writer:
+            self.capture_writer.start()
+        self.capture.start()
+        self.report(f"Захват запущен, линий: {len(self.capture.links)}")
+        next_stats = time.monotonic() + self.stats_interval
+        while not self._stop_event.wait(1.0):
+            self._report_losses()
+            if self.stats_interval and time.monotonic() >= next_stats:
+                self._report_stats()
+                next_stats += self.stats_interval
+        self._shutdown()
+
+    def stop(self, *_):
+        """Запрашивает остановку захвата (может вызываться из обработчика сигнала)."""
+        self._stop_event.set()
+
+    def _shutdown(self):
+        """Закрывает линии и дописывает в лог все принятые записи."""
+        self.capture.stop()
+        if self.capture_writer:
+            self.capture_writer.stop()
+        # Логгер при остановке дописывает все записи из очереди
+        self._report_losses()
+        self.file_logger.stop()
+        if self.log_archiver:
+            self.log_archiver.stop()
+        self._report_stats()
+        self.report("Захват остановлен")
+
+    def _on_log_rotated(self, path: str):
+        """Сообщает о переходе логгера на новый файл."""
+        self.report(f"Размер лог-файла превысил {self.file_logger.file_size_limit / (1024 * 1024):g} МБ. "
+                    f"Создан новый файл: {path}")
+
+    def _report_losses(self):
+        """Выводит новые потери очередей и записывает их в лог-файл."""
+        messages = self.capture.new_loss_texts() + [self.log_queue.new_loss_text()]
+        if self.capture_writer:
+            messages.append(self.capture_writer.queue.new_loss_text())
+        for message in messages:
+            if message:
+                self.report(message)
+                try:
+                    self.log_queue.put(f"{datetime.datetime.now().strftime('%H:%M:%S.%f')}  {message}", timeout=1.0)
+                except queue.Full:
+                    pass
+
+    def _report_stats(self):
+        """Выводит статистику линий."""
+        stats = self.capture.get_stats()
+        for link_id, link in stats["links"].items():
+            batch = link["batch"]
+            data_queue = link["queue"]
+            self.report(f"[{link_id}] открыта: {link['open']}, байт: {batch['bytes']}, "
+                        f"очередь: {data_queue['items']}/{data_queue['bytes']} байт, "
+                        f"на диске: {data_queue.get('spill_depth_bytes', 0)} байт, "
+                        f"отставание: {data_queue.get('spill_oldest_age', 0.0):.1f} с, "
+                        f"потери: {data_queue['dropped_frames']}/{data_queue['dropped_bytes']} байт")
+        self.report(f"Записей: {stats['merged_frames']}")
+
+
+def load_config(path: str) -> tuple:
+    """
+    Читает файл настроек.
+    :return: Кортеж (настройки захвата, список настроек линий).
+    :raises ValueError: Если настройки линии некорректны.
+    """
+    config = configparser.ConfigParser()
+    if not config.read(path, encoding="utf-8"):
+        raise ValueError(f"Не удалось прочитать файл настроек: {path}")
+    capture = dict(config["capture"]) if config.has_section("capture") else {}
+    links = []
+    for section in config.sections():
+        if not section.startswith("link "):
+            continue
+        options = config[section]
+        link = {"id": section[5:].strip(), "type": options.get("type", "serial")}
+        if options.get("encoding"):
+            link["encoding"] = options.get("encoding")
+        if link["type"] == "serial":
+            link["port"] = options["port"]
+            link["baudrate"] = options.getint("baudrate", 115200)
+            link["bytesize"] = options.getint("bytesize", 8)
+            link["parity"] = options.get("parity", "N")
+            link["stopbits"] = options.getint("stopbits", 1)
+        elif link["type"] == "udp":
+            link["ip"] = options.get("ip", "0.0.0.0")
+            link["port"] = options.getint("port")
+        else:
+            raise ValueError(f"Неизвестный тип линии {link['type']} в секции [{section}]")
+        links.append(link)
+    return capture, links
+
+
+def build_links(args, config_links: list, default_encoding: str) -> list:
+    """Собирает список линий из файла настроек и аргументов командной строки."""
+    links = list(config_links)
+    for port in args.serial:
+        links.append({"id": os.path.basename(port), "type": "serial", "port": port, "baudrate": args.baudrate,
+                      "bytesize": args.bytesize, "parity": args.parity, "stopbits": args.stopbits})
+    for ip, port in args.udp:
+        links.append({"id": f"{ip}:{port}", "type": "udp", "ip": ip, "port": port})
+    for link in links:
+        link.setdefault("encoding", default_encoding)
+        if link["encoding"] not in ENCODINGS:
+            raise ValueError(f"Неизвестная кодировка {link['encoding']} линии {link['id']}")
+    return links
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Захват и расшифровка Orion2 без графического интерфейса")
+    parser.add_argument("--config", help="Файл настроек (INI)")
+    parser.add_argument("--serial", action="append", default=[], metavar="PORT",
+                        help="COM-порт, можно указать несколько раз")
+    parser.add_argument("--baudrate", type=int, default=115200, help="Скорость COM-портов из командной строки")
+    parser.add_argument("--bytesize", type=int, default=8, choices=(5, 6, 7, 8))
+    parser.add_argument("--parity", default="N", choices=("N", "E", "O", "M", "S"))
+    parser.add_argument("--stopbits", type=int, default=1, choices=(1, 2))
+    parser.add_argument("--udp", action="append", default=[], type=parse_address, metavar="IP:PORT",
+                        help="Адрес UDP для прослушивания, можно указать несколько раз")
+    parser.add_argument("--encoding", choices=ENCODINGS, help="Кодировка по умолчанию (O2)")
+    parser.add_argument("--log-dir", help="Директория лог-файлов (logs)")
+    parser.add_argument("--log-fsync", type=float, help="Период сброса лог-файла на диск, с (0 - не сбрасывать)")
+    parser.add_argument("--log-max-mb", type=float, help="Размер лог-файла, после которого начинается новый, МБ (5)")
+    parser.add_argument("--log-compress", type=int, choices=range(0, 10), metavar="0-9",
+                        help="Степень сжатия gzip законченных лог-файлов (0 - не сжимать)")
+    parser.add_argument("--log-keep-mb", type=float, help="Суммарный объем хранимых законченных лог-файлов, МБ")
+    parser.add_argument("--log-keep-days", type=float, help="Срок хранения законченных лог-файлов, сутки")
+    parser.add_argument("--reorder-window", type=float, help="Окно упорядочивания записей линий: период подтверждения времени "
+                                                             "простаивающими линиями, с (0.05)")
+    parser.add_argument("--spill-dir", help="Директория сброса данных на диск при отставании обработки")
+    parser.add_argument("--ring-kb", type=int,
+                        help="Кольцевой буфер линий COM-портов вместо очереди, КБ (0 - очередь)")
+    parser.add_argument("--capture-dir", help="Директория двоичных файлов захвата сырых данных")
+    parser.add_argument("--capture-frames", action="store_true",
+                        help="Записывать в файл захвата также разобранные записи")
+    parser.add_argument("--stats-interval", type=float, default=0, help="Период вывода статистики, с")
+    args = parser.parse_args(argv)
+
+    try:
+        capture_config, config_links = load_config(args.config) if args.config else ({}, [])
+        encoding = args.encoding or capture_config.get("encoding", "O2")
+        links = build_links(args, config_links, encoding)
+        log_dir = args.log_dir or capture_config.get("log_dir", "logs")
+        log_fsync = args.log_fsync
+        if log_fsync is None:
+            log_fsync = float(capture_config.get("log_fsync", 0))
+        log_max_mb = args.log_max_mb
+        if log_max_mb is None:
+            log_max_mb = float(capture_config.get("log_max_mb", 5))
+        log_compress = args.log_compress
+        if log_compress is None:
+            log_compress = int(capture_config.get("log_compress", 0))
+        log_keep_mb = args.log_keep_mb
+        if log_keep_mb is None:
+            log_keep_mb = float(capture_config.get("log_keep_mb", 0))
+        log_keep_days = args.log_keep_days
+        if log_keep_days is None:
+            log_keep_days = float(capture_config.get("log_keep_days", 0))
+        reorder_window = args.reorder_window
+        if reorder_window is None:
+            reorder_window = float(capture_config.get("reorder_window", 0.05))
+        spill_dir = args.spill_dir or capture_config.get("spill_dir")
+        ring_kb = args.ring_kb
+        if ring_kb is None:
+            ring_kb = int(capture_config.get("ring_kb", 0))
+        capture_dir = args.capture_dir or capture_config.get("capture_dir")
+        capture_frames = args.capture_frames or capture_config.get("capture_frames", "no").lower() in ("yes", "true", "1")
+    except (KeyError, ValueError) as e:
+        parser.error(str(e))
+    if not links:
+        parser.error("Не задано ни одной линии (--serial, --udp или --config)")
+
+    daemon = CaptureDaemon(links, log_dir=log_dir, reorder_window=reorder_window,
+                           stats_interval=args.stats_interval, spill_dir=spill_dir, capture_dir=capture_dir,
+                           capture_frames=capture_frames, log_fsync=log_fsync,
+                           log_max_bytes=int(log_max_mb * 1024 * 1024), log_compress=log_compress,
+                           log_keep_bytes=int(log_keep_mb * 1024 * 1024), log_keep_age=log_keep_days * 86400,
+                           ring_size=ring_kb * 1024)
+    signal.signal(signal.SIGINT, daemon.stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
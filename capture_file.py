@@ -0,0 +1,528 @@
+import datetime
+import mmap
+import os
+import queue
+import struct
+import threading
+
+from bounded_queue import BoundedQueue
+from decoded_frame import WALL_CLOCK_ANCHOR_NS, DecodedFrame
+
+# Сигнатура файла захвата и версия формата
+MAGIC = b"O2CAP\x00\x00\x01"
+# Заголовок файла: сигнатура, смещение системного времени относительно monotonic_ns при записи
+FILE_HEADER = struct.Struct("<8sq")
+# Заголовок записи: тип, номер линии, резерв, время приема (monotonic_ns), длина данных записи
+RECORD_HEADER = struct.Struct("<BBHQI")
+# Расширение файлов захвата
+EXTENSION = ".o2cap"
+
+# Разреженный индекс захвата: отдельный файл рядом с файлом захвата
+INDEX_EXTENSION = ".o2idx"
+INDEX_MAGIC = b"O2CIDX\x00\x01"
+# Заголовок индекса: сигнатура, смещение системного времени файла захвата (для проверки соответствия)
+INDEX_HEADER = struct.Struct("<8sq")
+# Запись индекса: тип, номер линии, резерв, количество записей захвата, начало и конец участка файла захвата,
+# наименьшее и наибольшее время приема (monotonic_ns) записей участка
+INDEX_ENTRY = struct.Struct("<BBHIQQQQ")
+# Типы записей индекса
+INDEX_LINK = 0  # Участок - запись объявления линии
+INDEX_SEGMENT = 1  # Участок из нескольких подряд идущих записей
+
+# Типы записей
+KIND_LINK = 0  # Объявление линии: данные - идентификатор линии (utf-8), номер линии - его номер в файле
+KIND_DATA = 1  # Сырые данные в том виде, в каком они пришли из линии
+KIND_FRAME = 2  # Разобранная запись (необязательная)
+
+# Разделитель текстовых полей разобранной записи
+FIELD_SEPARATOR = "\x1f"
+# Длина сырых данных в начале разобранной записи
+FRAME_PACKET_LEN = struct.Struct("<I")
+
+
+def is_capture_file(path: str) -> bool:
+    """Проверяет по сигнатуре, является ли файл файлом захвата."""
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def index_path(path: str) -> str:
+    """Путь файла индекса для файла захвата."""
+    base, extension = os.path.splitext(path)
+    return (base if extension == EXTENSION else path) + INDEX_EXTENSION
+
+
+def _pack_frame(frame) -> bytes:
+    """Упаковывает разобранную запись: сырые данные и текстовые поля."""
+    packet = frame.packet
+    if isinstance(packet, str):
+        packet = packet.encode("utf-8")
+    fields = (str(frame.packet_len), str(frame.packet_num), frame.direction, frame.packet_type_flags,
+              frame.decode_text if frame.decode else "")
+    return FRAME_PACKET_LEN.pack(len(packet)) + packet + FIELD_SEPARATOR.join(fields).encode("utf-8")
+
+
+def _unpack_frame(timestamp: int, link: str, payload) -> DecodedFrame:
+    """Восстанавливает разобранную запись (расшифрованные данные - в текстовом виде)."""
+    packet_len = FRAME_PACKET_LEN.unpack_from(payload)[0]
+    start = FRAME_PACKET_LEN.size
+    packet = bytes(payload[start:start + packet_len])
+    fields = bytes(payload[start + packet_len:]).decode("utf-8").split(FIELD_SEPARATOR)
+    return DecodedFrame(timestamp, packet, *fields, link=link)
+
+
+class CaptureWriter:
+    """
+    Запись захвата в двоичный файл отдельным потоком.
+    Файл состоит из записей с заголовком фиксированной длины: номер линии, время приема
+    первого байта (time.monotonic_ns()) и сырые данные порции; по желанию - разобранные записи.
+    Сырые данные записываются как есть, поэтому захват воспроизводится через DataProcessing
+    с теми же пакетами и отметками времени.
+    Рядом пишется разреженный индекс: на каждые index_interval записей - участок файла и диапазон
+    времени его записей, по нему чтение сразу переходит к нужному интервалу времени.
+    """
+
+    def __init__(self, folder_path: str = "captures", on_error=None, with_frames: bool = False,
+                 max_bytes: int = 32 * 1024 * 1024, index_interval: int = 1024):
+        """
+        Инициализация объекта CaptureWriter.
+        :param folder_path: Директория файлов захвата.
+        :param on_error: Callback для сообщений и ошибок.
+        :param with_frames: Записывать, кроме сырых данных, разобранные записи.
+        :param max_bytes: Максимальный объем очереди записи в байтах, сверх него порции теряются (с учетом).
+        :param index_interval: Количество записей на один участок индекса (0 - индекс не писать).
+        """
+        self._folder_path = folder_path
+        self._on_error = on_error
+        self.with_frames = with_frames
+        # Очередь записей (тип, линия, время приема, данные)
+        self.queue = BoundedQueue(max_bytes=max_bytes, policy=BoundedQueue.DROP_NEWEST, name="захвата")
+        # Номера линий в текущем файле
+        self._links = {}
+        self._file = None
+        self.current_path = ""
+        self.written_bytes = 0
+        # Индекс: файл и текущий участок (начало, количество записей, наименьшее и наибольшее время)
+        self.index_interval = index_interval
+        self._index_file = None
+        self._segment = None
+
+        # Управление потоком
+        self._write_thread = None
+        self._stop_event = threading.Event()
+        # Максимальное количество записей, забираемых из очереди за одну запись в файл
+        self._max_batch = 4096
+
+    @property
+    def is_running(self) -> bool:
+        """Проверяет, активен ли поток записи."""
+        return bool(self._write_thread and self._write_thread.is_alive())
+
+    def start(self):
+        """
+        Создает новый файл захвата и запускает поток записи.
+        :raises OSError: Если файл не удалось создать.
+        """
+        if self.is_running:
+            self._handle_error("Запись захвата уже запущена.")
+            return
+        os.makedirs(self._folder_path, exist_ok=True)
+        name = datetime.datetime.now().strftime("capture_%Y-%m-%d_%H_%M_%S")
+        path = os.path.join(self._folder_path, name + EXTENSION)
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(self._folder_path, f"{name}_{counter}{EXTENSION}")
+            counter += 1
+        try:
+            self._file = open(path, "wb")
+            self._file.write(FILE_HEADER.pack(MAGIC, WALL_CLOCK_ANCHOR_NS))
+            if self.index_interval:
+                self._index_file = open(index_path(path), "wb")
+                self._index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, WALL_CLOCK_ANCHOR_NS))
+        except OSError as e:
+            self._handle_error(f"Ошибка создания файла захвата: {e}")
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            raise
+        self.current_path = path
+        self.written_bytes = FILE_HEADER.size
+        self._links = {}
+        self._segment = None
+        self._handle_error(f"Создан файл захвата: {path}")
+
+        self._stop_event.clear()
+        self._write_thread = threading.Thread(target=self._writing_worker, daemon=True)
+        self._write_thread.start()
+
+    def stop(self):
+        """Останавливает поток записи, дописывает оставшиеся в очереди записи и закрывает файл."""
+        self._stop_event.set()
+        if self._write_thread and self._write_thread.is_alive():
+            # Признак остановки будит поток записи, оставшиеся записи он допишет и закроет файл сам
+            self.queue.put(None, block=False)
+            self._write_thread.join()
+        else:
+            # Поток записи не работает, файл больше никто не использует
+            self._finish()
+        self._write_thread = None
+
+    def write_data(self, link: str, rx_ns: int, data):
+        """
+        Передает порцию сырых данных на запись.
+        :param link: Идентификатор линии.
+        :param rx_ns: Время приема первого байта порции (time.monotonic_ns()).
+        :param data: Сырые данные.
+        """
+        self.queue.put((KIND_DATA, link, rx_ns, bytes(data)), block=False)
+
+    def write_frame(self, link: str, frame):
+        """Передает разобранную запись на запись, если запись разобранных записей включена."""
+        if self.with_frames and isinstance(frame.timestamp, int):
+            self.queue.put((KIND_FRAME, link, frame.timestamp, _pack_frame(frame)), block=False)
+
+    def _writing_worker(self):
+        """Фоновый поток записи: забирает все накопленные записи и пишет их одним вызовом."""
+        while not self._stop_event.is_set():
+            try:
+                records = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            records += self._take_all()
+            try:
+                self._write_batch(records)
+            except OSError as e:
+                self._handle_error(f"Ошибка записи в файл захвата: {e}")
+        self._finish()
+
+    def _finish(self):
+        """Дописывает оставшиеся в очереди записи, последний участок индекса и закрывает файлы."""
+        if self._file is None:
+            return
+        try:
+            records = self._take_all()
+            while records:
+                self._write_batch(records)
+                records = self._take_all()
+            self._file.close()
+            if self._index_file is not None:
+                # Последний, неполный участок
+                if self._segment is not None:
+                    self._index_file.write(self._pack_segment(self.written_bytes))
+                self._index_file.close()
+        except OSError as e:
+            self._handle_error(f"Ошибка записи в файл захвата: {e}")
+        self._file = None
+        self._index_file = None
+        self._segment = None
+
+    def _take_all(self) -> list:
+        """Забирает из очереди все доступные записи за один захват блокировки."""
+        records = []
+        data_queue = self.queue
+        with data_queue.mutex:
+            while data_queue._qsize() and len(records) < self._max_batch:
+                records.append(data_queue._get())
+            data_queue.not_full.notify_all()
+        return records
+
+    def _write_batch(self, records: list):
+        """Упаковывает записи в один буфер и записывает его в файл."""
+        if not records:
+            return
+        buffer = bytearray()
+        index_buffer = bytearray()
+        links = self._links
+        pack = RECORD_HEADER.pack
+        # Смещение начала буфера в файле
+        offset = self.written_bytes
+        interval = self.index_interval if self._index_file is not None else 0
+        for record in records:
+            if record is None:
+                # Признак остановки из stop
+                continue
+            kind, link, rx_ns, payload = record
+            index = links.get(link)
+            if index is None:
+                # Первая запись линии: объявляем ее идентификатор
+                index = links[link] = len(links)
+                name = link.encode("utf-8")
+                start = offset + len(buffer)
+                buffer += pack(KIND_LINK, index, 0, 0, len(name))
+                buffer += name
+                if interval:
+                    index_buffer += INDEX_ENTRY.pack(INDEX_LINK, index, 0, 1, start, offset + len(buffer), 0, 0)
+            if interval:
+                segment = self._segment
+                if segment is None:
+                    self._segment = [offset + len(buffer), 1, rx_ns, rx_ns]
+                else:
+                    segment[1] += 1
+                    if rx_ns < segment[2]:
+                        segment[2] = rx_ns
+                    elif rx_ns > segment[3]:
+                        segment[3] = rx_ns
+            buffer += pack(kind, index, 0, rx_ns, len(payload))
+            buffer += payload
+            if interval and self._segment[1] >= interval:
+                index_buffer += self._pack_segment(offset + len(buffer))
+        self._file.write(buffer)
+        self._file.flush()
+        self.written_bytes += len(buffer)
+        # Индекс пишется после данных и никогда не указывает дальше записанного
+        if index_buffer:
+            self._index_file.write(index_buffer)
+            self._index_file.flush()
+
+    def _pack_segment(self, end: int) -> bytes:
+        """Закрывает текущий участок индекса, заканчивающийся на смещении end, и упаковывает его."""
+        start, count, min_ns, max_ns = self._segment
+        self._segment = None
+        return INDEX_ENTRY.pack(INDEX_SEGMENT, 0, 0, count, start, end, min_ns, max_ns)
+
+    def _handle_error(self, message: str):
+        """Обрабатывает статусные сообщения через callback или выводит в консоль."""
+        if self._on_error:
+            self._on_error(message)
+        else:
+            print(message)
+
+
+class CaptureReader:
+    """
+    Чтение двоичного файла захвата через отображение файла в память.
+    Отметки времени переводятся в time.monotonic_ns() текущего процесса так, что при выводе
+    получается местное время записи.
+    Если рядом есть индекс, чтение интервала времени читает только участки файла, в которые
+    попадает интервал, и несколько последних записей, еще не попавших в индекс.
+    """
+
+    def __init__(self, path: str):
+        """
+        Открывает файл захвата.
+        :raises ValueError: Если файл не является файлом захвата.
+        :raises OSError: Если файл не удалось открыть.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < FILE_HEADER.size:
+                raise ValueError(f"Файл не является файлом захвата: {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+        magic, wall_anchor_ns = FILE_HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Файл не является файлом захвата: {path}")
+        # Сдвиг отметок файла в часы текущего процесса
+        self._time_shift = wall_anchor_ns - WALL_CLOCK_ANCHOR_NS
+        # Идентификаторы линий по номерам в файле
+        self.links = {}
+        # Участки индекса (начало, конец, наименьшее и наибольшее время) и участки объявлений линий
+        self._segments = None
+        self._link_records = []
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Закрывает файл."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def indexed(self) -> bool:
+        """Есть ли у файла индекс."""
+        return self._segments is not None
+
+    def _load_index(self):
+        """Читает индекс файла захвата, если он есть и относится к этому файлу."""
+        try:
+            with open(index_path(self.path), "rb") as file:
+                index = file.read()
+        except OSError:
+            return
+        if len(index) < INDEX_HEADER.size or INDEX_HEADER.unpack_from(index) != (INDEX_MAGIC, self._time_shift
+                                                                                  + WALL_CLOCK_ANCHOR_NS):
+            return
+        # Оборванная последняя запись индекса отбрасывается
+        end = INDEX_HEADER.size + (len(index) - INDEX_HEADER.size) // INDEX_ENTRY.size * INDEX_ENTRY.size
+        size = len(self._map)
+        segments = []
+        for kind, _, _, _, start, stop, min_ns, max_ns in INDEX_ENTRY.iter_unpack(index[INDEX_HEADER.size:end]):
+            if stop > size:
+                break
+            if kind == INDEX_SEGMENT:
+                segments.append((start, stop, min_ns, max_ns))
+            elif kind == INDEX_LINK:
+                self._link_records.append((start, stop))
+        self._segments = segments
+
+    def _ranges(self, start_ns: int = None, end_ns: int = None) -> list:
+        """
+        Участки файла, в которых могут быть записи интервала времени.
+        Без индекса или без интервала - весь файл. Объявления линий из пропускаемых участков
+        читаются заранее по индексу.
+        :param start_ns: Начало интервала (time.monotonic_ns() текущего процесса), None - от начала файла.
+        :param end_ns: Конец интервала, не включая его, None - до конца файла.
+        :return: Список [начало, конец] участков по порядку.
+        """
+        size = len(self._map)
+        if self._segments is None or (start_ns is None and end_ns is None):
+            return [[FILE_HEADER.size, size]]
+        unpack_from = RECORD_HEADER.unpack_from
+        for start, stop in self._link_records:
+            index = unpack_from(self._map, start)[1]
+            self.links[index] = self._map[start + RECORD_HEADER.size:stop].decode("utf-8")
+        # Время в индексе записано в часах процесса, писавшего захват
+        low = -1 if start_ns is None else start_ns - self._time_shift
+        high = float("inf") if end_ns is None else end_ns - self._time_shift
+        ranges = []
+        for start, stop, min_ns, max_ns in self._segments:
+            if min_ns < high and max_ns >= low:
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1][1] = stop
+                else:
+                    ranges.append([start, stop])
+        # Записи после последнего участка индекса (запись захвата еще идет или была прервана)
+        tail = self._segments[-1][1] if self._segments else FILE_HEADER.size
+        if tail < size:
+            if ranges and ranges[-1][1] == tail:
+                ranges[-1][1] = size
+            else:
+                ranges.append([tail, size])
+        return ranges
+
+    def records(self, start_ns: int = None, end_ns: int = None):
+        """
+        Перебирает записи файла по порядку. Оборванная последняя запись пропускается.
+        :param start_ns: Начало интервала времени (time.monotonic_ns() текущего процесса), None - от начала файла.
+        :param end_ns: Конец интервала времени, не включая его, None - до конца файла.
+        :return: Генератор кортежей (тип, идентификатор линии, time.monotonic_ns(), данные).
+        """
+        data = self._map
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        time_shift = self._time_shift
+        links = self.links
+        low = -1 if start_ns is None else start_ns - time_shift
+        high = float("inf") if end_ns is None else end_ns - time_shift
+        for pos, size in self._ranges(start_ns, end_ns):
+            while pos + header_size <= size:
+                kind, index, _, rx_ns, length = unpack_from(data, pos)
+                start = pos + header_size
+                pos = start + length
+                if pos > size:
+                    break
+                if kind == KIND_LINK:
+                    links[index] = data[start:pos].decode("utf-8")
+                    continue
+                if low <= rx_ns < high:
+                    yield kind, links.get(index, ""), rx_ns + time_shift, data[start:pos]
+
+    def data_chunks(self, link: str = None, start_ns: int = None, end_ns: int = None):
+        """
+        Перебирает порции сырых данных одной линии (каждая линия разбирается своим обработчиком).
+        :param link: Идентификатор линии, по умолчанию линия первой порции файла (интервала).
+        :param start_ns: Начало интервала времени (time.monotonic_ns() текущего процесса), None - от начала файла.
+        :param end_ns: Конец интервала времени, не включая его, None - до конца файла.
+        :return: Генератор кортежей (time.monotonic_ns(), данные) - в виде, в каком их кладут в очередь данных.
+        """
+        # Порций много и они короткие, поэтому перебор записей здесь без промежуточного генератора
+        data = self._map
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        time_shift = self._time_shift
+        links = self.links
+        low = -1 if start_ns is None else start_ns - time_shift
+        high = float("inf") if end_ns is None else end_ns - time_shift
+        ranges = self._ranges(start_ns, end_ns)
+        link_index = None
+        if link is not None:
+            # Линия могла быть объявлена в пропущенном участке
+            link_index = next((index for index, name in links.items() if name == link), None)
+        for pos, size in ranges:
+            while pos + header_size <= size:
+                kind, index, _, rx_ns, length = unpack_from(data, pos)
+                start = pos + header_size
+                pos = start + length
+                if pos > size:
+                    break
+                if kind == KIND_DATA:
+                    if low <= rx_ns < high:
+                        if link_index is None and link is None:
+                            link_index = index
+                        if index == link_index:
+                            yield rx_ns + time_shift, data[start:pos]
+                elif kind == KIND_LINK:
+                    links[index] = data[start:pos].decode("utf-8")
+                    if link is not None and links[index] == link:
+                        link_index = index
+
+    def frames(self, link: str = None, start_ns: int = None, end_ns: int = None):
+        """Перебирает разобранные записи, сохраненные в файле (за интервал времени, если он задан)."""
+        for kind, record_link, rx_ns, payload in self.records(start_ns, end_ns):
+            if kind == KIND_FRAME and (link is None or record_link == link):
+                yield _unpack_frame(rx_ns, record_link, payload)
+
+    def first_ns(self) -> int:
+        """
+        Время приема первой записи файла (time.monotonic_ns() текущего процесса).
+        :raises ValueError: Если в файле нет записей.
+        """
+        if self._segments:
+            return min(min_ns for _, _, min_ns, _ in self._segments) + self._time_shift
+        for _, _, rx_ns, _ in self.records():
+            return rx_ns
+        raise ValueError(f"В файле захвата нет записей: {self.path}")
+
+    def time_of_day_ns(self, text: str) -> int:
+        """
+        Переводит время суток записи захвата в отметку файла.
+        :param text: Местное время ЧЧ:ММ:СС или ЧЧ:ММ:СС.ffffff; берется ближайшее к началу захвата
+                     (захват может переходить через полночь).
+        :return: time.monotonic_ns() текущего процесса.
+        :raises ValueError: Если время записано неверно или в файле нет записей.
+        """
+        time_format = "%H:%M:%S.%f" if "." in text else "%H:%M:%S"
+        time_of_day = datetime.datetime.strptime(text.strip(), time_format).time()
+        first_wall_ns = self.first_ns() + WALL_CLOCK_ANCHOR_NS
+        first = datetime.datetime.fromtimestamp(first_wall_ns // 1_000_000_000)
+        moment = datetime.datetime.combine(first.date(), time_of_day)
+        if moment < first - datetime.timedelta(hours=12):
+            moment += datetime.timedelta(days=1)
+        elif moment > first + datetime.timedelta(hours=12):
+            moment -= datetime.timedelta(days=1)
+        wall_ns = int(moment.timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+        return wall_ns - WALL_CLOCK_ANCHOR_NS
+
+    def time_window(self, start_text: str = None, end_text: str = None) -> tuple:
+        """
+        Переводит интервал времени суток в отметки файла.
+        :param start_text: Начало интервала ЧЧ:ММ:СС[.ffffff], пустое - от начала файла.
+        :param end_text: Конец интервала; время без долей секунды включает всю эту секунду. Пустое - до конца файла.
+        :return: Кортеж (начало, конец) для records() и data_chunks(), None - без ограничения.
+        :raises ValueError: Если время записано неверно или в файле нет записей.
+        """
+        start_ns = self.time_of_day_ns(start_text) if start_text and start_text.strip() else None
+        end_ns = None
+        if end_text and end_text.strip():
+            end_ns = self.time_of_day_ns(end_text)
+            if "." not in end_text:
+                end_ns += 1_000_000_000
+            # Интервал через полночь
+            if start_ns is not None and end_ns <= start_ns:
+                end_ns += 24 * 3600 * 1_000_000_000
+        return start_ns, end_ns
@@ -0,0 +1,314 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+from async_transport import TransportCore
+from bounded_queue import BoundedQueue
+from data_processing import DataProcessing
+from orion2_framer import Orion2Framer
+from ring_buffer import RingBuffer
+from serial_port import SerialPort
+from udp_connection import UDPConnection
+
+
+class _Encoding:
+    """Значение кодировки линии с интерфейсом переменной tkinter (get)."""
+
+    def __init__(self, value: str):
+        self._value = value
+
+    def get(self) -> str:
+        return self._value
+
+
+class LinkContext:
+    """
+    Состояние одной линии связи для DataProcessing вместо окна программы:
+    счетчики и мак-адреса по адресам абонентов, кодировка и получатели записей.
+    """
+
+    def __init__(self, manager, link_id: str, encoding: str, interface: str):
+        """Инициализация объекта LinkContext."""
+        self.link_id = link_id
+        self.encoding = _Encoding(encoding)
+        self.selected_tab = interface
+        self.req_ack_counters = [0] * 32  # Счетчики REQ/ACK для каждого адреса
+        self.search_counters = [0] * 32  # Счетчики SEARCH для каждого адреса
+        self.get_id_counters = [0] * 32  # Счетчики GETID для каждого адреса
+        self.mac_addr = [""] * 32  # Мак-адрес GIVEADDR для каждого адреса
+        self._manager = manager
+
+    def update_data_area(self, frame):
+        """Помечает запись линией и передает ее на слияние потоков записей."""
+        frame.link = self.link_id
+        self._manager.merge_frame(frame)
+
+    def update_message_area(self, message: str):
+        """Передает сообщение линии с ее идентификатором."""
+        self._manager.report(f"[{self.link_id}] {message}")
+
+
+class CaptureLink:
+    """Линия связи: источник данных, очередь, обработчик и его состояние."""
+
+    def __init__(self, manager, link_id: str, kind: str, settings: dict, encoding: str):
+        """
+        Инициализация объекта CaptureLink.
+        :param manager: Менеджер захвата, которому принадлежит линия.
+        :param link_id: Идентификатор линии в записях.
+        :param kind: Тип источника ("serial" или "udp").
+        :param settings: Параметры открытия источника.
+        :param encoding: Кодировка данных линии.
+        """
+        self.link_id = link_id
+        self.kind = kind
+        self.settings = settings
+        self.encoding = encoding
+        interface = "UDP" if kind == "udp" else "COM-порт"
+        self.context = LinkContext(manager, link_id, encoding, interface)
+        if kind == "serial" and manager.ring_size:
+            # Пакеты Orion2 разбираются прямо в памяти кольцевого буфера, при переполнении данные теряются
+            self.data_queue = RingBuffer(manager.ring_size, name=link_id)
+        else:
+            self.data_queue = BoundedQueue(max_bytes=manager.queue_max_bytes, policy=manager.queue_policy,
+                                           name=f"данных {link_id}", spill_dir=manager.spill_dir)
+        # Записи линии идут в общий поток слияния, собственная очередь лога не нужна
+        self.processing = DataProcessing(self.data_queue, None, self.context)
+        # Простаивающая линия подтверждает время для слияния с периодом окна упорядочивания
+        self.processing.read_timeout = max(manager.reorder_window_ns / 1e9, 0.001)
+        # Сырые данные линии пишутся в общий файл захвата под идентификатором линии
+        self.processing.capture_writer = manager.capture_writer
+        self.processing.capture_link = link_id
+        on_error = self.context.update_message_area
+        if kind == "serial":
+            self.source = SerialPort(self.data_queue, on_error=on_error, transport_core=manager.transport_core)
+        else:
+            self.source = UDPConnection(self.data_queue, on_error=on_error, transport_core=manager.transport_core)
+
+    def open(self):
+        """Запускает обработку и открывает источник данных."""
+        if self.kind == "serial":
+            # Последний пакет пачки выдается по паузе на линии, рассчитанной по ее скорости
+            settings = self.settings
+            idle_timeout = Orion2Framer.idle_timeout(settings["baudrate"], settings["bytesize"],
+                                                     settings["parity"], settings["stopbits"])
+            self.processing.start_data_processing(self.encoding, self.context.selected_tab, idle_timeout)
+        else:
+            self.processing.start_data_processing(self.encoding, self.context.selected_tab)
+        if self.kind == "serial":
+            self.source.open_port(**self.settings)
+        else:
+            self.source.open_connection(**self.settings)
+
+    def close(self):
+        """Закрывает источник данных и останавливает обработку."""
+        self.close_source()
+        self.processing.stop_data_processing()
+
+    def close_source(self):
+        """Закрывает источник данных, обработка продолжает разбирать уже принятые данные."""
+        if self.kind == "serial":
+            self.source.close_port()
+        else:
+            self.source.close_connection()
+
+    def is_open(self) -> bool:
+        """Проверяет, открыт ли источник данных."""
+        return self.source.is_open()
+
+
+class CaptureManager:
+    """
+    Одновременный захват нескольких COM-портов и UDP соединений.
+    У каждой линии свой обработчик с собственными ключами и счетчиками, записи всех линий
+    сливаются в один поток, упорядоченный по времени, и помечаются идентификатором линии.
+    Запись выдается, когда обработчики всех линий прошли время ее приема (low_watermark_ns):
+    ни одна линия уже не выдаст более раннюю запись, как бы она ни отставала.
+    Чтение всех источников выполняется общим циклом событий TransportCore.
+    """
+
+    def __init__(self, logger_queue=None, on_frame=None, on_message=None, reorder_window: float = 0.05,
+                 transport_core=None, queue_max_bytes: int = 16 * 1024 * 1024,
+                 queue_policy: str = BoundedQueue.SPILL, spill_dir: str = None, capture_writer=None,
+                 ring_size: int = 0):
+        """
+        Инициализация объекта CaptureManager.
+        :param logger_queue: Очередь лог-файла для слитого потока записей.
+        :param on_frame: Callback, получающий каждую запись слитого потока (например, вывод на экран).
+        :param on_message: Callback для сообщений и ошибок линий.
+        :param reorder_window: Окно упорядочивания в секундах: период, с которым простаивающая линия
+                               подтверждает, что более ранних записей у нее не будет. Запись задерживается
+                               не больше чем на это время сверх отставания самой медленной линии.
+        :param transport_core: Общий цикл событий; если не задан, создается собственный.
+        :param queue_max_bytes: Максимальный объем очереди данных каждой линии в байтах (0 - без ограничения).
+        :param queue_policy: Политика переполнения очередей данных линий.
+        :param spill_dir: Директория временных файлов сброса очередей на диск.
+        :param capture_writer: Запись сырых данных всех линий в файл захвата (CaptureWriter),
+                               запуском и остановкой записи управляет владелец.
+        :param ring_size: Размер кольцевого буфера (RingBuffer) линий COM-портов в байтах
+                          вместо очереди данных (0 - очередь).
+        """
+        self.logger_queue = logger_queue
+        self._on_frame = on_frame
+        self._on_message = on_message
+        self.reorder_window_ns = int(reorder_window * 1e9)
+        self.queue_max_bytes = queue_max_bytes
+        self.queue_policy = queue_policy
+        self.spill_dir = spill_dir
+        self.capture_writer = capture_writer
+        self.ring_size = ring_size
+        self._own_core = transport_core is None
+        self.transport_core = transport_core or TransportCore()
+
+        # Линии связи по идентификатору
+        self.links = {}
+
+        # Куча записей (время приема, порядковый номер, запись) для слияния по времени
+        self._heap = []
+        self._seq = itertools.count()
+        self._merge_lock = threading.Condition()
+        self._merge_thread = None
+        self._merge_event = threading.Event()
+
+        # Статистика слияния
+        self.merged_frames = 0
+        self.max_heap_size = 0
+
+    def add_serial_link(self, link_id: str, port: str, baudrate: int = 115200, bytesize: int = 8,
+                        parity: str = "N", stopbits: int = 1, encoding: str = "O2") -> CaptureLink:
+        """
+        Добавляет линию COM-порта.
+        :raises ValueError: Если линия с таким идентификатором уже есть.
+        """
+        settings = {"port": port, "baudrate": baudrate, "bytesize": bytesize, "parity": parity,
+                    "stopbits": stopbits}
+        return self._add_link(CaptureLink(self, link_id, "serial", settings, encoding))
+
+    def add_udp_link(self, link_id: str, ip: str, port: int, encoding: str = "O2") -> CaptureLink:
+        """
+        Добавляет линию UDP.
+        :raises ValueError: Если линия с таким идентификатором уже есть.
+        """
+        return self._add_link(CaptureLink(self, link_id, "udp", {"ip": ip, "port": port}, encoding))
+
+    def _add_link(self, link: CaptureLink) -> CaptureLink:
+        """Регистрирует линию связи."""
+        if link.link_id in self.links:
+            raise ValueError(f"Линия {link.link_id} уже добавлена")
+        self.links[link.link_id] = link
+        return link
+
+    def start(self):
+        """Запускает слияние записей и открывает все линии. Линии с ошибкой открытия пропускаются."""
+        self.transport_core.start()
+        if not self._merge_thread or not self._merge_thread.is_alive():
+            self._merge_event.clear()
+            self._merge_thread = threading.Thread(target=self._merge_worker, daemon=True)
+            self._merge_thread.start()
+        for link in self.links.values():
+            try:
+                link.open()
+            except Exception as e:
+                link.processing.stop_data_processing()
+                self.report(f"[{link.link_id}] Ошибка открытия линии: {e}")
+
+    def stop(self, drain_timeout: float = 10.0):
+        """
+        Закрывает все линии, разбирает принятые данные и выдает оставшиеся записи.
+        :param drain_timeout: Время на разбор данных каждой линии (в том числе сброшенных на диск)
+                              в секундах, после него обработка линии останавливается без разбора.
+        """
+        # Сначала закрываем источники, чтобы новые данные не поступали
+        for link in self.links.values():
+            link.close_source()
+        # Обработчики разбирают очереди до конца и выдают незавершенные пакеты
+        for link in self.links.values():
+            link.processing.stop_data_processing(drain=True, timeout=drain_timeout)
+            if link.data_queue.qsize():
+                self.report(f"[{link.link_id}] Очередь данных не разобрана за {drain_timeout:g} с")
+        self._merge_event.set()
+        with self._merge_lock:
+            self._merge_lock.notify()
+        if self._merge_thread and self._merge_thread.is_alive():
+            self._merge_thread.join(timeout=1.0)
+        self._merge_thread = None
+        # Записи, поступившие после остановки потока слияния, тоже не теряем
+        self._emit_ready(flush=True)
+        if self._own_core:
+            self.transport_core.stop()
+
+    def merge_frame(self, frame):
+        """Принимает запись линии в поток слияния, упорядочивая по времени приема ее первого байта."""
+        received = frame.timestamp if isinstance(frame.timestamp, int) else time.monotonic_ns()
+        with self._merge_lock:
+            heapq.heappush(self._heap, (received, next(self._seq), frame))
+            if len(self._heap) > self.max_heap_size:
+                self.max_heap_size = len(self._heap)
+
+    def report(self, message: str):
+        """Передает сообщение линии получателю сообщений."""
+        if self._on_message:
+            self._on_message(message)
+        else:
+            print(message)
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику захвата по линиям и слиянию."""
+        links = {}
+        for link_id, link in self.links.items():
+            links[link_id] = {
+                "open": link.is_open(),
+                "queue": link.data_queue.get_stats(),
+                "batch": link.processing.get_batch_stats(),
+            }
+        return {"links": links, "merged_frames": self.merged_frames, "max_heap_size": self.max_heap_size}
+
+    def new_loss_texts(self) -> list:
+        """Возвращает строки о новых потерях и сбросе на диск очередей данных линий."""
+        texts = []
+        for link in self.links.values():
+            # Кольцевой буфер на диск не сбрасывается
+            if isinstance(link.data_queue, BoundedQueue):
+                texts.append(link.data_queue.new_spill_text())
+            texts.append(link.data_queue.new_loss_text())
+        return [text for text in texts if text]
+
+    def _low_watermark(self):
+        """
+        Время приема, раньше которого ни одна работающая линия больше не выдаст записей.
+        :return: Наименьшее время по линиям, None - ни одна линия не обрабатывает данные.
+        """
+        watermarks = [link.processing.low_watermark_ns for link in self.links.values()]
+        watermarks = [watermark for watermark in watermarks if watermark is not None]
+        return min(watermarks) if watermarks else None
+
+    def _merge_worker(self):
+        """Выдает записи, которые все линии уже прошли по времени приема, в порядке времени приема."""
+        interval = max(self.reorder_window_ns / 2e9, 0.001)
+        while not self._merge_event.is_set():
+            with self._merge_lock:
+                self._merge_lock.wait(interval)
+            self._emit_ready()
+
+    def _emit_ready(self, flush: bool = False):
+        """Забирает из кучи готовые записи и передает их получателям."""
+        watermark = self._low_watermark()
+        # Без работающих линий новых записей не будет, выдаем все
+        if watermark is None:
+            flush = True
+        ready = []
+        with self._merge_lock:
+            heap = self._heap
+            while heap and (flush or heap[0][0] < watermark):
+                ready.append(heapq.heappop(heap)[2])
+        for frame in ready:
+            if self.logger_queue is not None:
+                try:
+                    self.logger_queue.put(frame)
+                except queue.Full:
+                    self.report("Очередь лога заполнена")
+            if self._on_frame:
+                self._on_frame(frame)
+        self.merged_frames += len(ready)
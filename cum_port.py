@@ -6,10 +6,15 @@ import queue
 from abc import ABC, abstractmethod
 
 # Свои реализации
+import bounded_queue
+import capture_file
 import serial_port
 import file_logger
+import file_replay
+import log_archiver
 import data_processing
 import udp_connection
+import orion2_framer
 
 class GUIManager(ABC):
     """Абстрактный класс для управления GUI."""
@@ -20,8 +25,8 @@ class GUIManager(ABC):
         pass
 
     @abstractmethod
-    def update_data_area(self, formatted_data: str):
-        """Обновляет область данных."""
+    def update_data_area(self, frame):
+        """Обновляет область данных записью разобранного пакета."""
         pass
 
     @abstractmethod
@@ -88,6 +93,9 @@ __version__ = "1.10"
 __app_name__ = "CUM-port"
 
 class SerialMonitorGUI:
+    # Максимальное количество элементов очереди гуи
+    GUI_QUEUE_SIZE = 20000
+
     def __init__(self, gui, logger_queue, data_proc_queue):
         # Кнопки
         self.open_button = None
@@ -114,7 +122,21 @@ class SerialMonitorGUI:
         self.serial_port = serial_port.SerialPort(data_queue, on_error=self.update_message_area)
         self.udp_connection = udp_connection.UDPConnection(data_queue, on_error=self.update_message_area)
         self.data_proc = data_processing.DataProcessing(data_proc_queue=data_queue, logger_queue=log_queue, main_gui=self)
-        self.file_logger = file_logger.FileLogger(log_queue, on_error=self.update_message_area, on_file_size_exceeded=self._restart_logger)
+        # Чтение файлов в очередь данных отдельным потоком
+        self.file_replay = file_replay.FileReplay(data_queue, on_error=self.update_message_area,
+                                                  on_progress=self._on_replay_progress,
+                                                  on_finished=self._on_replay_finished)
+        # Законченные при смене файла логи сжимаются отдельным потоком
+        self.log_archiver = log_archiver.LogArchiver(on_error=self.update_message_area)
+        self.log_archiver.start()
+        self.file_logger = file_logger.FileLogger(log_queue, on_error=self.update_message_area, on_file_rotated=self._on_log_rotated,
+                                                  archiver=self.log_archiver)
+        # Запись сырых данных в двоичный файл захвата, включается галочкой
+        self.capture_writer = capture_file.CaptureWriter(on_error=self.update_message_area)
+        self.capture_enabled = tk.BooleanVar(value=False)
+        # Скорость воспроизведения файла относительно записи, 0 - без пауз
+        self.replay_speeds = {"макс.": 0, "1x": 1, "10x": 10}
+        self.replay_speed = tk.StringVar(value="макс.")
 
         # Логическое состояние соединений
         self.com_port_open = False
@@ -148,8 +170,10 @@ class SerialMonitorGUI:
         self.gui.geometry("1260x600")
         self.gui.minsize(1260,600)
 
-        # Очередь для элементов GUI
-        self.gui_queue = queue.Queue()
+        # Очередь для элементов GUI, при переполнении вытесняются старые записи
+        self.gui_queue = bounded_queue.BoundedQueue(
+            maxsize=self.GUI_QUEUE_SIZE, policy=bounded_queue.BoundedQueue.DROP_OLDEST, name="гуи"
+        )
         # GUI по таймер
         self.gui_update_timeout = 200
         # Обновляем GUI по таймеру
@@ -290,12 +314,26 @@ class SerialMonitorGUI:
         double_column_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nwe")
 
         # Инфо по работе с файлом
-        ttk.Label(file_frame, text="Парсинг сырых данных из файла.\nДанные можно записать из интерфейса\nвыбрав кодировку HEX.").grid(row=0, column=0, sticky="w")
+        ttk.Label(file_frame, text="Парсинг сырых данных из файла.\nДанные можно записать из интерфейса\nвыбрав кодировку HEX или галочкой\nзаписи захвата (.o2cap).").grid(row=0, column=0, sticky="w")
 
         # Добавляем кнопку "Открыть файл"
         clear_button = ttk.Button(file_frame, text="Открыть файл", command=self._open_file, width=20)
         clear_button.grid(row=1, column=0, padx=5, pady=5, sticky="we")
 
+        # Интервал времени для файлов захвата: пустые поля - весь файл
+        window_frame = ttk.Frame(file_frame)
+        window_frame.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(window_frame, text="Захват с:").grid(row=0, column=0, sticky="w")
+        self.capture_from_entry = ttk.Entry(window_frame, width=10)
+        self.capture_from_entry.grid(row=0, column=1, padx=5)
+        ttk.Label(window_frame, text="по:").grid(row=0, column=2, sticky="w")
+        self.capture_to_entry = ttk.Entry(window_frame, width=10)
+        self.capture_to_entry.grid(row=0, column=3, padx=5)
+        # Скорость: с паузами между порциями, как они были приняты, или без пауз
+        ttk.Label(window_frame, text="Скорость:").grid(row=1, column=0, sticky="w")
+        ttk.Combobox(window_frame, textvariable=self.replay_speed, values=list(self.replay_speeds), width=7,
+                     state="readonly").grid(row=1, column=1, padx=5, pady=5, sticky="w")
+
         # Рамка "Настройки окна вывода"
         screen_frame = ttk.LabelFrame(double_column_frame, text="Настройки окна вывода:")
         screen_frame.grid(row=0, column=0, padx=5, pady=5, sticky="nwe")
@@ -327,6 +365,10 @@ class SerialMonitorGUI:
         autoscroll_checkbox = ttk.Checkbutton(scroll_control_frame, text="Автопрокрутка", variable=self.autoscroll_enabled)
         autoscroll_checkbox.pack(side=tk.LEFT)
 
+        # Галочка записи сырых данных в файл захвата
+        capture_checkbox = ttk.Checkbutton(screen_frame, text="Запись захвата", variable=self.capture_enabled)
+        capture_checkbox.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+
         # Рамка "Счетчики сервисных запросов О2"
         counter_frame = ttk.LabelFrame(fixed_frame, text="Счетчики сервисных запросов О2")
         counter_frame.grid(row=4, column=0, padx=10, pady=5, sticky="nwe")
@@ -479,8 +521,10 @@ class SerialMonitorGUI:
         if self.udp_port_open:
             self._disconnect_udp()
 
-        # Останавливаем логгер
+        # Останавливаем чтение файла, логгер и дожимаем законченные файлы
+        self.file_replay.stop()
         self.file_logger.stop()
+        self.log_archiver.stop()
 
         # Очищаем очереди
         self.log_queue.queue.clear()
@@ -558,7 +602,7 @@ class SerialMonitorGUI:
         self._check_encoding()
 
     def _open_file(self):
-        """Открывает текстовый файл, читает его содержимое и отправляет данные в очередь."""
+        """Открывает файл и запускает его чтение в очередь данных отдельным потоком."""
         if self.com_port_open or self.udp_port_open or self.mac_addr[0]:
             self.update_message_area(f"Для открытия файла, закройте соединение если работали с портом, если работали с файлом очистите экран.")
         else:
@@ -566,46 +610,77 @@ class SerialMonitorGUI:
                 # Открываем диалог выбора файла
                 file_path = filedialog.askopenfilename(
                     title="Открыть файл",
-                    filetypes=(("Text files", "*.txt"), ("All files", "*.*"))
+                    filetypes=(("Text files", "*.txt *.txt" + log_archiver.COMPRESSED_EXTENSION), ("Capture files", "*" + capture_file.EXTENSION),
+                               ("All files", "*.*"))
                 )
                 if not file_path:
                     return  # Если файл не выбран, ничего не делать
 
-                # Читаем файл построчно
-                with open(file_path, "r", encoding="utf-8") as file:
-                    buffer = []
-                    for line in file:
-                        # Удаляем символы новой строки и пробелы
-                        stripped_line = line.strip()
-                        if stripped_line:
-                            # Обрезка времени если данные сняты этой прогой через хекс
-                            if stripped_line[2:3] == ':':
-                                stripped_line = stripped_line[17:]
-                            # Преобразуем строку в байты (если строка содержит HEX-представление данных)
-                            try:
-                                buffer.append(bytes.fromhex(stripped_line))
-                            except ValueError:
-                                self.update_message_area(f"Ошибка преобразования строки в байты: {stripped_line}")
-                    # Добавляем все данные в очередь блоками
-                    for chunk in buffer:
-                        self.data_queue.put(chunk)
-                self.file_open = True
+                start_ns = end_ns = None
+                if capture_file.is_capture_file(file_path):
+                    # Порции захвата идут в очередь как есть, с временем их приема
+                    with capture_file.CaptureReader(file_path) as reader:
+                        start_ns, end_ns = self._capture_window(reader)
 
                 # Обновляем сообщение в GUI
-                self.update_message_area(f"Файл {file_path} успешно прочитан и данные добавлены в очередь.")
+                self.update_message_area(f"Чтение файла {file_path}")
                 # Чистим экран перед открытием нового файла
                 self._clear_screen()
-                # Запускаем поток обработки данных, если он еще не работает
+                # Логгер при чтении файла не запущен: без очереди лога обработчик не ждет ее освобождения
+                self.data_proc.logger_queue = None
+                # Запускаем поток обработки данных, если он еще не работает, и чтение файла
                 self.data_proc.start_data_processing()
+                self.file_replay.start(file_path, start_ns, end_ns, speed=self.replay_speeds[self.replay_speed.get()])
+                self.file_open = True
             except Exception as e:
                 self.update_message_area(f"Ошибка при чтении файла: {e}")
 
-    def _restart_logger(self):
-        """Перезапускает логгер с созданием нового файла."""
-        self.file_logger.stop()
-        self.file_logger.start()
-        self._clear_screen()
-        self.update_message_area("Размер лог-файла превысил 5 МБ. Очищены счетчики и создан новый файл.")
+    def _capture_window(self, reader):
+        """
+        Читает интервал времени захвата из полей ввода.
+        :return: Кортеж (начало, конец) в отметках файла, None - без ограничения.
+        :raises ValueError: Если время введено неверно.
+        """
+        start_text = self.capture_from_entry.get()
+        end_text = self.capture_to_entry.get()
+        try:
+            return reader.time_window(start_text, end_text)
+        except ValueError:
+            raise ValueError(f"неверный интервал захвата '{start_text}' - '{end_text}', ожидается ЧЧ:ММ:СС") from None
+
+    def _on_replay_progress(self, read_bytes: int, total_bytes: int, rate: float):
+        """Сообщает ход чтения файла (вызывается из потока чтения)."""
+        percent = read_bytes * 100 // total_bytes if total_bytes else 100
+        self.update_message_area(f"Прочитано {percent}% файла, {rate / (1024 * 1024):.1f} МБ/с")
+
+    def _on_replay_finished(self, chunks: int, data_bytes: int, seconds: float):
+        """Сообщает о завершении чтения файла (вызывается из потока чтения)."""
+        message = f"Файл прочитан: порций {chunks}, байт {data_bytes} за {seconds:.1f} с."
+        if self.file_replay.speed:
+            message += f" Наибольшее отставание от записи: {self.file_replay.max_late * 1000:.1f} мс."
+        self.update_message_area(message)
+
+    def _start_capture(self):
+        """Запускает запись сырых данных в файл захвата, если она включена галочкой."""
+        self.data_proc.capture_writer = None
+        if not self.capture_enabled.get():
+            return
+        try:
+            self.capture_writer.start()
+        except OSError:
+            return
+        self.data_proc.capture_writer = self.capture_writer
+
+    def _stop_capture(self):
+        """Останавливает запись захвата и дописывает файл."""
+        self.data_proc.capture_writer = None
+        if self.capture_writer.is_running:
+            self.capture_writer.stop()
+
+    def _on_log_rotated(self, path: str):
+        """Сообщает о переходе логгера на новый файл (вызывается из потока записи лога)."""
+        limit_mb = self.file_logger.file_size_limit / (1024 * 1024)
+        self.update_message_area(f"Размер лог-файла превысил {limit_mb:g} МБ. Создан новый файл: {path}")
 
     def _toggle_column_visibility(self, column_id):
         """Переключает видимость столбца в зависимости от состояния галочки."""
@@ -665,7 +740,9 @@ class SerialMonitorGUI:
                 if self.udp_connection.is_open():
                     self.udp_port_open = True
                     self.udp_button.config(text="Отключить", command=self._disconnect_udp)
-                    # Запускаем поток обработчика
+                    # Запускаем запись захвата и поток обработчика, записи идут и в лог
+                    self._start_capture()
+                    self.data_proc.logger_queue = self.log_queue
                     self.data_proc.start_data_processing()
                     # Запускаем поток логера
                     self.file_logger.start()
@@ -678,6 +755,7 @@ class SerialMonitorGUI:
         self.udp_port_open = False
         self.udp_connection.close_connection()
         self.data_proc.stop_data_processing()
+        self._stop_capture()
         self.file_logger.stop()
         self.udp_button.config(text="Подключиться", command=self._connect_udp)
         self.update_message_area("UDP отключен")
@@ -701,8 +779,12 @@ class SerialMonitorGUI:
             if self.serial_port.is_open:
                 self.com_port_open = True
                 self.open_button.config(text="Закрыть порт", command=self._close_com_port)
-                # Запускаем поток обработчика
-                self.data_proc.start_data_processing()
+                # Запускаем запись захвата и поток обработчика, последний пакет пачки выдается по паузе на линии
+                self._start_capture()
+                self.data_proc.logger_queue = self.log_queue
+                idle_timeout = orion2_framer.Orion2Framer.idle_timeout(self.baud_rate.get(), self.databits.get(),
+                                                                       self.parity.get(), self.stop_bits.get())
+                self.data_proc.start_data_processing(idle_timeout=idle_timeout)
                 # Запускаем поток логера
                 self.file_logger.start()
                 self.update_message_area(f"Порт {self.port.get()} открыт.")
@@ -713,6 +795,7 @@ class SerialMonitorGUI:
         self.com_port_open = False
         self.serial_port.close_port()
         self.data_proc.stop_data_processing()
+        self._stop_capture()
         self.file_logger.stop()
         self.open_button.config(text="Открыть порт", command=self._open_com_port)
         self.update_message_area("Порт закрыт.")
@@ -785,28 +868,14 @@ class SerialMonitorGUI:
         # Запрещаем редактирование
         self.message_area.config(state=tk.DISABLED)
 
-    def update_data_area(self, formatted_data):
+    def update_data_area(self, frame):
         """Запись в очередь гуи для окна вывода"""
-        self.gui_queue.put(('text', formatted_data))
+        self.gui_queue.put(('text', frame))
 
-    def _update_data_area(self, formatted_data):
+    def _update_data_area(self, frame):
         """Обновляет таблицу вывода данными."""
-        # Разделяем данные по формату
-        parts = formatted_data.split('@', 6)
-        if len(parts) == 7:
-            values = (
-                parts[0],  # Время
-                parts[1],  # Сырые данные
-                parts[2],  # Длина
-                parts[3],  # Номер пакета
-                parts[4],  # Направление
-                parts[5],  # Тип пакета
-                parts[6]  # Расшифрованные данные
-            )
-        elif len(parts) == 2:
-            values = (parts[0], parts[1], "", "", "", "", "")
-        else:
-            values = ("", "", "", "", "", "", "")
+        # Значения столбцов формируются только для отображаемых записей
+        values = frame.columns()
 
         # Добавляем строку в таблицу
         item = self.tree.insert('', 'end', values=values)
@@ -854,12 +923,14 @@ class SerialMonitorGUI:
             if accumulated_message_data:
                 self._update_message_area("\n".join(accumulated_message_data))
             if accumulated_text_data:
-                for text_data in accumulated_text_data:
+                # Записи, которые сразу вытеснятся из таблицы, не форматируем
+                for text_data in accumulated_text_data[-self.MAX_TABLE_SIZE:]:
                     self._update_data_area(text_data)
             self._update_counters()
+        self._report_queue_losses()
         if self.file_open:
             # Стираем флаг обновления гуи после открытия файла
-            if self.data_queue.empty() and self.gui_queue.empty():
+            if not self.file_replay.is_running and self.data_queue.empty() and self.gui_queue.empty():
                 self.update_message_area("Расшифровка файла завершена")
                 self.file_open = False
                 # Останавливаем поток после расшифровки файла
@@ -867,16 +938,37 @@ class SerialMonitorGUI:
         # Повторный вызов отрисовки
         self.gui.after(self.gui_update_timeout, self._process_gui_queue)
 
-# Очередь логера
-log_queue = queue.Queue()
-# Очередь данных последовательного порта
-data_queue = queue.Queue()
-# Создаем главное окно
-main = tk.Tk()
-# Создаем один экземпляр GUI
-app = SerialMonitorGUI(main, logger_queue=log_queue, data_proc_queue=data_queue)
-# Запускаем главный цикл
-main.mainloop()
+    def _report_queue_losses(self):
+        """Выводит новые потери очередей и их сброс на диск в информационную строку и в лог-файл."""
+        for data_queue in (self.data_queue, self.log_queue, self.gui_queue, self.capture_writer.queue):
+            if not hasattr(data_queue, "new_loss_text"):
+                continue
+            for message in (data_queue.new_spill_text(), data_queue.new_loss_text()):
+                if not message:
+                    continue
+                self.update_message_area(message)
+                if not self.file_logger.is_running:
+                    continue
+                try:
+                    # Гуи не ждет освобождения очереди лога
+                    self.log_queue.put(f"{datetime.datetime.now().strftime('%H:%M:%S.%f')}  {message}", block=False)
+                except queue.Full:
+                    pass
+
+if __name__ == "__main__":
+    # Очередь логера: обработчик ждет запись в файл, записи не теряются.
+    # Пишут в нее, только пока запущен логгер (порт или UDP открыты), при чтении файла записи в лог не идут
+    log_queue = bounded_queue.BoundedQueue(maxsize=100000, policy=bounded_queue.BoundedQueue.BLOCK, name="лога")
+    # Очередь данных последовательного порта: если обработка отстает, данные сверх порога уходят на диск
+    data_queue = bounded_queue.BoundedQueue(
+        max_bytes=16 * 1024 * 1024, policy=bounded_queue.BoundedQueue.SPILL, name="данных"
+    )
+    # Создаем главное окно
+    main = tk.Tk()
+    # Создаем один экземпляр GUI
+    app = SerialMonitorGUI(main, logger_queue=log_queue, data_proc_queue=data_queue)
+    # Запускаем главный цикл
+    main.mainloop()
 
 # Отладка
 # py -m cProfile -o profile_output.prof cum_port.py
@@ -1,7 +1,16 @@
-import datetime
 import queue
 import threading
-from Crypto.Cipher import AES
+import time
+
+from decoded_frame import DecodedFrame
+from orion2_crypto import Orion2Cipher
+from orion2_framer import Orion2Framer
+from orion2_keys import KeyState
+from ring_buffer import RingBuffer
+
+# Биты байта флагов заголовка пакета: данные шифрованы (SMode) и шифрованы рабочим ключом (WKey)
+FLAG_SMODE = 0x02
+FLAG_WKEY = 0x04
 
 """
 def calc_crc16(old_crc, in_byte):
@@ -40,6 +49,8 @@ class DataProcessing:
         # Поток обработки данных
         self.data_process_thread = None
         self.data_process_event = threading.Event()
+        # Остановка после разбора всех данных очереди
+        self.data_drain_event = threading.Event()
 
         # Очереди
         self.data_proc_queue = data_proc_queue
@@ -48,24 +59,18 @@ class DataProcessing:
         # Интерфейс пользователя
         self.main_gui = main_gui
 
-        # Флаги данных в заголовке пакета
+        # Флаги данных в заголовке пакета, от старшего бита к младшему
         self.packet_flags = ["SAF", "DAF", "Ackn", "PFirst", "PSyn", "WKey", "SMode", "Reserv"]
-        # Счетчик мастер ключа СЧМК
-        self.master_key_counter = [""] * 32
+        # Мак-адреса, ключи и счетчики СЧМК/СЧРК для каждого адреса
+        self.key_states = [KeyState() for _ in range(32)]
+        # Индекс адресов абонентов по мак-адресу из пакетов GIVEADDR
+        self.mac_index = {}
         # Флаг получения СЧМК, введен т.к. счетчик может быть 0, и его пустоту никак не проверить
         self.new_mkey_saved = False
         # Мастер ключ
-        self.master_key = "A4955A7C0C51939E863C135FF468693D"
-        # Рабочий ключ и его счетчик СЧРК для расшифровки исходящего пакета
-        self.work_key_out_counter = [""] * 32
-        self.work_key_out = [""] * 32
-        # Рабочий ключ и его счетчик СЧРК для расшифровки входящего пакета
-        self.work_key_in_counter = [""] * 32
-        self.work_key_in = [""] * 32
+        self.master_key = bytes.fromhex("A4955A7C0C51939E863C135FF468693D")
         # Флаг получения СЧРК, введен т.к. счетчик может быть 0, и его пустоту никак не проверить
         self.new_wkey_saved = False
-        # Мак-адрес GIVEADDR в литл-индиан как в пакете
-        self.give_addr = [""] * 32
         # Список типов пакетов
         self.packet_types = {
             0: "ACK_SERV+",
@@ -87,8 +92,25 @@ class DataProcessing:
             4: "(CmdResp)+",
             6: "(UMsg)+"
         }
+        # Квитанции успешного приема в конце пакетов DATA0 и DATA1
+        self.data_acks = {0x2F: 0x4F, 0x3F: 0x5F}
+        # Строки флагов заголовка для каждого значения байта флагов
+        self.flag_texts = self._build_flag_texts(self.packet_flags)
+        # Подтипы шифрованных пакетов для каждого значения 6 младших бит
+        self.serv_cmd_texts = self._build_subtype_texts(self.serv_cmd_types)
+        self.data_cmd_texts = self._build_subtype_texts(self.data_cmd_types)
+        # Обработчики пакетов по управляющему байту, по умолчанию пакет разбирается как пакет данных
+        self.frame_handlers = [self._on_other_frame] * 256
+        # Пакеты IN запросы, DATA0 и DATA1, SEARCH и GETID
+        self.register_frame_handler(0x1F, self._on_request_frame)
+        self.register_frame_handler(0x2F, self._on_data_frame)
+        self.register_frame_handler(0x3F, self._on_data_frame)
+        self.register_frame_handler(0x8F, self._on_search_frame)
+        self.register_frame_handler(0xAF, self._on_get_id_frame)
         # Переменная для мак-адресов
-        self.mac = ["00:00:00:00:00:00"] * 2
+        self.mac = [bytes(6)] * 2
+        # Начало вектора расшифровки saf+daf текущего пакета
+        self.iv_prefix = bytes(12)
         # Счетчик для пользовательского фильтра
         self.counter_custom = 0
 
@@ -96,122 +118,361 @@ class DataProcessing:
         # Длина в байтах обрезки не шифрованных кодировок (ASCII и HEX)
         self.unparsed_encoding_data_size = 100
 
-        # Переменная для хранения отметки времени
-        self.timestamp = ""
-
-    def start_data_processing(self):
-        """Запуск отдельного потока для обработки данных"""
+        # Время приема (time.monotonic_ns()) первого байта текущей записи, форматируется только при выводе
+        self.timestamp = 0
+
+        # Сборщик пакетов Orion2 из потока байт
+        self.orion2_framer = Orion2Framer()
+        # Пауза на линии в секундах, после которой незавершенный пакет Orion2 выдается без ожидания
+        # следующего маркера, задается при запуске обработки
+        self.frame_idle_timeout = 0.05
+        # Расшифровка AES-CFB с кешем ключей
+        self.cipher = Orion2Cipher()
+
+        # Запись сырых данных и разобранных записей в файл захвата (CaptureWriter) и идентификатор линии в нем
+        self.capture_writer = None
+        self.capture_link = ""
+
+        # Максимальное количество порций данных, забираемых из очереди за одно пробуждение
+        self.max_batch_chunks = 1024
+        # Статистика пакетного чтения очереди: пробуждения, порции, байты, максимум порций за пробуждение
+        self.batch_wakeups = 0
+        self.batch_chunks = 0
+        self.batch_bytes = 0
+        self.batch_max_chunks = 0
+
+        # Время ожидания данных в секундах, когда нет незавершенного пакета
+        self.read_timeout = 1.0
+        # Время приема (time.monotonic_ns()), раньше которого обработчик уже выдал все записи,
+        # None - обработка не запущена. Простаивающий обработчик продвигает его раз в read_timeout.
+        # По нему упорядочиваются записи нескольких линий (CaptureManager)
+        self.low_watermark_ns = None
+
+    def start_data_processing(self, encoding=None, interface=None, idle_timeout=0.05):
+        """
+        Запуск отдельного потока для обработки данных
+        :param encoding: Кодировка данных, по умолчанию выбранная в интерфейсе.
+        :param interface: Интерфейс ("UDP" или COM-порт), по умолчанию выбранная вкладка интерфейса.
+        :param idle_timeout: Пауза на линии в секундах, после которой выдается последний пакет пачки.
+                             Для COM-порта рассчитывается по скорости линии (Orion2Framer.idle_timeout).
+        """
         self.data_process_event.clear()
+        self.data_drain_event.clear()
+        self.frame_idle_timeout = idle_timeout
         # Получаем значение перед запуском потока
-        encoding = self.main_gui.encoding.get()
-        interface = self.main_gui.selected_tab
+        if encoding is None:
+            encoding = self.main_gui.encoding.get()
+        if interface is None:
+            interface = self.main_gui.selected_tab
         if not self.data_process_thread or not self.data_process_thread.is_alive():
+            # Незавершенный пакет прошлой сессии не склеиваем с новыми данными
+            self.orion2_framer.reset()
+            self.reset_batch_stats()
+            self.low_watermark_ns = time.monotonic_ns()
             self.data_process_thread = threading.Thread(
                 target=self.encodings_handler, args=(encoding,interface,), daemon=True
             )
             self.data_process_thread.start()
 
-    def stop_data_processing(self):
-        """Остановка потока обработки данных"""
-        self.data_process_event.set()
+    def stop_data_processing(self, drain: bool = False, timeout: float = 1.0):
+        """
+        Остановка потока обработки данных
+        :param drain: Перед остановкой разобрать все данные очереди и выдать незавершенный пакет.
+                      Источник данных к этому времени должен быть закрыт.
+        :param timeout: Время ожидания потока в секундах, после него поток останавливается без разбора.
+        """
+        if drain:
+            self.data_drain_event.set()
+        else:
+            self.data_process_event.set()
         if self.data_process_thread and self.data_process_thread.is_alive():
-            self.data_process_thread.join(timeout=1.0)
+            self.data_process_thread.join(timeout=timeout)
+            if drain and self.data_process_thread.is_alive():
+                self.data_process_event.set()
+                self.data_process_thread.join(timeout=1.0)
+        self.data_process_event.set()
         # Очищаем ссылку на поток
         self.data_process_thread = None
+        self.low_watermark_ns = None
         # Очищаем ключи, счетчики, ид
         # Очистка отключена т.к. удобнее пытаться восстановить ключ между сессиями открытия порта
         # self.new_mkey_saved = False
-        # self.master_key_counter = [""] * 32
-        # self.work_key_out_counter = [""] * 32
-        # self.work_key_out = [""] * 32
-        # self.work_key_in_counter = [""] * 32
-        # self.work_key_in = [""] * 32
-        # self.give_addr = [""] * 32
+        # self.key_states = [KeyState() for _ in range(32)]
+        # self.mac_index = {}
 
     def encodings_handler(self, encoding, interface):
         """Обработка кодировок данных"""
+        # Из кольцевого буфера пакеты Orion2 разбираются на месте, без копирования порций
+        if encoding == "O2" and isinstance(self.data_proc_queue, RingBuffer):
+            self._orion2_ring_handler()
+            return
+        framer = self.orion2_framer
         while not self.data_process_event.is_set():
+            # Пока есть незавершенный пакет, данные ждем не дольше паузы на линии
+            pending = encoding == "O2" and framer.flushable
+            draining = self.data_drain_event.is_set()
+            wait_ns = time.monotonic_ns()
             try:
-                current_buffer = self.data_proc_queue.get(timeout=1)
+                current_buffer, marks = self._read_batch(timeout=self._wait_timeout(pending))
             except queue.Empty:
+                if pending:
+                    # Линия замолчала: последний пакет пачки целый
+                    self._orion2_decode(framer.flush())
+                # Все, что придет дальше, принято после начала ожидания
+                self._advance_watermark(wait_ns)
+                if draining:
+                    # Очередь разобрана до конца
+                    break
                 continue  # Если нет данных, продолжаем ожидание
-            self.timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
+            # Отметка приема первого байта очередной записи и позиция первого невыведенного байта:
+            # строки берутся по смещению без копирования остатка данных
+            mark_index = 0
+            position = 0
             # Значение по умолчанию
             if encoding == "O2":
                 # Передаем данные напрямую в парсер
-                self._orion2_parser(current_buffer)
+                self._orion2_parser(current_buffer, 0, None, marks)
             elif encoding == "HEX":
-                while current_buffer and not self.data_process_event.is_set():
-                    if len(current_buffer) > self.unparsed_encoding_data_size:
+                size = self.unparsed_encoding_data_size
+                while position < len(current_buffer) and not self.data_process_event.is_set():
+                    if len(current_buffer) - position > size:
                         # Берём данные фиксированной длины
-                        packet = current_buffer[:self.unparsed_encoding_data_size].hex()
-                        current_buffer = current_buffer[self.unparsed_encoding_data_size:]
+                        packet = current_buffer[position:position + size]
                     else:
                         try:
-                            additional_buffer = self.data_proc_queue.get(timeout=1)
-                            current_buffer += additional_buffer
+                            current_buffer, marks = self._append_batch(current_buffer, marks, position,
+                                                                       timeout=self._more_data_timeout())
+                            mark_index = position = 0
                             continue
                         except queue.Empty:
-                            packet = current_buffer.hex()
-                            current_buffer = b''
-                    self.timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
+                            packet = current_buffer[position:]
+                    mark_index = self._find_mark(marks, mark_index, position)
+                    self.timestamp = marks[mark_index][1]
+                    position += len(packet)
                     self.update_gui_and_log(packet, "", "", "", "", "")
             elif encoding == "ASCII":
+                size = self.unparsed_encoding_data_size
                 try:
-                    while current_buffer and not self.data_process_event.is_set():
+                    while position < len(current_buffer) and not self.data_process_event.is_set():
                         if interface == "UDP":
-                            end = current_buffer.find(b"\x0d\x0d", 0)
+                            end = current_buffer.find(b"\x0d\x0d", position)
                         else:
-                            end = current_buffer.find(b"\x0a", 0)
-                        if end == -1 or end == 0:
-                            if len(current_buffer) > self.unparsed_encoding_data_size:
+                            end = current_buffer.find(b"\x0a", position)
+                        if end == -1 or end == position:
+                            if len(current_buffer) - position > size:
                                 # Берём данные фиксированной длины
-                                packet = current_buffer[:self.unparsed_encoding_data_size].decode("ascii", errors="ignore")
-                                current_buffer = current_buffer[self.unparsed_encoding_data_size:]
+                                packet = current_buffer[position:position + size].decode("ascii", errors="ignore")
+                                length = size
                             else:
                                 try:
-                                    additional_buffer = self.data_proc_queue.get(timeout=1)
+                                    current_buffer, marks = self._append_batch(current_buffer, marks, position,
+                                                                               timeout=self._more_data_timeout())
+                                    mark_index = position = 0
+                                    continue
                                 except queue.Empty:
-                                    continue  # Если нет данных, продолжаем ожидание
-                                current_buffer += additional_buffer
-                                continue
+                                    if not self.data_drain_event.is_set():
+                                        continue  # Если нет данных, продолжаем ожидание
+                                    # Данных больше не будет, незавершенную строку выводим как есть
+                                    packet = current_buffer[position:].decode("ascii", errors="ignore")
+                                    length = len(current_buffer) - position
                         else:
                             if interface == "UDP":
-                                packet = current_buffer[1:end].decode("ascii", errors="ignore")
-                                current_buffer = current_buffer[end + 2:]
+                                packet = current_buffer[position + 1:end].decode("ascii", errors="ignore")
+                                length = end - position + 2
                             else:
                                 # Берём данные до следующего маркера с исключением \n
-                                packet = current_buffer[:end - 1].decode("ascii", errors="ignore")
-                                current_buffer = current_buffer[end + 1:]
-                        self.timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
+                                packet = current_buffer[position:end - 1].decode("ascii", errors="ignore")
+                                length = end - position + 1
+                        mark_index = self._find_mark(marks, mark_index, position)
+                        self.timestamp = marks[mark_index][1]
+                        position += length
                         self.update_gui_and_log(packet,"","","","","")
                 except UnicodeDecodeError:
                     self.main_gui.update_message_area(f"Некорректный символ")
+            # Следующие записи начнутся не раньше последней разобранной порции
+            self._advance_watermark(marks[-1][1])
 
-    #@profile
-    def _orion2_parser(self, data_bytes):
-        """Парсер для кодировки Orion2."""
-        while data_bytes and not self.data_process_event.is_set():
-            # Ищем начало следующего пакета 'ff'
-            next_ff = data_bytes.find(b"\xFF", 2)
-            # Если не найдено или в нулевой позиции
-            if next_ff == -1 or next_ff == 0:
-                try:
-                    # Пытаемся получить данные из очереди
-                    additional_buffer = self.data_proc_queue.get(timeout=0.1)
-                except queue.Empty:
-                    # print("Очередь пуста")
-                    # Если нет данных, продолжаем ожидание
-                    continue
-                # Получили новую порцию данных, добавляем ее к существующим данным
-                data_bytes += additional_buffer
+    def _orion2_ring_handler(self):
+        """Разбор Orion2 прямо из памяти кольцевого буфера."""
+        ring = self.data_proc_queue
+        framer = self.orion2_framer
+        while not self.data_process_event.is_set():
+            pending = framer.flushable
+            draining = self.data_drain_event.is_set()
+            wait_ns = time.monotonic_ns()
+            try:
+                start, end, marks = ring.read_region(timeout=self._wait_timeout(pending))
+            except queue.Empty:
+                if pending:
+                    self._orion2_decode(framer.flush())
+                self._advance_watermark(wait_ns)
+                if draining:
+                    break
                 continue
-            # Нашли начало пакета
+            if self.capture_writer is not None:
+                self._capture_region(ring.buffer, end, marks)
+            try:
+                self._orion2_parser(ring.buffer, start, end, marks)
+            finally:
+                # Сборщик уже скопировал нужные байты, участок можно отдавать под запись
+                ring.release(end - start)
+            self._count_batch(1, end - start)
+            self._advance_watermark(marks[-1][1])
+
+    def _wait_timeout(self, pending: bool) -> float:
+        """Время ожидания очередной пачки: при разборе перед остановкой данные не ждем."""
+        if self.data_drain_event.is_set():
+            return 0
+        # Пока есть незавершенный пакет, данные ждем не дольше паузы на линии
+        return self.frame_idle_timeout if pending else self.read_timeout
+
+    def _more_data_timeout(self) -> float:
+        """Время ожидания продолжения незавершенной строки HEX/ASCII."""
+        return 0 if self.data_drain_event.is_set() else 1
+
+    def _advance_watermark(self, received_ns: int):
+        """
+        Продвигает время, раньше которого все записи уже выданы.
+        :param received_ns: Время приема, раньше которого данных в очереди нет; незавершенный пакет
+                            сборщика еще будет выдан со временем своего первого байта.
+        """
+        framer = self.orion2_framer
+        self.low_watermark_ns = framer.pending_ns if framer.pending else received_ns
+
+    def _read_batch(self, timeout):
+        """
+        Забирает из очереди все доступные порции данных за одно пробуждение и склеивает их.
+        Порции приходят кортежами (time.monotonic_ns(), данные); порции без отметки получают
+        время извлечения из очереди.
+        :param timeout: Время ожидания первой порции в секундах.
+        :return: Кортеж (данные, отметки приема): отметки - список (смещение в данных, time.monotonic_ns())
+                 начала каждой порции.
+        :raises queue.Empty: Если за время ожидания данные не поступили.
+        """
+        data_queue = self.data_proc_queue
+        # Кольцевой буфер сам отдает все накопленные данные одним участком
+        if isinstance(data_queue, RingBuffer):
+            rx_ns, data = data_queue.get(timeout=timeout)
+            if self.capture_writer is not None:
+                self.capture_writer.write_data(self.capture_link, rx_ns, data)
+            self._count_batch(1, len(data))
+            return data, [(0, rx_ns)]
+        items = [data_queue.get(timeout=timeout)]
+        # Остальные порции забираем за один захват блокировки очереди
+        with data_queue.mutex:
+            while data_queue._qsize() and len(items) < self.max_batch_chunks:
+                items.append(data_queue._get())
+            if len(items) > 1:
+                data_queue.not_full.notify_all()
+        chunks = []
+        marks = []
+        offset = 0
+        capture_writer = self.capture_writer
+        for item in items:
+            if isinstance(item, tuple):
+                rx_ns, chunk = item
             else:
-                # Формируем пакет из данных в буфере до следующего маркера
-                packet = data_bytes[:next_ff]
-                # Вырезаем пакет из буфера
-                data_bytes = data_bytes[next_ff:]
+                rx_ns, chunk = time.monotonic_ns(), item
+            chunks.append(chunk)
+            marks.append((offset, rx_ns))
+            offset += len(chunk)
+            if capture_writer is not None:
+                capture_writer.write_data(self.capture_link, rx_ns, chunk)
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        self._count_batch(len(chunks), len(data))
+        return data, marks
+
+    def _append_batch(self, data, marks, position, timeout):
+        """
+        Дописывает следующую пачку из очереди к невыведенному остатку данных.
+        :param data: Данные текущей пачки.
+        :param marks: Отметки приема данных текущей пачки.
+        :param position: Позиция первого невыведенного байта в data.
+        :param timeout: Время ожидания пачки в секундах.
+        :return: Кортеж (остаток с новыми данными, отметки приема от его начала).
+        :raises queue.Empty: Если за время ожидания данные не поступили.
+        """
+        additional_data, additional_marks = self._read_batch(timeout)
+        rest = len(data) - position
+        marks = self._shift_marks(marks, position) + self._shift_marks(additional_marks, -rest)
+        return data[position:] + additional_data, marks
+
+    def _capture_region(self, buffer, end, marks):
+        """Передает на запись в файл захвата порции участка буфера по их отметкам приема."""
+        with memoryview(buffer) as view:
+            for index, (position, rx_ns) in enumerate(marks):
+                chunk_end = marks[index + 1][0] if index + 1 < len(marks) else end
+                self.capture_writer.write_data(self.capture_link, rx_ns, view[position:chunk_end])
+
+    @staticmethod
+    def _find_mark(marks, index, position):
+        """Возвращает номер отметки приема порции, в которой пришел байт position (поиск от отметки index)."""
+        last = len(marks) - 1
+        while index < last and marks[index + 1][0] <= position:
+            index += 1
+        return index
+
+    @staticmethod
+    def _shift_marks(marks, count):
+        """
+        Сдвигает отметки приема после удаления count байт из начала данных
+        (отрицательный count - после добавления данных перед ними).
+        Отметка порции, начатой в удаленной части, переносится на начало оставшихся данных.
+        """
+        shifted = [(offset - count, rx_ns) for offset, rx_ns in marks if offset >= count]
+        if count > 0 and (not shifted or shifted[0][0]):
+            last = None
+            for offset, rx_ns in marks:
+                if offset > count:
+                    break
+                last = rx_ns
+            if last is not None:
+                shifted.insert(0, (0, last))
+        return shifted
+
+    def _count_batch(self, chunks, length):
+        """Учитывает одно пробуждение в статистике пакетного чтения."""
+        self.batch_wakeups += 1
+        self.batch_chunks += chunks
+        self.batch_bytes += length
+        if chunks > self.batch_max_chunks:
+            self.batch_max_chunks = chunks
+
+    def reset_batch_stats(self):
+        """Сбрасывает статистику пакетного чтения очереди."""
+        self.batch_wakeups = 0
+        self.batch_chunks = 0
+        self.batch_bytes = 0
+        self.batch_max_chunks = 0
+
+    def get_batch_stats(self) -> dict:
+        """Возвращает статистику пакетного чтения очереди за сессию обработки."""
+        wakeups = self.batch_wakeups
+        return {
+            "wakeups": wakeups,
+            "chunks": self.batch_chunks,
+            "bytes": self.batch_bytes,
+            "max_chunks": self.batch_max_chunks,
+            "avg_chunks": self.batch_chunks / wakeups if wakeups else 0.0,
+            "avg_bytes": self.batch_bytes / wakeups if wakeups else 0.0,
+        }
+
+    def _orion2_parser(self, data_bytes, start=0, end=None, marks=None):
+        """
+        Парсер для кодировки Orion2. start и end задают разбираемый участок буфера,
+        marks - отметки приема порций участка (позиция, time.monotonic_ns()).
+        """
+        # Сборщик отдает только целые пакеты, незавершенный хвост остается в его буфере
+        self._orion2_decode(self.orion2_framer.feed(data_bytes, start, end, marks))
+
+    #@profile
+    def _orion2_decode(self, frames):
+        """Разбор собранных пакетов Orion2: список кортежей (время приема первого байта, пакет)."""
+        for rx_ns, packet in frames:
+            if self.data_process_event.is_set():
+                break
+            # Время записи - время приема первого байта пакета
+            self.timestamp = rx_ns
 
             # Инициализируем переменные для вывода и обработки данных
             packet_len = ""
@@ -220,156 +481,77 @@ class DataProcessing:
             decoded_flags = ""
             packet_type = ""
             decode = ""
-            was_req = False
             data_encrypt = False
             encrypted_work_key = False
             dont_decode = False
             overall_len = 0
 
             # Если длина пакета больше 2 байт и пакет начинается на ff
-            bytes_length = len(packet)
-            bytes_first = bytes([packet[0]])
-            if not ((bytes_length > 2) and (bytes_first == b"\xff")):
+            if not ((len(packet) > 2) and (packet[0] == 0xFF)):
                 decode = "Ошибка, пакет не целый"
-                packet = packet.hex()
             else:
-                # Заменяем в пакете подмененные при передаче байты
-                packet = packet.replace(b'\xFE\x01', b'\xFF').replace(b'\xFE\x02', b'\xFE')
-                packet = packet.hex()
+                # Подмененные при передаче байты уже восстановлены сборщиком пакетов
                 raw_packet = packet
-                # packet_header_type = bytes([packet[2]])
-                # packet_header_ack_type = bytes([packet[4]])
 
                 # Парсинг заголовка пакета.
                 # Получаем адрес абонента
-                address = int(packet[2:4], 16) & 0x1F
-                # Для парсинга заголовка отрезаем первые два байта
-                temp_packet = packet[4:]
-                # Пакеты IN запросы для каждого адреса
-                if temp_packet.startswith('1f'):
-                    # Ставим флаг, что пакет получен по запросу
-                    was_req = True
-                    # Ответы ACK если байт не NACK
-                    if temp_packet[4:6] != '6f':
-                        temp_packet = temp_packet[4:]
-                        #packet_type = "REQ+"
-                    else:
-                        # Инкрементируем счетчик "холостых" запросов-ответов
-                        self.main_gui.req_ack_counters[address] += 1
-                        continue
-
-                # Пакеты DATA0 и DATA1 могут приходить как самостоятельно так и по запросу после 1f
-                if temp_packet.startswith('2f') or temp_packet.startswith('3f'):
-                    ans_packet = temp_packet[len(temp_packet)-4:]
-                    # Ищем в конце успешный ответ
-                    if ((temp_packet.startswith('2f') and ans_packet.startswith('4f'))
-                            or (temp_packet.startswith('3f') and ans_packet.startswith('5f'))):
-                        if was_req:
-                            # Обрезаем с полем len если ведомый-мастер
-                            packet = packet[12:len(packet)-4]
-                        else:
-                            # Обрезаем меньше при пакете мастер-ведомый
-                            packet = packet[8:len(packet) - 4]
-                    else:
-                        decode = f"Ошибка, потеря квитанции {temp_packet[:2]}, {ans_packet[:2]}"
-                        if was_req:
-                            # Обрезаем с полем len если ведомый-мастер
-                            packet = packet[12:len(packet)-4]
-                        else:
-                            # Обрезаем меньше при пакете мастер-ведомый
-                            packet = packet[8:len(packet) - 4]
-                    if was_req:
-                        direction = "s-m"
-                    else:
-                        direction = "m-s"
-
-                # Пакеты SEARCH для каждого адреса
-                elif temp_packet.startswith('8f'):
-                    # Инкрементируем счетчик поисковых запросов
-                    self.main_gui.search_counters[address] += 1
+                address = packet[1] & 0x1F
+                # Тип пакета определяет управляющий байт после адреса
+                frame = self.frame_handlers[packet[2]](packet, address, 2, False)
+                if frame is None:
+                    # Служебный пакет учтен обработчиком и не выводится
                     continue
+                packet, direction, decode = frame
 
-                # Пакеты GETID для каждого адреса
-                elif temp_packet.startswith('af'):
-                    # Инкрементируем счетчик присвоения мак адреса (ид) к адресу абонента
-                    self.main_gui.get_id_counters[address] += 1
-                    continue
-
-                else:
-                    # Пакеты GIVEADDR
-                    temp_packet = packet[2:]
-                    if temp_packet.startswith('80') and temp_packet[14:16] == '9f':
-                        # Получаем адрес прибора
-                        address = int(packet[22:24], 16) & 0x1F
-                        # Получаем мак прибора
-                        self.give_addr[address] = temp_packet[2:14]
-                        # Получаем мак мастера
-                        self.give_addr[0] = temp_packet[22:34]
-                        continue
-
-                # Ставим отметку времени
-                self.timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
                 # Парсинг заголовка команды
                 try:
                     # Парсинг общей длины
-                    len_byte = str(packet[:2])
-                    if len_byte:
-                        overall_len = int(len_byte, 16)
+                    if packet:
+                        overall_len = packet[0]
                         # Если фактическая длина пакета не совпадает с указанной в заголовке
-                        if overall_len != len(packet)/2:
+                        if overall_len != len(packet):
                             decode = "Ошибка, пакет не целый"
                             packet = raw_packet
                             dont_decode = True
                         else:
                             packet_len = overall_len
-                            # Парсинг типа пакета
-                            packet_type_byte = str(packet[3:4])
-                            if packet_type_byte:
-                                packet_type_int = int(packet_type_byte, 16)
-                                packet_type = self.packet_types[packet_type_int]
+                            # Парсинг типа пакета (младшая тетрада второго байта)
+                            if len(packet) > 1:
+                                packet_type = self.packet_types[packet[1] & 0x0F]
                             # Парсинг номера пакета
-                            packet_num_byte = str(packet[6:8])
-                            if packet_num_byte:
-                                packet_num = int(packet_num_byte, 16)
-                            packet_flags = str(packet[4:6])
-                            if packet_flags:
+                            if len(packet) > 3:
+                                packet_num = packet[3]
+                            if len(packet) > 2:
                                 # Парсинг флагов содержимого пакета
-                                decoded_flags = self._decode_flags(int(packet_flags, 16))
-                            # Если присутствует флаг SMode значит пакет зашифрован
-                            data_encrypt = "SMode" in decoded_flags
-                            # Если присутствует флаг WKey значит пакет зашифрован рабочим ключом
-                            encrypted_work_key = "WKey" in decoded_flags
-                            # Если шифрован, но не рабочим ключом, вставляем флаг мастер ключа
-                            if data_encrypt and not encrypted_work_key:
-                                decoded_flags = decoded_flags[:len(decoded_flags)-6] + ":MKey:SMode"
+                                flags = packet[2]
+                                decoded_flags = self.flag_texts[flags]
+                                # Если присутствует флаг SMode значит пакет зашифрован
+                                data_encrypt = bool(flags & FLAG_SMODE)
+                                # Если присутствует флаг WKey значит пакет зашифрован рабочим ключом
+                                encrypted_work_key = bool(flags & FLAG_WKEY)
                             # Обрезка основной части заголовка
-                            packet = packet[8:]
-                            # Парсинг и обрезка идентификаторов
-                            count = 0
-                            source = 0
-                            destination = 0
-
-                            for item in self.give_addr:
-                                # Ищем в пакете мак адреса (ид) приборов, сохраненные из пакетов GIVEADDR в список give_addr
-                                if item:
-                                    start_index = packet.find(item)
-                                    if start_index >= 0:
-                                        if start_index == 0:
-                                            self.mac[0] = item
-                                            source = count
-                                        else:
-                                            self.mac[1] = item
-                                            destination = count
-                                    self.main_gui.mac_addr[count] = self._convert_mac(item)
-                                count += 1
-                            if self.mac[0] and self.mac[1]:
-                                # Обрезаем идентификаторы из тела пакета
-                                packet = packet[24:]
-                                # packet = packet.replace(self.mac[0], "").replace(self.mac[1], "")
-                                direction += "  " + self.main_gui.mac_addr[source] + "-" + self.main_gui.mac_addr[destination]
+                            packet = packet[4:]
+                            # Парсинг и обрезка идентификаторов saf и daf по адресам из пакетов GIVEADDR
+                            source = self.mac_index.get(packet[:6])
+                            if source is None:
+                                source = 0
                             else:
-                                # Обрезаем идентификаторы из тела пакета
-                                packet = packet[24:]
+                                self.mac[0] = self.key_states[source].mac
+                            destination = self.mac_index.get(packet[6:12])
+                            if destination is None:
+                                destination = 0
+                            else:
+                                self.mac[1] = self.key_states[destination].mac
+                            source_mac = self.key_states[source].mac_text
+                            destination_mac = self.key_states[destination].mac_text
+                            self.main_gui.mac_addr[source] = source_mac
+                            self.main_gui.mac_addr[destination] = destination_mac
+                            # Обрезаем идентификаторы из тела пакета
+                            packet = packet[12:]
+                            # Начало вектора расшифровки одно на все пакеты пары saf+daf
+                            self.iv_prefix = self.mac[0] + self.mac[1]
+                            if self.mac[0] and self.mac[1]:
+                                direction += "  " + source_mac + "-" + destination_mac
                 except Exception as e:
                     self.main_gui.update_message_area(f"Ошибка при парсинге заголовка: {e}")
 
@@ -379,20 +561,17 @@ class DataProcessing:
                         # Если данные не шифрованы
                         if not data_encrypt:
                             if packet_type == "DT_SERV":
-                                serv_cmd_type_byte = str(packet[4:6])
-                                if serv_cmd_type_byte:
-                                    serv_cmd_type = int(serv_cmd_type_byte, 16)
+                                if len(packet) > 2:
+                                    serv_cmd_type = packet[2]
                                     packet_type += self.serv_cmd_types[serv_cmd_type]
                                     if serv_cmd_type == 2:
                                         # Сохраняем значение счетчика мастер ключа
-                                        self.master_key_counter[address] = packet[6:14]
+                                        self.key_states[address].master_key_counter = int.from_bytes(packet[3:7], 'little')
                                         # Ставим флаг, что ключ получен
                                         self.new_mkey_saved = True
                             # Дополняем общую длину пакета длиной данных
-                            not_encr_data_len_byte = str(packet[:2])
-                            if not_encr_data_len_byte:
-                                not_encr_data_len = int(not_encr_data_len_byte, 16)
-                                packet_len = f"{overall_len}/{not_encr_data_len}"
+                            if packet:
+                                packet_len = f"{overall_len}/{packet[0]}"
                             if not decode:
                                 decode = "Не шифрованные данные"
                         # Данные шифрованы
@@ -401,9 +580,9 @@ class DataProcessing:
                             if not self.new_mkey_saved:
                                 decode = "Ошибка, не получен счетчик мастер-ключа"
                             else:
-                                s_counter = packet[:2]
+                                s_counter = packet[0]
                                 # Убираем значение счетчика, mac и crc из данных
-                                packet = packet[2:len(packet) - 12]
+                                packet = packet[1:len(packet) - 6]
                                 # Если нет флага "Рабочий ключ"
                                 if not encrypted_work_key:
                                     # Расшифровка мастер ключом
@@ -420,22 +599,14 @@ class DataProcessing:
                                         if packet_type == "DT_SERV":
                                             # Убираем биты не относящиеся к подтипу пакета
                                             packet_subtype = decode_packet[2] & 0b00111111
-                                            if packet_subtype in self.serv_cmd_types:
-                                                packet_type += self.serv_cmd_types[packet_subtype]
-                                            else:
-                                                packet_type += f"({str(packet_subtype)})+"
-                                                # decode = "Ошибка, неизвестный подтип пакета"
+                                            packet_type += self.serv_cmd_texts[packet_subtype]
                                             if packet_subtype == 2:
                                                 # Сохраняем значение счетчика мастер ключа
-                                                self.master_key_counter[address] = packet[6:14]
+                                                self.key_states[address].master_key_counter = int.from_bytes(packet[3:7], 'little')
                                         elif packet_type == "DT_DATA":
                                             # Убираем биты не относящиеся к подтипу пакета
                                             packet_subtype = decode_packet[1] & 0b00111111
-                                            if packet_subtype in self.data_cmd_types:
-                                                packet_type += self.data_cmd_types[packet_subtype]
-                                            else:
-                                                packet_type += f"({str(packet_subtype)})+"
-                                                # decode = "Ошибка, неизвестный подтип пакета"
+                                            packet_type += self.data_cmd_texts[packet_subtype]
                                 if not decode:
                                     # Сохраняем расшифрованные данные
                                     decode = decode_packet
@@ -454,154 +625,172 @@ class DataProcessing:
 
     def update_gui_and_log(self, packet, packet_len, packet_num, direction, packet_type_flags, decode):
         """Отправка данных на экран и в лог-файл"""
-        try:
-            # Отправка данных в лог
-            if not decode:
-                self.logger_queue.put(f"{self.timestamp}  {packet}")
-            else:
-                self.logger_queue.put(f"{self.timestamp}  {packet}  {packet_len}  {packet_num}  {direction}  "
-                                    f"{packet_type_flags}  {decode}")
-        except queue.Full:
-            self.main_gui.update_message_area(f"Очередь лога заполнена")
+        # Одна запись на оба получателя, строки формирует тот, кто ее выводит
+        frame = DecodedFrame(self.timestamp, packet, packet_len, packet_num, direction, packet_type_flags, decode)
+        if self.capture_writer is not None:
+            self.capture_writer.write_frame(self.capture_link, frame)
+        # Без очереди лога записи забирает только получатель main_gui (например, при захвате нескольких линий)
+        if self.logger_queue is not None:
+            try:
+                # Отправка данных в лог
+                self.logger_queue.put(frame)
+            except queue.Full:
+                self.main_gui.update_message_area(f"Очередь лога заполнена")
         try:
             # Обновляем GUI
-            if not decode:
-                self.main_gui.update_data_area(f"{self.timestamp}@{packet}")
-            else:
-                self.main_gui.update_data_area(f"{self.timestamp}@{packet}@{packet_len}"
-                                           f"@{packet_num}@{direction}@{packet_type_flags}@{decode}")
+            self.main_gui.update_data_area(frame)
         except queue.Full:
             self.main_gui.update_message_area(f"Очередь гуи заполнена")
 
-    def _decode_flags(self, flags):
-        if flags:
-            binary_str = format(flags, '08b')
-            array_flags = [int(bit) for bit in binary_str]
-            # Сравниваем биты со списком флагов и сохраняем те что 1
-            true_flags = [flag for num, flag in zip(array_flags, self.packet_flags) if num != 0]
-            decoded_flags = ":".join(true_flags)
-            return decoded_flags
-        return ""
+    def register_frame_handler(self, control_byte: int, handler):
+        """
+        Регистрирует обработчик пакетов Orion2 с заданным управляющим байтом.
+        :param control_byte: Управляющий байт пакета (после маркера и адреса), 0..255.
+        :param handler: Функция handler(packet, address, offset, was_req), где offset - позиция
+                        управляющего байта в пакете, was_req - пакет получен в ответ на запрос 1F.
+                        Возвращает None, если пакет учтен и не выводится, иначе кортеж
+                        (данные для разбора заголовка команды, направление, текст ошибки).
+        """
+        self.frame_handlers[control_byte] = handler
+
+    def _on_request_frame(self, packet, address, offset, was_req):
+        """Пакеты IN запросы: холостые ответы NACK считаются, ответ с данными разбирается по своему типу."""
+        # Ответы ACK если байт не NACK
+        if packet[offset + 2:offset + 3] == b'\x6f':
+            # Инкрементируем счетчик "холостых" запросов-ответов
+            self.main_gui.req_ack_counters[address] += 1
+            return None
+        offset += 2
+        if offset >= len(packet):
+            return self._on_other_frame(packet, address, offset, True)
+        handler = self.frame_handlers[packet[offset]]
+        # Ответ на запрос не бывает запросом: повторный байт 1F разбирается как прочий пакет
+        if handler == self._on_request_frame:
+            handler = self._on_other_frame
+        return handler(packet, address, offset, True)
+
+    def _on_data_frame(self, packet, address, offset, was_req):
+        """Пакеты DATA0 и DATA1: могут приходить как самостоятельно так и по запросу после 1f."""
+        decode = ""
+        control = packet[offset]
+        # Ищем в конце успешный ответ
+        answer = packet[max(len(packet) - 2, offset)]
+        if answer != self.data_acks.get(control):
+            decode = f"Ошибка, потеря квитанции {control:02x}, {answer:02x}"
+        if was_req:
+            # Обрезаем с полем len если ведомый-мастер
+            return packet[6:len(packet) - 2], "s-m", decode
+        # Обрезаем меньше при пакете мастер-ведомый
+        return packet[4:len(packet) - 2], "m-s", decode
+
+    def _on_search_frame(self, packet, address, offset, was_req):
+        """Пакеты SEARCH для каждого адреса."""
+        # Инкрементируем счетчик поисковых запросов
+        self.main_gui.search_counters[address] += 1
+        return None
+
+    def _on_get_id_frame(self, packet, address, offset, was_req):
+        """Пакеты GETID для каждого адреса."""
+        # Инкрементируем счетчик присвоения мак адреса (ид) к адресу абонента
+        self.main_gui.get_id_counters[address] += 1
+        return None
+
+    def _on_other_frame(self, packet, address, offset, was_req):
+        """Пакеты GIVEADDR сохраняют мак-адреса, остальные разбираются как пакет данных."""
+        if packet[1:2] == b'\x80' and packet[8:9] == b'\x9f' and len(packet) > 11:
+            # Получаем адрес прибора
+            address = packet[11] & 0x1F
+            # Получаем мак прибора
+            self._save_mac(address, packet[2:8])
+            # Получаем мак мастера
+            self._save_mac(0, packet[12:18])
+            return None
+        return packet, "", ""
 
     @staticmethod
-    def _convert_and_increment(hex_little_endian):
-        """Функция инкрементирования счетчиков ключей с конвертацией литл-индиан в биг-индиан и обратно"""
-        # Преобразуем строку в байты
-        little_endian_bytes = bytes.fromhex(hex_little_endian)
-        # Преобразуем из little-endian в int
-        int_value = int.from_bytes(little_endian_bytes, byteorder='little')
-        # Увеличиваем значение на 1
-        int_value += 1
-        # Преобразуем обратно в байты в little-endian формате
-        new_little_endian_bytes = int_value.to_bytes(4, byteorder='little')
-        # Преобразуем байты обратно в строку hex
-        return new_little_endian_bytes.hex()
+    def _build_flag_texts(packet_flags):
+        """Строит строки флагов заголовка для всех 256 значений байта флагов (флаги от старшего бита)."""
+        flag_texts = []
+        for flags in range(256):
+            text = ":".join(name for bit, name in enumerate(packet_flags) if flags & (0x80 >> bit))
+            # Если шифрован, но не рабочим ключом, вставляем флаг мастер ключа
+            if flags & FLAG_SMODE and not flags & FLAG_WKEY:
+                text = text[:len(text) - 6] + ":MKey:SMode"
+            flag_texts.append(text)
+        return flag_texts
+
+    @staticmethod
+    def _build_subtype_texts(cmd_types):
+        """Строит названия подтипов пакетов для всех 64 значений, неизвестный подтип выводится числом."""
+        return [cmd_types.get(subtype, f"({subtype})+") for subtype in range(64)]
+
+    def _save_mac(self, address, mac):
+        """Сохраняет мак-адрес абонента из пакета GIVEADDR и обновляет индекс адресов."""
+        key_state = self.key_states[address]
+        if key_state.mac == mac:
+            return
+        # Старый мак-адрес больше не указывает на этот адрес
+        if self.mac_index.get(key_state.mac) == address:
+            del self.mac_index[key_state.mac]
+        key_state.mac = mac
+        key_state.mac_text = self._convert_mac(mac)
+        self.mac_index[mac] = address
+        self.main_gui.mac_addr[address] = key_state.mac_text
 
     @staticmethod
     def _convert_mac(mac_little):
         """Конвертирует MAC-адрес из little-endian в big-endian формат."""
-        if mac_little != "00:00:00:00:00:00":
-            pairs = [mac_little[i:i + 2] for i in range(0, 12, 2)]
-            mac_convert = ":".join(reversed(pairs))
-            return mac_convert
-        return mac_little
+        return mac_little[::-1].hex(":")
 
     def _decrypt_with_work_key(self, address, packet, s_counter):
-        work_key = ""
-        init_vector = ""
-
-        # Инкрементируем значения счетчиков после получения пакета при этом сравниваем значение младшего байта
-        if (self.mac[0] == self.give_addr[address]) and (s_counter != self.work_key_out_counter[address][:2]):
-            self.work_key_out_counter[address] = self._convert_and_increment(self.work_key_out_counter[address])
-            if s_counter != self.work_key_out_counter[address][:2]:
-                self.work_key_out_counter[address] = s_counter + self.work_key_out_counter[address][2:]
-                if s_counter == self.work_key_out_counter[address][:2]:
-                    self.main_gui.update_message_area(f"Восстановление СЧРК исходящих, для прибора с адресом {address}. Проверьте корректность расшифровки")
-        elif (self.mac[1] == self.give_addr[address]) and (s_counter != self.work_key_in_counter[address][:2]):
-            self.work_key_in_counter[address] = self._convert_and_increment(self.work_key_in_counter[address])
-            if s_counter != self.work_key_in_counter[address][:2]:
-                self.work_key_in_counter[address] = s_counter + self.work_key_in_counter[address][2:]
-                if s_counter == self.work_key_in_counter[address][:2]:
-                    self.main_gui.update_message_area(f"Восстановление СЧРК входящих, для прибора с адресом {address}. Проверьте корректность расшифровки")
-
-        if self.mac[0] == self.give_addr[address]:
+        key_state = self.key_states[address]
+        work_key = b""
+        init_vector = b""
+
+        # Синхронизируем значения счетчиков после получения пакета по значению младшего байта
+        if self.mac[0] == key_state.mac:
+            key_state.work_key_out_counter, restored = key_state.sync_counter(key_state.work_key_out_counter, s_counter)
+            if restored:
+                self.main_gui.update_message_area(f"Восстановление СЧРК исходящих, для прибора с адресом {address}. Проверьте корректность расшифровки")
             # Получаем начальный вектор расшифровки из saf+daf+SCNum
-            init_vector = self.mac[0] + self.mac[1] + self.work_key_out_counter[address]
-            work_key = self.work_key_out[address]
-        elif self.mac[1] == self.give_addr[address]:
+            init_vector = key_state.init_vector(self.iv_prefix, key_state.work_key_out_counter)
+            work_key = key_state.work_key_out
+        elif self.mac[1] == key_state.mac:
+            key_state.work_key_in_counter, restored = key_state.sync_counter(key_state.work_key_in_counter, s_counter)
+            if restored:
+                self.main_gui.update_message_area(f"Восстановление СЧРК входящих, для прибора с адресом {address}. Проверьте корректность расшифровки")
             # Получаем начальный вектор расшифровки из saf+daf+SCNum
-            init_vector = self.mac[0] + self.mac[1] + self.work_key_in_counter[address]
-            work_key = self.work_key_in[address]
+            init_vector = key_state.init_vector(self.iv_prefix, key_state.work_key_in_counter)
+            work_key = key_state.work_key_in
         decode_packet = self._decrypt_aes(init_vector, work_key, packet)
 
         return decode_packet
 
     def _decrypt_with_master_key(self, address, packet, s_counter):
-        if s_counter != self.master_key_counter[address][:2]: #and (self.work_key_out_counter[address] and self.work_key_in_counter[address]):
-            self.master_key_counter[address] = self._convert_and_increment(self.master_key_counter[address])
-            if s_counter != self.master_key_counter[address][:2]:
-                self.master_key_counter[address] = s_counter + self.master_key_counter[address][2:]
-                if s_counter == self.master_key_counter[address][:2]:
-                    self.main_gui.update_message_area(f"Восстановление СЧМК для прибора с адресом {address}. Проверьте корректность расшифровки")
+        key_state = self.key_states[address]
+        key_state.master_key_counter, restored = key_state.sync_counter(key_state.master_key_counter, s_counter)
+        if restored:
+            self.main_gui.update_message_area(f"Восстановление СЧМК для прибора с адресом {address}. Проверьте корректность расшифровки")
         # Получаем начальный вектор расшифровки из saf+daf+SCNum
-        init_vector = self.mac[0] + self.mac[1] + self.master_key_counter[address]
+        init_vector = key_state.init_vector(self.iv_prefix, key_state.master_key_counter)
         # Расшифровка пакета
         decode_packet = self._decrypt_aes(init_vector, self.master_key, packet)
-        # Преобразуем список целых чисел в объект bytes
-        byte_sequence = bytes(decode_packet)
-        # Используем метод hex() для преобразования в шестнадцатеричную строку
-        hex_string = byte_sequence.hex()
+        # Рабочий ключ в конце данных, перед ним его счетчик СЧРК
+        work_key_shift = len(decode_packet) - 16
+        work_key = decode_packet[work_key_shift:]
+        work_key_counter = int.from_bytes(decode_packet[work_key_shift - 4:work_key_shift], 'little')
         # Забираем рабочий ключ для исходящих пакетов абонента
-        work_key_shift = len(hex_string) - 32
-        if self.mac[0] == self.give_addr[address]:
-            self.work_key_in[address] = hex_string[work_key_shift:]
-            self.work_key_in_counter[address] = hex_string[work_key_shift - 8:work_key_shift]
+        if self.mac[0] == key_state.mac:
+            key_state.work_key_in = work_key
+            key_state.work_key_in_counter = work_key_counter
         # Забираем рабочий ключ для входящих пакетов абонента
-        elif self.mac[1] == self.give_addr[address]:
-            self.work_key_out[address] = hex_string[work_key_shift:]
-            self.work_key_out_counter[address] = hex_string[work_key_shift - 8:work_key_shift]
+        elif self.mac[1] == key_state.mac:
+            key_state.work_key_out = work_key
+            key_state.work_key_out_counter = work_key_counter
         # Ставим флаг, что ключ получен
         self.new_wkey_saved = True
         return decode_packet
 
-    def _decrypt_aes(self, init_vector_str, key_str, data_str):
+    def _decrypt_aes(self, init_vector, key, data_bytes):
         """Расшифровка AES для ориона2"""
-        # Преобразуем строку в байты
-        key = bytes.fromhex(key_str)
-        init_vector = bytes.fromhex(init_vector_str)
-        # Шифрование стартовой последовательности (ECB mode)
-        cipher = AES.new(key, AES.MODE_ECB)
-        encrypted_data = cipher.encrypt(init_vector)
-
-        first_vector = True
-        xor_result = ""
-        old_data = ""
-        decoded = []
-
-        # Расшифровываем все данные в пакете
-        while len(data_str) > 0:
-            try:
-                # Обрезаем по 16 байт (32 символа)
-                data = bytes.fromhex(data_str[:32])
-                data_str = data_str[32:]
-                # После первого прохода начальные данные для расшифровки это предыдущие данные
-                if not first_vector:
-                    # Шифрование последовательности (ECB mode)
-                    encrypted_data = cipher.encrypt(old_data)
-
-                def xor_bytes(a, b):
-                    """Функция для выполнения XOR между двумя байтовыми последовательностями"""
-                    return bytes(x ^ y for x, y in zip(a, b))
-
-                # Применение XOR к зашифрованным данным
-                if len(encrypted_data) == 16:
-                    xor_result = xor_bytes(encrypted_data[:16], data) + encrypted_data[16:]
-                # Собираем расшифрованные данные
-                decoded += xor_result
-                # Запоминаем пакет 16 байт как стартовую последовательность для расшифровки последующих пакетов
-                old_data = data
-                # Сбрасываем флаг начальной последовательности
-                first_vector = False
-            except Exception as ex:
-                self.main_gui.update_message_area(f"Произошла при расшифровке AES: {ex}")
-        return decoded
+        return self.cipher.decrypt(key, init_vector, data_bytes)
@@ -0,0 +1,91 @@
+import time
+
+# Смещение системного времени относительно time.monotonic_ns(), фиксируется при запуске программы.
+# Отметки приема хранятся в monotonic_ns, в местное время они переводятся только при выводе.
+WALL_CLOCK_ANCHOR_NS = time.time_ns() - time.monotonic_ns()
+
+# Последняя отформатированная секунда (секунда, "HH:MM:SS"), соседние записи обычно попадают в одну секунду
+_formatted_second = (None, "")
+
+
+def format_timestamp(monotonic_ns: int) -> str:
+    """Переводит отметку приема time.monotonic_ns() в местное время вида HH:MM:SS.ffffff."""
+    global _formatted_second
+    seconds, nanoseconds = divmod(monotonic_ns + WALL_CLOCK_ANCHOR_NS, 1_000_000_000)
+    cached_second, text = _formatted_second
+    if seconds != cached_second:
+        text = time.strftime("%H:%M:%S", time.localtime(seconds))
+        _formatted_second = (seconds, text)
+    return f"{text}.{nanoseconds // 1000:06d}"
+
+
+class DecodedFrame:
+    """
+    Запись о разобранном пакете для окна вывода и лог-файла.
+    Хранит поля в исходном виде, строки формируются только когда получатель
+    действительно выводит или записывает запись.
+    """
+
+    __slots__ = ("timestamp", "packet", "packet_len", "packet_num", "direction", "packet_type_flags", "decode", "link")
+
+    def __init__(self, timestamp, packet, packet_len="", packet_num="", direction="", packet_type_flags="",
+                 decode="", link=""):
+        """
+        Инициализация записи.
+        :param timestamp: Время приема первого байта пакета (time.monotonic_ns()) или готовая строка времени.
+        :param packet: Сырые данные (bytes) или уже декодированный текст (str).
+        :param packet_len: Длина пакета.
+        :param packet_num: Номер пакета.
+        :param direction: Направление и мак-адреса.
+        :param packet_type_flags: Тип пакета и флаги заголовка.
+        :param decode: Расшифрованные данные или текст ошибки.
+        :param link: Идентификатор линии связи при одновременном захвате нескольких линий.
+        """
+        self.timestamp = timestamp
+        self.packet = packet
+        self.packet_len = packet_len
+        self.packet_num = packet_num
+        self.direction = direction
+        self.packet_type_flags = packet_type_flags
+        self.decode = decode
+        self.link = link
+
+    @property
+    def time_text(self) -> str:
+        """Отметка времени в местном времени, с идентификатором линии, если он задан."""
+        timestamp = self.timestamp
+        if not isinstance(timestamp, str):
+            timestamp = format_timestamp(timestamp)
+        if self.link:
+            return f"[{self.link}] {timestamp}"
+        return timestamp
+
+    @property
+    def raw_text(self) -> str:
+        """Сырые данные в виде строки, байты выводятся в hex."""
+        packet = self.packet
+        if isinstance(packet, str):
+            return packet
+        return packet.hex()
+
+    @property
+    def decode_text(self) -> str:
+        """Расшифрованные данные в виде строки, байты выводятся списком чисел."""
+        decode = self.decode
+        if isinstance(decode, (bytes, bytearray)):
+            return str(list(decode))
+        return str(decode)
+
+    def columns(self) -> tuple:
+        """Возвращает значения столбцов таблицы вывода."""
+        if not self.decode:
+            return self.time_text, self.raw_text, "", "", "", "", ""
+        return (self.time_text, self.raw_text, str(self.packet_len), str(self.packet_num), self.direction,
+                self.packet_type_flags, self.decode_text)
+
+    def to_log_line(self) -> str:
+        """Возвращает строку для записи в лог-файл."""
+        if not self.decode:
+            return f"{self.time_text}  {self.raw_text}"
+        return (f"{self.time_text}  {self.raw_text}  {self.packet_len}  {self.packet_num}  {self.direction}  "
+                f"{self.packet_type_flags}  {self.decode_text}")
@@ -2,42 +2,75 @@ import os
 import queue
 import threading
 import datetime
+import time
+
+from log_archiver import COMPRESSED_EXTENSION
 
 class FileLogger:
     """
     Класс для управления файловым логированием.
     Отвечает за создание лог-файлов, буферизированную запись данных
     и управление потоком логирования.
+    Файл лога открыт все время работы потока, записи накапливаются в буфере и записываются
+    одним вызовом, когда набралось flush_bytes байт или прошло flush_interval секунд
+    с первой записи буфера.
+    Когда записанный объем достигает file_size_limit, поток записи сам переходит на новый файл,
+    записи при этом не теряются.
     """
 
-    def __init__(self, data_queue: queue.Queue, on_error=None, on_file_size_exceeded=None):
-        """Инициализация объекта FileLogger."""
+    def __init__(self, data_queue: queue.Queue, on_error=None, on_file_rotated=None, folder_path: str = 'logs',
+                 flush_bytes: int = 64 * 1024, flush_interval: float = 0.1, fsync_interval: float = 0,
+                 file_size_limit: int = 5 * 1024 * 1024, archiver=None):
+        """
+        Инициализация объекта FileLogger.
+        :param data_queue: Очередь записей лога (строки или записи разобранных пакетов).
+        :param on_error: Callback для сообщений и ошибок.
+        :param on_file_rotated: Callback перехода на новый файл при превышении размера, получает путь нового файла.
+                                Вызывается из потока записи.
+        :param folder_path: Директория лог-файлов.
+        :param flush_bytes: Объем буфера в байтах, при котором он записывается в файл.
+        :param flush_interval: Максимальное время нахождения записи в буфере в секундах.
+        :param fsync_interval: Период принудительного сброса файла на диск (os.fsync) в секундах, 0 - не сбрасывать.
+        :param file_size_limit: Размер файла лога в байтах, после которого начинается новый файл (0 - без ограничения).
+        :param archiver: LogArchiver, которому передаются законченные при смене файла логи на сжатие.
+        """
         # Основные компоненты
         self._data_queue = data_queue
         # Callback для уведомления об ошибках
         self._on_error = on_error
-        # Callback для уведомления о превышении размера файла
-        self._on_file_size_exceeded = on_file_size_exceeded
+        # Callback для уведомления о переходе на новый файл
+        self._on_file_rotated = on_file_rotated
         # Максимальный размер файла лога
-        self._file_size_limit = 5 * 1024 * 1024  # 5 MB в байтах
+        self.file_size_limit = file_size_limit
+        # Сжатие законченных файлов
+        self._archiver = archiver
 
         # Управление потоком
         self._log_thread = None
         self._stop_event = threading.Event()
 
         # Настройки буфера
-        self._buffer = []
-        self._buffer_size = 10
+        self._buffer = bytearray()
+        self._flush_bytes = flush_bytes
+        self._flush_interval = flush_interval
+        # Время (monotonic), когда буфер должен быть записан
+        self._flush_deadline = 0.0
+        # Максимальное количество записей, забираемых из очереди за один захват блокировки
+        self._max_batch = 4096
+        # Сброс файла на диск
+        self._fsync_interval = fsync_interval
+        self._last_fsync = 0.0
 
         # Параметры файла лога
-        self._folder_path = 'logs'
+        self._folder_path = folder_path
         self._file_prefix = 'log_'
         self._file_extension = '.txt'
-        self._timestamp = ''
         self._current_log_path = ''
-
-        # Таймер для проверки размера файла
-        self._size_check_timer = None
+        # Объем, записанный в текущий файл
+        self._written_bytes = 0
+        # Открытый файл лога и перевод строки (как при записи в текстовом режиме)
+        self._file = None
+        self._newline = os.linesep.encode("ascii")
 
         # Создаем директорию для логов при инициализации
         self._ensure_log_directory()
@@ -59,92 +92,178 @@ class FileLogger:
             self._handle_error("Поток логирования уже запущен.")
             return
 
-        # Создаем метку времени и путь к файлу
-        self._timestamp = datetime.datetime.now().strftime("%H_%M_%S")
-        self._current_log_path = os.path.join(
-            self._folder_path,
-            f"{self._file_prefix}{self._timestamp}{self._file_extension}"
-        )
-
         try:
-            # Проверяем возможность записи в файл
-            with open(self._current_log_path, "a", encoding="utf-8"):
-                pass
-            self._handle_error(f"Создан файл лога: {self._current_log_path}")
+            self._open_log_file()
         except IOError as e:
             self._handle_error(f"Ошибка создания файла лога: {e}")
             raise
+        self._handle_error(f"Создан файл лога: {self._current_log_path}")
 
         # Запускаем поток логирования
         self._stop_event.clear()
         self._log_thread = threading.Thread(target=self._logging_worker, daemon=True)
         self._log_thread.start()
 
-        # Запускаем таймер для проверки размера файла
-        self._start_size_check_timer()
-
     def stop(self):
-        """Останавливает поток логирования и сбрасывает оставшийся буфер."""
+        """Останавливает поток логирования, дописывает оставшиеся в очереди записи и закрывает файл."""
         self._stop_event.set()
 
-        # Останавливаем таймер
-        if self._size_check_timer:
-            self._size_check_timer.cancel()
-
-        # Ждем завершения потока
         if self._log_thread and self._log_thread.is_alive():
-            self._log_thread.join(timeout=1.0)
+            # Признак остановки будит поток записи, оставшиеся записи он допишет и закроет файл сам
+            self._data_queue.put(None)
+            self._log_thread.join()
+        else:
+            # Поток записи не работает, буфер и файл больше никто не использует
+            self._finish()
+        self._log_thread = None
 
-        # Записываем оставшиеся данные
-        self._flush_buffer()
-        self._data_queue.queue.clear()
-
-    def _start_size_check_timer(self):
-        """Запускает таймер для проверки размера файла."""
-        self._size_check_timer = threading.Timer(1.0, self._check_file_size)
-        self._size_check_timer.start()
-
-    def _check_file_size(self):
-        """Проверяет размер файла и вызывает callback, если он превышает 5 МБ."""
-        if os.path.exists(self._current_log_path):
-            file_size = os.path.getsize(self._current_log_path)
-            if file_size > self._file_size_limit:  # 5 МБ
-                if self._on_file_size_exceeded:
-                    self._on_file_size_exceeded()
-        # Перезапускаем таймер
-        self._start_size_check_timer()
+    def _open_log_file(self):
+        """
+        Создает новый файл лога с неповторяющимся именем и делает его текущим.
+        :raises IOError: Если файл не удалось создать.
+        """
+        name = self._file_prefix + datetime.datetime.now().strftime("%Y-%m-%d_%H_%M_%S")
+        path = os.path.join(self._folder_path, name + self._file_extension)
+        counter = 1
+        # Имя не должно совпадать и с уже сжатым файлом
+        while os.path.exists(path) or os.path.exists(path + COMPRESSED_EXTENSION):
+            path = os.path.join(self._folder_path, f"{name}_{counter}{self._file_extension}")
+            counter += 1
+        # Файл остается открытым до остановки или перехода на новый файл
+        self._file = open(path, "ab")
+        self._current_log_path = path
+        if self._archiver:
+            self._archiver.active_path = path
+        self._written_bytes = 0
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self):
+        """Переходит на новый файл лога: старый закрывается только после создания нового."""
+        old_file = self._file
+        old_path = self._current_log_path
+        try:
+            self._open_log_file()
+        except IOError as e:
+            # Продолжаем писать в старый файл, повторим после следующей записи
+            self._handle_error(f"Ошибка создания файла лога: {e}")
+            return
+        try:
+            if self._fsync_interval:
+                os.fsync(old_file.fileno())
+            old_file.close()
+        except OSError as e:
+            self._handle_error(f"Ошибка записи в файл лога: {e}")
+        else:
+            if self._archiver:
+                self._archiver.archive(old_path)
+        if self._on_file_rotated:
+            self._on_file_rotated(self._current_log_path)
+
+    def _close_file(self):
+        """Сбрасывает файл лога на диск, если это включено, и закрывает его."""
+        if self._file is None:
+            return
+        try:
+            if self._fsync_interval:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        except OSError as e:
+            self._handle_error(f"Ошибка записи в файл лога: {e}")
+        self._file = None
 
     def _logging_worker(self):
         """Фоновый поток для обработки и записи данных лога."""
+        buffer = self._buffer
         while not self._stop_event.is_set():
+            # Пока в буфере есть записи, ждем не дольше срока их записи
+            timeout = max(self._flush_deadline - time.monotonic(), 0) if buffer else 1
             try:
-                # Получаем данные из очереди
-                data = self._data_queue.get(timeout=1)
-                self._buffer.append(data + "\n")
-
-                # Проверяем необходимость сброса буфера
-                if len(self._buffer) >= self._buffer_size:
-                    self._flush_buffer()
-
+                # Получаем данные из очереди: первую запись с ожиданием, остальные - все накопленные разом
+                records = [self._data_queue.get(timeout=timeout)]
             except queue.Empty:
+                self._flush_buffer()
                 continue
+            records += self._take_all()
+
+            if not buffer:
+                self._flush_deadline = time.monotonic() + self._flush_interval
+            self._add_records(records)
+
+            # Объем буфера проверяется при добавлении записей, здесь - время нахождения в буфере
+            if time.monotonic() >= self._flush_deadline:
+                self._flush_buffer()
+        self._finish()
+
+    def _finish(self):
+        """Дописывает оставшиеся в очереди записи, записывает буфер и закрывает файл."""
+        if self._file is not None:
+            records = self._take_all()
+            while records:
+                self._add_records(records)
+                records = self._take_all()
+        self._flush_buffer()
+        self._close_file()
+
+    def _add_records(self, records: list):
+        """Форматирует записи и добавляет их в буфер, записывая буфер по мере наполнения."""
+        buffer = self._buffer
+        newline = self._newline
+        threshold = self._flush_threshold()
+        for data in records:
+            # Записи разобранных пакетов форматируются только здесь, при записи в файл
+            if not isinstance(data, str):
+                if data is None:
+                    # Признак остановки из stop
+                    continue
+                data = data.to_log_line()
+            buffer += data.encode("utf-8")
+            buffer += newline
+            if len(buffer) >= threshold:
+                self._flush_buffer()
+                threshold = self._flush_threshold()
+
+    def _flush_threshold(self) -> int:
+        """Объем буфера, при котором его пора записать: не больше, чем осталось до смены файла."""
+        if self.file_size_limit:
+            return max(min(self._flush_bytes, self.file_size_limit - self._written_bytes), 1)
+        return self._flush_bytes
+
+    def _take_all(self) -> list:
+        """Забирает из очереди все доступные записи за один захват блокировки."""
+        records = []
+        data_queue = self._data_queue
+        with data_queue.mutex:
+            while data_queue._qsize() and len(records) < self._max_batch:
+                records.append(data_queue._get())
+            if records:
+                data_queue.not_full.notify_all()
+        return records
 
     def _flush_buffer(self):
-        """Записывает буферизированные данные в файл лога."""
-        if not self._buffer:
+        """Записывает буферизированные данные в файл лога одним вызовом."""
+        if not self._buffer or self._file is None:
             return
 
         try:
             # Записываем данные из буфера в файл
-            with open(self._current_log_path, "a", encoding="utf-8", buffering=1) as log_file:
-                log_file.writelines(self._buffer)
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._written_bytes += len(self._buffer)
             self._buffer.clear()
+            if self._fsync_interval and time.monotonic() - self._last_fsync >= self._fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = time.monotonic()
         except IOError as e:
             self._handle_error(f"Ошибка записи в файл лога: {e}")
+            return
+
+        # Размер файла известен по записанному объему, новый файл начинаем между записями буфера
+        if self.file_size_limit and self._written_bytes >= self.file_size_limit:
+            self._rotate()
 
     def _handle_error(self, message: str):
         """Обрабатывает статусные сообщения через callback или выводит в консоль."""
         if self._on_error:
             self._on_error(message)
         else:
-            print(message)
\ No newline at end of file
+            print(message)
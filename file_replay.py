@@ -0,0 +1,391 @@
+"""
+Воспроизведение файлов захвата и HEX-логов.
+
+Из интерфейса файл воспроизводится в обработчик (DataProcessing). Из командной строки - на локальный
+UDP-адрес или COM-порт (например, одну из пары виртуальных портов), который слушает программа:
+    python file_replay.py captures/capture_2024-05-14_14_00_00.o2cap --udp 127.0.0.1:5000 --speed 10
+    python file_replay.py logs/log_2024-05-14_14_00_00.txt.gz --serial COM11 --baudrate 115200 --speed 1
+"""
+import argparse
+import mmap
+import os
+import socket
+import sys
+import threading
+import time
+
+import serial
+
+import capture_file
+import log_archiver
+from udp_address import parse_address
+
+# Длительность суток в наносекундах
+DAY_NS = 24 * 3600 * 1_000_000_000
+
+
+class FileReplay:
+    """
+    Воспроизведение файла в очередь данных отдельным потоком.
+    Текстовые HEX-логи читаются через отображение файла в память (сжатые - потоково с распаковкой),
+    строки разбираются по одной по мере отправки; файлы захвата читаются через CaptureReader.
+    Отправка ждет, пока в очереди данных больше max_pending порций, поэтому память не зависит
+    от размера файла, а обработчик получает данные с той скоростью, с какой успевает их разбирать.
+    С заданной скоростью порции отправляются с исходными промежутками времени (время приема захвата
+    или время строки HEX-лога), деленными на скорость, и получают время фактической отправки.
+    """
+
+    def __init__(self, data_queue, on_error=None, on_progress=None, on_finished=None,
+                 max_pending: int = 1024, progress_interval: float = 1.0):
+        """
+        Инициализация объекта FileReplay.
+        :param data_queue: Очередь данных обработчика (queue.Queue, BoundedQueue или RingBuffer).
+        :param on_error: Callback для сообщений и ошибок.
+        :param on_progress: Callback хода чтения (прочитано байт файла, размер файла, байт файла в секунду).
+        :param on_finished: Callback завершения чтения (порций, байт данных, секунд), вызывается и при остановке.
+        :param max_pending: Максимальное количество порций в очереди данных, дальше чтение ждет обработчик.
+        :param progress_interval: Период вызова on_progress в секундах.
+        """
+        self._data_queue = data_queue
+        self._on_error = on_error
+        self._on_progress = on_progress
+        self._on_finished = on_finished
+        self.max_pending = max_pending
+        self.progress_interval = progress_interval
+
+        # Управление потоком
+        self._replay_thread = None
+        self._stop_event = threading.Event()
+
+        # Ход чтения
+        self.path = ""
+        self.total_bytes = 0
+        self.read_bytes = 0
+        self.sent_chunks = 0
+        self.sent_bytes = 0
+        self.bad_lines = 0
+        self._started = 0.0
+        self._next_progress = 0.0
+
+        # Воспроизведение с исходными промежутками времени: скорость (0 - без пауз),
+        # наибольшее отставание от расписания в секундах
+        self.speed = 0
+        self.max_late = 0.0
+        # Время предыдущей строки HEX-лога от начала первых суток лога
+        self._line_ns = 0
+        self._day_ns = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Проверяет, активен ли поток воспроизведения."""
+        return bool(self._replay_thread and self._replay_thread.is_alive())
+
+    def start(self, path: str, start_ns: int = None, end_ns: int = None, speed: float = 0, link: str = None):
+        """
+        Запускает воспроизведение файла.
+        :param path: Путь файла: текстовый HEX-лог (в том числе сжатый) или файл захвата.
+        :param start_ns: Начало интервала времени для файлов захвата, None - от начала файла.
+        :param end_ns: Конец интервала времени для файлов захвата, None - до конца файла.
+        :param speed: Скорость относительно записи (1 - как записано, 10 - в 10 раз быстрее), 0 - без пауз.
+        :param link: Линия файла захвата, по умолчанию линия первой порции.
+        :raises OSError: Если файл не удалось открыть.
+        :raises ValueError: Если файл захвата поврежден.
+        """
+        if self.is_running:
+            self._handle_error("Воспроизведение файла уже запущено.")
+            return
+        # Файл открываем здесь, чтобы ошибка открытия дошла до вызывающего
+        if capture_file.is_capture_file(path):
+            reader = capture_file.CaptureReader(path)
+            chunks = self._capture_chunks(reader, start_ns, end_ns, link)
+        else:
+            chunks = self._text_chunks(path)
+        self.path = path
+        self.total_bytes = os.path.getsize(path)
+        self.read_bytes = 0
+        self.sent_chunks = 0
+        self.sent_bytes = 0
+        self.bad_lines = 0
+        self.speed = speed
+        self.max_late = 0.0
+        self._line_ns = self._day_ns = 0
+        self._stop_event.clear()
+        self._replay_thread = threading.Thread(target=self._replay_worker, args=(chunks,), daemon=True)
+        self._replay_thread.start()
+
+    def stop(self):
+        """Останавливает воспроизведение (уже отправленные порции остаются в очереди)."""
+        self._stop_event.set()
+        if self._replay_thread and self._replay_thread.is_alive():
+            self._replay_thread.join(timeout=1.0)
+        self._replay_thread = None
+
+    def _replay_worker(self, chunks):
+        """Фоновый поток: отправляет порции в очередь данных, ожидая обработчик."""
+        data_queue = self._data_queue
+        # У кольцевого буфера нет счетчика порций, он сам ждет места при записи
+        not_full = getattr(data_queue, "not_full", None)
+        max_pending = self.max_pending
+        stop_event = self._stop_event
+        speed = self.speed
+        # Время первой порции в файле и время ее отправки
+        first_ns = start_ns = None
+        self._started = time.monotonic()
+        self._next_progress = self._started + self.progress_interval
+        try:
+            for chunk in chunks:
+                if speed:
+                    rx_ns, data = chunk
+                    if first_ns is None:
+                        first_ns, start_ns = rx_ns, time.monotonic_ns()
+                    due_ns = start_ns + int((rx_ns - first_ns) / speed)
+                    delay_ns = due_ns - time.monotonic_ns()
+                    if delay_ns > 0 and stop_event.wait(delay_ns / 1e9):
+                        break
+                if not_full is not None and data_queue.qsize() >= max_pending:
+                    with not_full:
+                        while data_queue._qsize() >= max_pending and not stop_event.is_set():
+                            not_full.wait(0.1)
+                if stop_event.is_set():
+                    break
+                if speed:
+                    # Порция уходит как принятая сейчас, отставание от расписания учитываем
+                    now_ns = time.monotonic_ns()
+                    late = (now_ns - due_ns) / 1e9
+                    if late > self.max_late:
+                        self.max_late = late
+                    chunk = (now_ns, data)
+                data_queue.put(chunk)
+                self.sent_chunks += 1
+                self.sent_bytes += len(chunk[1])
+        except (OSError, EOFError, ValueError) as e:
+            self._handle_error(f"Ошибка при чтении файла: {e}")
+        finally:
+            # Закрываем файл генератора
+            chunks.close()
+        if self.bad_lines:
+            self._handle_error(f"Строк, не преобразованных в байты: {self.bad_lines}")
+        if self._on_finished:
+            self._on_finished(self.sent_chunks, self.sent_bytes, time.monotonic() - self._started)
+
+    def _report_progress(self, read_bytes: int):
+        """Учитывает прочитанный объем файла и периодически сообщает ход чтения."""
+        self.read_bytes = read_bytes
+        now = time.monotonic()
+        if now < self._next_progress:
+            return
+        self._next_progress = now + self.progress_interval
+        if self._on_progress:
+            self._on_progress(read_bytes, self.total_bytes, read_bytes / max(now - self._started, 1e-9))
+
+    def _capture_chunks(self, reader, start_ns: int, end_ns: int, link: str = None):
+        """Генератор порций файла захвата с их временем приема."""
+        with reader:
+            count = 0
+            for chunk in reader.data_chunks(link, start_ns, end_ns):
+                yield chunk
+                count += 1
+                # Ход чтения оцениваем по объему отправленных данных (заголовки записей не учитываются)
+                if not count & 0xFF:
+                    self._report_progress(min(self.sent_bytes, self.total_bytes))
+            self._report_progress(self.total_bytes)
+
+    def _text_chunks(self, path: str):
+        """Генератор порций текстового HEX-лога: строка файла - порция."""
+        file = open(path, "rb")
+        data = None
+        try:
+            compressed = file.read(len(log_archiver.GZIP_MAGIC)) == log_archiver.GZIP_MAGIC
+            # Пустой файл отобразить в память нельзя
+            if not compressed and os.fstat(file.fileno()).st_size:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            if data is None:
+                file.close()
+        return self._mapped_lines(file, data) if data is not None else self._stream_lines(path, compressed)
+
+    def _mapped_lines(self, file, data):
+        """Разбирает строки отображенного в память файла."""
+        try:
+            size = len(data)
+            find = data.find
+            pos = 0
+            count = 0
+            while pos < size:
+                end = find(b"\n", pos)
+                if end == -1:
+                    end = size
+                chunk = self._parse_line(data[pos:end])
+                pos = end + 1
+                if chunk is not None:
+                    yield chunk
+                count += 1
+                if not count & 0xFF:
+                    self._report_progress(pos)
+            self._report_progress(size)
+        finally:
+            data.close()
+            file.close()
+
+    def _stream_lines(self, path: str, compressed: bool):
+        """Разбирает строки файла потоково (сжатый или пустой файл)."""
+        with log_archiver.open_text(path) as text:
+            # Ход чтения - по позиции в сжатом файле
+            raw = getattr(text, "buffer", None)
+            raw = getattr(raw, "fileobj", None) if compressed else None
+            count = 0
+            for line in text:
+                chunk = self._parse_line(line)
+                if chunk is not None:
+                    yield chunk
+                count += 1
+                if raw is not None and not count & 0xFF:
+                    self._report_progress(raw.tell())
+        self._report_progress(self.total_bytes)
+
+    def _parse_line(self, line):
+        """
+        Преобразует строку HEX-лога в порцию данных.
+        :param line: Строка (bytes или str).
+        :return: Кортеж (время, данные) или None для пустой и ошибочной строки. Время - time.monotonic_ns(),
+                 а при воспроизведении с паузами - время строки лога (у строки без времени - время предыдущей).
+        """
+        stripped_line = line.strip()
+        if not stripped_line:
+            return None
+        if isinstance(stripped_line, bytes):
+            stripped_line = stripped_line.decode("utf-8", errors="replace")
+        try:
+            rx_ns = self._line_ns if self.speed else time.monotonic_ns()
+            # Обрезка времени если данные сняты этой прогой через хекс
+            if stripped_line[2:3] == ':':
+                if self.speed:
+                    rx_ns = self._line_time_ns(stripped_line)
+                stripped_line = stripped_line[17:]
+            return rx_ns, bytes.fromhex(stripped_line)
+        except ValueError:
+            self.bad_lines += 1
+            # Первые ошибочные строки показываем, остальные только считаем
+            if self.bad_lines <= 10:
+                self._handle_error(f"Ошибка преобразования строки в байты: {stripped_line}")
+            return None
+
+    def _line_time_ns(self, line: str) -> int:
+        """
+        Время строки HEX-лога ЧЧ:ММ:СС.ffffff в наносекундах от начала первых суток лога.
+        :raises ValueError: Если время записано неверно.
+        """
+        line_ns = ((int(line[0:2]) * 60 + int(line[3:5])) * 60 + int(line[6:8])) * 1_000_000_000
+        if line[8:9] == ".":
+            line_ns += int(line[9:15]) * 1000
+        line_ns += self._day_ns
+        # Время ушло назад больше чем на полсуток - лог перешел через полночь
+        if line_ns < self._line_ns - DAY_NS // 2:
+            self._day_ns += DAY_NS
+            line_ns += DAY_NS
+        self._line_ns = line_ns
+        return line_ns
+
+    def _handle_error(self, message: str):
+        """Обрабатывает статусные сообщения через callback или выводит в консоль."""
+        if self._on_error:
+            self._on_error(message)
+        else:
+            print(message)
+
+
+class UdpSink:
+    """Отправка порций на UDP-адрес: каждая порция - одна датаграмма (совместимо с queue.Queue.put)."""
+
+    def __init__(self, ip: str, port: int):
+        """
+        Инициализация объекта UdpSink.
+        :raises OSError: Если сокет не удалось создать.
+        """
+        self._address = (ip, port)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """Отправляет данные порции (время, данные)."""
+        self._sock.sendto(item[1], self._address)
+
+    def close(self):
+        """Закрывает сокет."""
+        self._sock.close()
+
+
+class SerialSink:
+    """Запись порций в COM-порт (совместимо с queue.Queue.put), запись ждет передачи на скорости порта."""
+
+    def __init__(self, port: str, baudrate: int = 115200, bytesize: int = 8, parity: str = "N", stopbits: int = 1):
+        """
+        Инициализация объекта SerialSink.
+        :raises serial.SerialException: Если порт не удалось открыть.
+        """
+        self._serial = serial.Serial(port=port, baudrate=baudrate, bytesize=bytesize, parity=parity,
+                                     stopbits=stopbits, write_timeout=None)
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """Записывает данные порции (время, данные)."""
+        self._serial.write(item[1])
+
+    def close(self):
+        """Дожидается передачи и закрывает порт."""
+        self._serial.flush()
+        self._serial.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Воспроизведение файла захвата или HEX-лога на UDP-адрес или COM-порт")
+    parser.add_argument("path", help="Файл захвата (.o2cap) или HEX-лог (.txt, .txt.gz)")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--udp", type=parse_address, metavar="IP:PORT", help="Адрес UDP, на который отправлять порции")
+    output.add_argument("--serial", metavar="PORT", help="COM-порт, в который записывать порции")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--bytesize", type=int, default=8, choices=(5, 6, 7, 8))
+    parser.add_argument("--parity", default="N", choices=("N", "E", "O", "M", "S"))
+    parser.add_argument("--stopbits", type=int, default=1, choices=(1, 2))
+    parser.add_argument("--speed", type=float, default=1,
+                        help="Скорость относительно записи: 1 - как записано, 10 - в 10 раз быстрее, 0 - без пауз")
+    parser.add_argument("--link", help="Линия файла захвата (по умолчанию линия первой порции)")
+    parser.add_argument("--from", dest="time_from", metavar="ЧЧ:ММ:СС", help="Начало интервала файла захвата")
+    parser.add_argument("--to", dest="time_to", metavar="ЧЧ:ММ:СС", help="Конец интервала файла захвата")
+    args = parser.parse_args(argv)
+
+    start_ns = end_ns = None
+    try:
+        if (args.time_from or args.time_to) and capture_file.is_capture_file(args.path):
+            with capture_file.CaptureReader(args.path) as reader:
+                start_ns, end_ns = reader.time_window(args.time_from, args.time_to)
+        if args.udp:
+            sink = UdpSink(*args.udp)
+        else:
+            sink = SerialSink(args.serial, args.baudrate, args.bytesize, args.parity, args.stopbits)
+    except (OSError, ValueError, serial.SerialException) as e:
+        parser.error(str(e))
+
+    def report_progress(read_bytes, total_bytes, rate):
+        percent = read_bytes * 100 // total_bytes if total_bytes else 100
+        print(f"{percent}%  {rate / (1024 * 1024):.1f} МБ/с", flush=True)
+
+    def report_finished(chunks, data_bytes, seconds):
+        print(f"Отправлено порций: {chunks}, байт: {data_bytes} за {seconds:.1f} с, "
+              f"наибольшее отставание от расписания: {replay.max_late * 1000:.1f} мс", flush=True)
+
+    replay = FileReplay(sink, on_progress=report_progress, on_finished=report_finished)
+    try:
+        replay.start(args.path, start_ns, end_ns, speed=args.speed, link=args.link)
+        while replay.is_running:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        replay.stop()
+    except (OSError, ValueError) as e:
+        print(f"Ошибка при чтении файла: {e}", file=sys.stderr)
+        return 1
+    finally:
+        sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import glob
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Расширение сжатых файлов
+COMPRESSED_EXTENSION = ".gz"
+# Сигнатура файла gzip
+GZIP_MAGIC = b"\x1f\x8b"
+# Размер блока потокового сжатия
+CHUNK_SIZE = 1024 * 1024
+
+
+def open_text(path: str):
+    """
+    Открывает текстовый файл лога на чтение: сжатый (по сигнатуре gzip) распаковывается на лету.
+    :raises OSError: Если файл не удалось открыть.
+    """
+    with open(path, "rb") as file:
+        compressed = file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+class LogArchiver:
+    """
+    Сжатие законченных лог-файлов и удаление старых отдельным потоком.
+    Файлы передаются через очередь без ожидания, поэтому запись лога никогда не ждет сжатия.
+    Файл сжимается потоково во временный файл, который затем переименовывается,
+    исходный файл удаляется только после успешного сжатия.
+    После каждого законченного файла удаляются самые старые законченные файлы, сжатые и несжатые,
+    сверх ограничений по суммарному объему и по возрасту. Со степенью сжатия 0 файлы не сжимаются,
+    применяются только ограничения хранения.
+    """
+
+    def __init__(self, folder_path: str = "logs", on_error=None, level: int = 6, pattern: str = "log_*.txt",
+                 max_total_bytes: int = 0, max_age: float = 0):
+        """
+        Инициализация объекта LogArchiver.
+        :param folder_path: Директория лог-файлов.
+        :param on_error: Callback для сообщений и ошибок.
+        :param level: Степень сжатия gzip (1 - быстрее, 9 - сильнее, 0 - не сжимать).
+        :param pattern: Шаблон имен лог-файлов в директории (для ограничений хранения).
+        :param max_total_bytes: Максимальный суммарный объем законченных файлов в байтах (0 - без ограничения).
+        :param max_age: Максимальный возраст законченных файлов в секундах (0 - без ограничения).
+        """
+        self._folder_path = folder_path
+        self._on_error = on_error
+        self.level = level
+        self._pattern = pattern
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        # Текущий файл лога: в него еще пишут, ограничения хранения его не удаляют
+        self.active_path = ""
+        # Очередь путей файлов на сжатие
+        self._queue = queue.Queue()
+
+        # Управление потоком
+        self._archive_thread = None
+
+        # Счетчики
+        self.compressed_files = 0
+        self.removed_files = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Проверяет, активен ли поток сжатия."""
+        return bool(self._archive_thread and self._archive_thread.is_alive())
+
+    def start(self):
+        """Запускает поток сжатия."""
+        if self.is_running:
+            self._handle_error("Поток сжатия логов уже запущен.")
+            return
+        self._archive_thread = threading.Thread(target=self._archiving_worker, daemon=True)
+        self._archive_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Останавливает поток сжатия, дожидаясь сжатия уже переданных файлов.
+        :param timeout: Максимальное время ожидания в секундах.
+        """
+        if self._archive_thread and self._archive_thread.is_alive():
+            # Признак остановки встает в очередь после уже переданных файлов
+            self._queue.put(None)
+            self._archive_thread.join(timeout=timeout)
+        self._archive_thread = None
+
+    def archive(self, path: str):
+        """Передает законченный лог-файл на сжатие и применение ограничений хранения (без ожидания)."""
+        self._queue.put(path)
+
+    def _archiving_worker(self):
+        """Фоновый поток: сжимает переданные файлы и применяет ограничения хранения."""
+        # Ограничения применяем и при запуске: файлы могли накопиться за время простоя
+        self._apply_retention()
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            if not self.level or self._compress(path):
+                self._apply_retention()
+
+    def _compress(self, path: str) -> bool:
+        """
+        Потоково сжимает файл и удаляет исходный.
+        :return: True, если файл сжат.
+        """
+        target = path + COMPRESSED_EXTENSION
+        temp_path = target + ".tmp"
+        if os.path.exists(target):
+            self._handle_error(f"Файл {target} уже существует, файл лога {path} оставлен без сжатия")
+            return False
+        try:
+            with open(path, "rb") as source, open(temp_path, "wb") as raw_target:
+                # Имя и время исходного файла сохраняются в заголовке gzip
+                with gzip.GzipFile(os.path.basename(path), "wb", self.level, raw_target,
+                                   mtime=os.fstat(source.fileno()).st_mtime) as target_file:
+                    shutil.copyfileobj(source, target_file, CHUNK_SIZE)
+            # Сжатый файл получает время изменения исходного, по нему считается возраст
+            stat = os.stat(path)
+            os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(temp_path, target)
+            os.remove(path)
+        except OSError as e:
+            self._handle_error(f"Ошибка сжатия файла лога {path}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+        self.compressed_files += 1
+        return True
+
+    def _apply_retention(self):
+        """Удаляет самые старые законченные файлы сверх ограничений по возрасту и суммарному объему."""
+        if not self.max_total_bytes and not self.max_age:
+            return
+        files = []
+        pattern = os.path.join(self._folder_path, self._pattern)
+        # Несжатые файлы учитываются наравне со сжатыми, кроме текущего файла лога
+        paths = glob.glob(pattern) + glob.glob(pattern + COMPRESSED_EXTENSION)
+        active_path = os.path.abspath(self.active_path) if self.active_path else ""
+        for path in paths:
+            if os.path.abspath(path) == active_path:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        # От старых к новым
+        files.sort()
+        total_bytes = sum(size for _, size, _ in files)
+        oldest_allowed = time.time() - self.max_age
+        for mtime, size, path in files:
+            too_old = self.max_age and mtime < oldest_allowed
+            too_big = self.max_total_bytes and total_bytes > self.max_total_bytes
+            if not too_old and not too_big:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                self._handle_error(f"Ошибка удаления файла лога {path}: {e}")
+                continue
+            total_bytes -= size
+            self.removed_files += 1
+
+    def _handle_error(self, message: str):
+        """Обрабатывает статусные сообщения через callback или выводит в консоль."""
+        if self._on_error:
+            self._on_error(message)
+        else:
+            print(message)
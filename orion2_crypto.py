@@ -0,0 +1,51 @@
+from Crypto.Cipher import AES
+from Crypto.Util.strxor import strxor
+
+
+class Orion2Cipher:
+    """
+    Расшифровка данных Orion2 в режиме AES-CFB-128.
+    Развернутые ключи AES кешируются, расшифровка пакета выполняется двумя вызовами C-кода:
+    шифрование всей последовательности входов CFB и XOR с шифртекстом.
+    """
+
+    # Размер блока AES в байтах
+    BLOCK_SIZE = 16
+    # Максимальное количество ключей в кеше
+    MAX_CACHED_KEYS = 256
+
+    def __init__(self):
+        """Инициализация объекта Orion2Cipher."""
+        # Кеш объектов AES (ECB) по ключу
+        self._ciphers = {}
+
+    def _get_cipher(self, key: bytes):
+        """Возвращает объект AES для ключа, создавая его при первом обращении."""
+        cipher = self._ciphers.get(key)
+        if cipher is None:
+            # Устаревшие рабочие ключи не копим бесконечно
+            if len(self._ciphers) >= self.MAX_CACHED_KEYS:
+                self._ciphers.clear()
+            cipher = AES.new(key, AES.MODE_ECB)
+            self._ciphers[key] = cipher
+        return cipher
+
+    def decrypt(self, key: bytes, init_vector: bytes, data) -> bytes:
+        """
+        Расшифровывает данные в режиме CFB с сегментом 128 бит.
+        Последний неполный блок расшифровывается как в потоковом режиме.
+        :param key: Ключ AES (16 байт).
+        :param init_vector: Начальный вектор (16 байт).
+        :param data: Шифрованные данные (bytes или memoryview).
+        :return: Расшифрованные данные.
+        :raises ValueError: Если длина ключа или начального вектора некорректна.
+        """
+        if len(init_vector) != self.BLOCK_SIZE:
+            raise ValueError(f"Некорректная длина начального вектора: {len(init_vector)}")
+        data_len = len(data)
+        if not data_len:
+            return b""
+        # Входы CFB известны заранее: вектор и все блоки шифртекста, кроме последнего
+        blocks_len = -(-data_len // self.BLOCK_SIZE) * self.BLOCK_SIZE
+        key_stream = self._get_cipher(key).encrypt(init_vector + bytes(data[:blocks_len - self.BLOCK_SIZE]))
+        return strxor(bytes(data), key_stream[:data_len])
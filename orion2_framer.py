@@ -0,0 +1,328 @@
+import time
+
+# Маркер начала пакета
+START_BYTE = 0xFF
+START_MARKER = b"\xFF"
+# Байт подмены
+ESCAPE_BYTE = 0xFE
+ESCAPE_MARKER = b"\xFE"
+# Замены для байта, следующего за байтом подмены
+ESCAPED_BYTES = {0x01: 0xFF, 0x02: 0xFE}
+# Минимальное смещение следующего маркера от начала пакета
+MIN_FRAME_OFFSET = 2
+# Наибольший незавершенный пакет, который хранится в потоковом виде, а не в буфере пакета
+TAIL_LIMIT = 1024
+
+
+def restore(packet: bytes) -> bytes:
+    """Восстанавливает подмененные байты целого пакета (FE 01 -> FF, FE 02 -> FE), байт FE в конце остается."""
+    return packet.replace(b"\xFE\x01", b"\xFF").replace(b"\xFE\x02", b"\xFE")
+
+
+class Orion2Framer:
+    """
+    Инкрементальный сборщик пакетов Orion2 из потока байт.
+    Разбивает поток по маркеру начала пакета 0xFF и за один проход восстанавливает
+    подмененные при передаче байты (FE 01 -> FF, FE 02 -> FE) по мере поступления данных,
+    в том числе когда байт FE пришел в конце одной порции, а 01/02 в начале следующей.
+    Пакеты, целиком пришедшие в порции, выдаются срезами порции. Короткий незавершенный пакет
+    хранится как есть и склеивается со следующей порцией; в буфере пакета собираются только пакеты
+    длиннее TAIL_LIMIT и пакеты из участков общего (кольцевого) буфера.
+    Каждый пакет получает время приема порции, в которой пришел его первый байт.
+    Последний пакет пачки, за которым долго нет следующего маркера, выдается через flush
+    по паузе на линии (idle_timeout).
+    """
+
+    # Пауза на линии в символах, после которой незавершенный пакет считается целым
+    IDLE_CHARS = 4
+    # Нижняя граница паузы в секундах: задержки драйвера и USB-преобразователей (таймер FTDI 16 мс)
+    MIN_IDLE_TIMEOUT = 0.02
+
+    def __init__(self):
+        """Инициализация объекта Orion2Framer."""
+        # Буфер текущего пакета с уже восстановленными байтами
+        self._frame = bytearray()
+        # Последний байт предыдущей порции был байтом подмены
+        self._escape_pending = False
+        # Время приема первого байта текущего пакета (time.monotonic_ns())
+        self._frame_ns = 0
+        # Количество байт текущего пакета в потоке, до восстановления подмененных байт
+        self._raw_length = 0
+        # Незавершенный короткий пакет в потоковом виде (байты подмены не восстановлены)
+        self._tail = b""
+
+    @property
+    def pending(self) -> int:
+        """Количество байт незавершенного пакета в буфере."""
+        return len(self._frame) + self._escape_pending + len(self._tail)
+
+    @property
+    def pending_ns(self) -> int:
+        """Время приема первого байта незавершенного пакета (time.monotonic_ns())."""
+        return self._frame_ns
+
+    @property
+    def flushable(self) -> bool:
+        """Есть ли незавершенный пакет, который можно выдать через flush."""
+        return self.pending >= MIN_FRAME_OFFSET
+
+    @classmethod
+    def idle_timeout(cls, baudrate: int, bytesize: int = 8, parity: str = "N", stopbits: float = 1) -> float:
+        """
+        Пауза на линии, после которой незавершенный пакет выдается без ожидания следующего маркера.
+        :param baudrate: Скорость линии в бодах.
+        :param bytesize: Количество бит данных в символе.
+        :param parity: Тип проверки четности ('N' - без бита четности).
+        :param stopbits: Количество стоп-битов.
+        :return: Время в секундах: IDLE_CHARS символов, но не меньше MIN_IDLE_TIMEOUT.
+        """
+        # Старт-бит, биты данных, бит четности и стоп-биты
+        char_bits = 1 + bytesize + (parity != "N") + stopbits
+        return max(cls.IDLE_CHARS * char_bits / baudrate, cls.MIN_IDLE_TIMEOUT)
+
+    def flush(self) -> list:
+        """
+        Выдает незавершенный пакет как целый (линия замолчала, следующего маркера не будет).
+        :return: Список из одного кортежа (время приема первого байта, пакет) или пустой список,
+                 если в буфере нет данных пакета.
+        """
+        if self._tail:
+            self._spill(self._tail, 0)
+        if len(self._frame) + self._escape_pending < MIN_FRAME_OFFSET:
+            # Одиночный маркер остается началом следующего пакета
+            return []
+        frames = [self._take_frame()]
+        self._raw_length = 0
+        return frames
+
+    def reset(self):
+        """Сбрасывает незавершенный пакет и состояние восстановления байт."""
+        self._frame.clear()
+        self._escape_pending = False
+        self._frame_ns = 0
+        self._raw_length = 0
+        self._tail = b""
+
+    def feed(self, data, start: int = 0, end: int = None, marks=None) -> list:
+        """
+        Добавляет порцию данных и возвращает список собранных целых пакетов.
+        Пакет считается целым, когда после него пришел маркер начала следующего пакета.
+        :param data: Очередная порция байт (bytes или bytearray).
+        :param start: Начало участка данных, если разбирается только часть буфера.
+        :param end: Конец участка данных, по умолчанию до конца буфера.
+        :param marks: Отметки приема [(смещение в data, time.monotonic_ns()), ...] по возрастанию смещений,
+                      первая отметка относится к началу участка. По умолчанию весь участок получает
+                      время вызова.
+        :return: Список кортежей (время приема первого байта пакета, пакет). Пакеты (bytes) с восстановленными
+                 байтами, каждый начинается с маркера 0xFF, если поток не поврежден.
+        """
+        if end is not None or start or self._raw_length:
+            return self._feed_frame(data, start, end, marks)
+        # Короткий незавершенный пакет хранится в потоковом виде и склеивается с порцией (результат - bytes)
+        tail = self._tail
+        if START_BYTE not in data:
+            # Порция без маркера продолжает пакет
+            if not tail:
+                self._frame_ns = time.monotonic_ns() if marks is None else marks[0][1]
+            data = tail + data
+            if len(data) <= TAIL_LIMIT:
+                self._tail = data
+            else:
+                self._spill(data, 0)
+            return []
+        data = tail + data
+        # Маркер в первых MIN_FRAME_OFFSET байтах пакета не разделяет пакеты
+        split = data.find(START_MARKER, MIN_FRAME_OFFSET)
+        rx_ns = time.monotonic_ns() if marks is None else marks[0][1]
+        frame_ns = self._frame_ns if tail else rx_ns
+        if split == -1:
+            frames = []
+            pos = 0
+        else:
+            # Пакет целиком в данных: выдается срезом, подмены восстанавливаются в C
+            packet = data[:split]
+            frames = [(frame_ns, restore(packet) if ESCAPE_BYTE in packet else packet)]
+            pos = split
+            split = data.find(START_MARKER, pos + MIN_FRAME_OFFSET)
+            if marks is not None and len(marks) > 1:
+                # Порция собрана из нескольких чтений: время приема пакетов - по отметкам
+                pos, frame_ns = self._split_frames(data, data, pos, split, len(data), len(tail), marks, rx_ns,
+                                                   True, frames)
+            else:
+                while split != -1:
+                    packet = data[pos:split]
+                    frames.append((rx_ns, restore(packet) if ESCAPE_BYTE in packet else packet))
+                    pos = split
+                    split = data.find(START_MARKER, pos + MIN_FRAME_OFFSET)
+                frame_ns = rx_ns
+        # Последний пакет порции ждет следующего маркера. Он не длиннее порции: пакет, который
+        # продолжается в порциях без маркера, переносится в буфер пакета по TAIL_LIMIT
+        self._frame_ns = frame_ns
+        self._tail = data[pos:]
+        return frames
+
+    def _feed_frame(self, data, start: int, end: int, marks) -> list:
+        """
+        Разбирает участок данных, когда незавершенный пакет собирается в буфере пакета:
+        пакет длиннее TAIL_LIMIT или участок общего буфера (например, кольцевого), который
+        нельзя хранить без копирования. Параметры и результат - как у feed.
+        """
+        if self._tail:
+            self._spill(self._tail, 0)
+        frame = self._frame
+        # Границы пакетов считаются по байтам потока, как и до восстановления подмен
+        pending = self._raw_length
+        whole = end is None and not start
+        if end is None:
+            end = len(data)
+        if whole:
+            # Быстрый путь: порция без маркера продолжает начатый пакет
+            if pending >= MIN_FRAME_OFFSET and START_BYTE not in data:
+                if self._escape_pending or ESCAPE_BYTE in data:
+                    self._unstuff(data, 0, end)
+                else:
+                    frame += data
+                self._raw_length = pending + end
+                return []
+            escapes = self._escape_pending or ESCAPE_BYTE in data
+            view = data
+        else:
+            escapes = self._escape_pending or data.find(ESCAPE_MARKER, start, end) != -1
+            # Участок общего буфера читается без копирования
+            view = memoryview(data)
+        find = data.find
+        split = find(START_MARKER, start + MIN_FRAME_OFFSET - pending
+                     if pending < MIN_FRAME_OFFSET else start, end)
+        if split == -1:
+            # Маркера нет, порция целиком продолжает текущий пакет
+            if not pending:
+                self._frame_ns = time.monotonic_ns() if marks is None else marks[0][1]
+            if escapes:
+                self._unstuff(data, start, end)
+            else:
+                frame += view[start:end]
+            self._raw_length = pending + end - start
+            return []
+
+        rx_ns = time.monotonic_ns() if marks is None else marks[0][1]
+        if pending:
+            # Пакет, начатый в прошлых порциях, завершается маркером этой порции
+            if escapes:
+                self._unstuff(data, start, split)
+            else:
+                frame += view[start:split]
+            frames = [self._take_frame()]
+            pos = split
+            split = find(START_MARKER, pos + MIN_FRAME_OFFSET, end)
+        else:
+            frames = []
+            pos = start
+        if split != -1 or (marks is not None and len(marks) > 1):
+            pos, rx_ns = self._split_frames(data, view, pos, split, end, 0, marks, rx_ns, escapes, frames)
+        # Последний пакет участка ждет следующего маркера
+        self._frame_ns = rx_ns
+        if whole and type(data) is bytes and end - pos <= TAIL_LIMIT:
+            self._tail = data[pos:]
+            self._raw_length = 0
+        else:
+            if escapes:
+                self._unstuff(data, pos, end)
+            else:
+                frame += view[pos:end]
+            self._raw_length = end - pos
+        return frames
+
+    def _split_frames(self, data, view, pos: int, split: int, end: int, offset: int, marks, rx_ns: int,
+                      escapes: bool, frames: list) -> tuple:
+        """
+        Выдает пакеты, целиком лежащие в участке данных, срезами, минуя буфер пакета.
+        :param pos: Начало первого пакета (маркер).
+        :param split: Маркер следующего пакета или -1.
+        :param offset: Смещение начала порции в data (отметки приема отсчитываются от него).
+        :param rx_ns: Время приема начала порции.
+        :param escapes: Могут ли в участке быть байты подмены.
+        :return: Кортеж (начало последнего, незавершенного пакета, время приема его первого байта).
+        """
+        is_bytes = view is data and type(data) is bytes
+        mark_index = 0
+        marks_last = 0 if marks is None else len(marks) - 1
+        while True:
+            # Время приема порции, в которой пришел первый байт пакета
+            while mark_index < marks_last and marks[mark_index + 1][0] + offset <= pos:
+                mark_index += 1
+                rx_ns = marks[mark_index][1]
+            if split == -1:
+                return pos, rx_ns
+            packet = data[pos:split] if is_bytes else bytes(view[pos:split])
+            if escapes and ESCAPE_BYTE in packet:
+                packet = restore(packet)
+            frames.append((rx_ns, packet))
+            pos = split
+            split = data.find(START_MARKER, pos + MIN_FRAME_OFFSET, end)
+
+    def _spill(self, data: bytes, pos: int):
+        """
+        Переносит незавершенный пакет из потокового вида в буфер пакета: длинный пакет
+        собирается в буфере по мере поступления данных.
+        :param pos: Начало пакета в data.
+        """
+        self._tail = b""
+        self._unstuff(data, pos, len(data))
+        self._raw_length = len(data) - pos
+
+    def _take_frame(self) -> tuple:
+        """
+        Забирает пакет из буфера: байт подмены перед маркером остается как есть.
+        :return: Кортеж (время приема первого байта, пакет).
+        """
+        frame = self._frame
+        if self._escape_pending:
+            frame.append(ESCAPE_BYTE)
+            self._escape_pending = False
+        packet = (self._frame_ns, bytes(frame))
+        frame.clear()
+        return packet
+
+    def _unstuff(self, data, start: int, end: int):
+        """
+        Восстанавливает подмененные байты участка данных без маркеров за один проход прямо в буфер пакета:
+        байты между байтами подмены дописываются срезами, байт подмены в конце участка ждет
+        следующий байт из следующей порции.
+        """
+        frame = self._frame
+        # Байт подмены пришел в конце прошлой порции
+        if self._escape_pending and start < end:
+            self._escape_pending = False
+            restored = ESCAPED_BYTES.get(data[start])
+            if restored is None:
+                frame.append(ESCAPE_BYTE)
+            else:
+                frame.append(restored)
+                start += 1
+        find = data.find
+        escape = find(ESCAPE_MARKER, start, end)
+        if escape == -1:
+            with memoryview(data) as view:
+                frame += view[start:end]
+            return
+        append = frame.append
+        with memoryview(data) as view:
+            while escape != -1:
+                if escape > start:
+                    frame += view[start:escape]
+                start = escape + 1
+                if start == end:
+                    # Пара разорвана границей порции, ждем следующий байт
+                    self._escape_pending = True
+                    return
+                escaped = data[start]
+                if escaped == 0x01:
+                    append(START_BYTE)
+                    start += 1
+                elif escaped == 0x02:
+                    append(ESCAPE_BYTE)
+                    start += 1
+                else:
+                    append(ESCAPE_BYTE)
+                escape = find(ESCAPE_MARKER, start, end)
+            frame += view[start:end]
@@ -0,0 +1,48 @@
+class KeyState:
+    """
+    Ключи и счетчики одного адреса абонента Orion2.
+    Счетчики хранятся целыми числами, ключи и мак-адрес - байтами в порядке как в пакете.
+    """
+
+    __slots__ = ("mac", "mac_text", "master_key_counter", "work_key_in", "work_key_in_counter", "work_key_out",
+                 "work_key_out_counter")
+
+    # Маска 32-битного счетчика СЧМК/СЧРК
+    COUNTER_MASK = 0xFFFFFFFF
+
+    def __init__(self):
+        """Инициализация объекта KeyState."""
+        # Мак-адрес GIVEADDR в литл-индиан как в пакете
+        self.mac = b""
+        # Мак-адрес для отображения, в биг-индиан через двоеточие
+        self.mac_text = ""
+        # Счетчик мастер ключа СЧМК
+        self.master_key_counter = 0
+        # Рабочий ключ и его счетчик СЧРК для расшифровки входящего пакета
+        self.work_key_in = b""
+        self.work_key_in_counter = 0
+        # Рабочий ключ и его счетчик СЧРК для расшифровки исходящего пакета
+        self.work_key_out = b""
+        self.work_key_out_counter = 0
+
+    @staticmethod
+    def sync_counter(counter: int, s_counter: int) -> tuple:
+        """
+        Синхронизирует счетчик с младшим байтом счетчика из пакета.
+        Если младший байт не совпадает, счетчик инкрементируется, а если и это не помогло,
+        младший байт заменяется значением из пакета.
+        :param counter: Текущее значение счетчика.
+        :param s_counter: Младший байт счетчика из пакета.
+        :return: Кортеж (новое значение счетчика, True если младший байт пришлось восстановить).
+        """
+        if s_counter == counter & 0xFF:
+            return counter, False
+        counter = (counter + 1) & KeyState.COUNTER_MASK
+        if s_counter == counter & 0xFF:
+            return counter, False
+        return (counter & ~0xFF) | s_counter, True
+
+    @staticmethod
+    def init_vector(iv_prefix: bytes, counter: int) -> bytes:
+        """Формирует начальный вектор расшифровки из saf+daf и счетчика в литл-индиан."""
+        return iv_prefix + counter.to_bytes(4, byteorder='little')
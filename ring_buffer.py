@@ -0,0 +1,230 @@
+import collections
+import queue
+import threading
+import time
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер фиксированного размера между потоком чтения порта и обработчиком данных.
+    Поток чтения пишет данные прямо в заранее выделенную память, обработчик разбирает их
+    на месте участками буфера. Память не растет, на каждое чтение ничего не выделяется.
+    При переполнении новые данные отбрасываются, потери считаются в байтах.
+    Для каждой записанной порции хранится время приема (time.monotonic_ns()) ее первого байта.
+    Рассчитан на одного читателя; писать могут несколько потоков.
+    """
+
+    def __init__(self, size: int = 1024 * 1024, on_overrun=None, name: str = ""):
+        """
+        Инициализация объекта RingBuffer.
+        :param size: Размер буфера в байтах.
+        :param on_overrun: Callback, получающий количество отброшенных байт при переполнении.
+        :param name: Имя буфера для сообщений о потерях.
+        """
+        self._size = size
+        self.name = name
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        # Абсолютные позиции записи и чтения (растут монотонно)
+        self._write_pos = 0
+        self._read_pos = 0
+        # Длина участка, выданного read_region и еще не освобожденного
+        self._region_length = 0
+        # Позиция, до которой данные отброшены clear, пока участок был у читателя
+        self._discard_pos = 0
+        # Отметки приема (абсолютная позиция начала порции, time.monotonic_ns()) непрочитанных данных
+        self._marks = collections.deque()
+
+        # Синхронизация читателя и писателей
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+
+        # Память для вычитывания данных из порта при переполнении
+        self._discard_view = memoryview(bytearray(4096))
+        # Количество отброшенных при переполнении байт и случаев переполнения
+        self.overrun_bytes = 0
+        self.overrun_count = 0
+        self._reported_count = 0
+        self._on_overrun = on_overrun
+
+    @property
+    def buffer(self) -> bytearray:
+        """Память буфера, участки которой выдает read_region."""
+        return self._buffer
+
+    @property
+    def size(self) -> int:
+        """Размер буфера в байтах."""
+        return self._size
+
+    def qsize(self) -> int:
+        """Количество непрочитанных байт."""
+        with self._lock:
+            return self._write_pos - max(self._read_pos, self._discard_pos)
+
+    def empty(self) -> bool:
+        """Проверяет, есть ли непрочитанные данные."""
+        return not self.qsize()
+
+    def clear(self):
+        """
+        Отбрасывает все непрочитанные данные.
+        Участок, выданный читателю, остается занятым до release, чтобы запись не затерла его при разборе.
+        """
+        with self._lock:
+            if self._region_length:
+                self._discard_pos = self._write_pos
+            else:
+                self._read_pos = self._write_pos
+            self._marks.clear()
+            self._not_full.notify_all()
+
+    def write_from(self, read_into) -> int:
+        """
+        Читает данные источника прямо в свободную непрерывную часть буфера.
+        Если буфер заполнен, данные все равно вычитываются из источника и отбрасываются.
+        :param read_into: Функция, заполняющая переданный memoryview и возвращающая число прочитанных байт.
+        :return: Количество байт, записанных в буфер.
+        """
+        with self._write_lock:
+            with self._lock:
+                free = self._size - (self._write_pos - self._read_pos)
+                start = self._write_pos % self._size
+            if not free:
+                discarded = read_into(self._discard_view) or 0
+                if discarded:
+                    self._report_overrun(discarded)
+                return 0
+            # Читатель не трогает свободную часть буфера, поэтому читаем в нее без блокировки
+            length = min(free, self._size - start)
+            written = read_into(self._view[start:start + length]) or 0
+            if written:
+                rx_ns = time.monotonic_ns()
+                with self._lock:
+                    self._marks.append((self._write_pos, rx_ns))
+                    self._write_pos += written
+                    self._not_empty.notify()
+            return written
+
+    def put(self, data, block: bool = True, timeout: float = None):
+        """
+        Копирует данные в буфер (совместимо с queue.Queue.put).
+        :param data: Данные для записи или кортеж (время приема time.monotonic_ns(), данные).
+        :param block: Ждать освобождения места, иначе не поместившаяся часть отбрасывается.
+        :param timeout: Время ожидания места в секундах.
+        """
+        if isinstance(data, tuple):
+            rx_ns, data = data
+        else:
+            rx_ns = time.monotonic_ns()
+        with self._write_lock:
+            with memoryview(data) as view:
+                offset = 0
+                while offset < len(view):
+                    with self._not_full:
+                        if block:
+                            self._not_full.wait_for(lambda: self._write_pos - self._read_pos < self._size, timeout)
+                        free = self._size - (self._write_pos - self._read_pos)
+                        start = self._write_pos % self._size
+                    if not free:
+                        self._report_overrun(len(view) - offset)
+                        return
+                    length = min(free, self._size - start, len(view) - offset)
+                    self._view[start:start + length] = view[offset:offset + length]
+                    with self._lock:
+                        # Продолжение порции после перехода через конец буфера отметки не требует
+                        if not offset:
+                            self._marks.append((self._write_pos, rx_ns))
+                        self._write_pos += length
+                        self._not_empty.notify()
+                    offset += length
+
+    def read_region(self, timeout: float = None) -> tuple:
+        """
+        Ожидает данные и возвращает границы непрерывного непрочитанного участка буфера.
+        Участок остается занятым, пока не будет вызван release.
+        :param timeout: Время ожидания данных в секундах.
+        :return: Кортеж (начало, конец, отметки приема) участка в buffer. Отметки - список
+                 (позиция в buffer, time.monotonic_ns()), первая относится к началу участка.
+        :raises queue.Empty: Если за время ожидания данные не поступили.
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._write_pos > self._read_pos, timeout):
+                raise queue.Empty
+            read_pos = self._read_pos
+            start = read_pos % self._size
+            length = min(self._write_pos - read_pos, self._size - start)
+            self._region_length = length
+            marks = []
+            for mark_pos, rx_ns in self._marks:
+                if mark_pos >= read_pos + length:
+                    break
+                if mark_pos <= read_pos:
+                    # Порция началась до участка: ее время относится к началу участка
+                    marks = [(start, rx_ns)]
+                else:
+                    marks.append((start + mark_pos - read_pos, rx_ns))
+        return start, start + length, marks
+
+    def release(self, length: int):
+        """
+        Освобождает прочитанные байты для записи.
+        Если после выдачи участка буфер был очищен, освобождаются и отброшенные данные.
+        """
+        with self._lock:
+            # Освобождается не больше выданного участка, иначе чтение обгонит запись
+            self._read_pos = max(self._read_pos + min(length, self._region_length), self._discard_pos)
+            self._region_length = 0
+            # Отметки полностью прочитанных порций больше не нужны
+            marks = self._marks
+            while len(marks) > 1 and marks[1][0] <= self._read_pos:
+                marks.popleft()
+            self._not_full.notify_all()
+
+    def get(self, block: bool = True, timeout: float = None) -> tuple:
+        """
+        Возвращает копию непрерывного участка непрочитанных данных (совместимо с queue.Queue.get).
+        :return: Кортеж (время приема первого байта, данные).
+        :raises queue.Empty: Если данных нет.
+        """
+        start, end, marks = self.read_region(timeout if block else 0)
+        data = bytes(self._view[start:end])
+        self.release(end - start)
+        return marks[0][1] if marks else time.monotonic_ns(), data
+
+    def get_nowait(self) -> tuple:
+        """Возвращает данные без ожидания (совместимо с queue.Queue.get_nowait)."""
+        return self.get(block=False)
+
+    def get_stats(self) -> dict:
+        """Возвращает заполнение буфера и счетчики потерь (в тех же ключах, что BoundedQueue)."""
+        with self._lock:
+            unread = self._write_pos - max(self._read_pos, self._discard_pos)
+            return {
+                # Отметка последней порции хранится и после ее прочтения
+                "items": len(self._marks) if unread else 0,
+                "bytes": unread,
+                "dropped_frames": self.overrun_count,
+                "dropped_bytes": self.overrun_bytes,
+            }
+
+    def loss_text(self) -> str:
+        """Строка с потерями буфера для окна сообщений и лог-файла."""
+        return f"Переполнение кольцевого буфера {self.name}: {self.overrun_count} раз, {self.overrun_bytes} байт"
+
+    def new_loss_text(self) -> str:
+        """Возвращает строку потерь, если с прошлого вызова были новые потери, иначе пустую строку."""
+        overrun_count = self.overrun_count
+        if overrun_count == self._reported_count:
+            return ""
+        self._reported_count = overrun_count
+        return self.loss_text()
+
+    def _report_overrun(self, length: int):
+        """Учитывает отброшенные при переполнении байты."""
+        self.overrun_bytes += length
+        self.overrun_count += 1
+        if self._on_overrun:
+            self._on_overrun(length)
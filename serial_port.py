@@ -1,20 +1,34 @@
+import os
 import queue
+import select
 import threading
+import time
 import serial
 import serial.tools.list_ports
 
+from ring_buffer import RingBuffer
+
 class SerialPort:
     """
     Класс для работы с COM-портами.
     Отвечает за открытие, закрытие, чтение данных и управление последовательным портом.
     """
 
-    def __init__(self, data_queue: queue.Queue, on_error=None):
-        """Инициализация объекта SerialPort."""
+    def __init__(self, data_queue, on_error=None, transport_core=None):
+        """
+        Инициализация объекта SerialPort.
+        :param data_queue: Очередь для данных (queue.Queue) или кольцевой буфер (RingBuffer),
+                           в который данные читаются без промежуточных объектов.
+        :param on_error: Callback для обработки ошибок.
+        :param transport_core: Общий цикл событий (TransportCore). Если задан, порт читается
+                               в нем вместо отдельного потока.
+        """
         self._data_queue = data_queue  # Очередь для данных
         self._serial_thread = None  # Поток для чтения данных
         self._close_event = threading.Event()  # Событие для остановки потока
         self._on_error = on_error  # Callback для обработки ошибок
+        self._transport_core = transport_core  # Общий цикл событий
+        self._channel = None  # Канал чтения в цикле событий
 
         # Объект последовательного порта
         self._ser = None
@@ -49,8 +63,15 @@ class SerialPort:
                 stopbits=stopbits,
                 timeout=timeout,
             )
-            # Запускаем поток для чтения данных
-            self._start_reading_thread()
+            if self._transport_core:
+                # Порт читается общим циклом событий по готовности данных
+                # Кольцевой буфер заполняется прямо из дескриптора порта, без промежуточных bytes
+                ring = self._data_queue if isinstance(self._data_queue, RingBuffer) else None
+                self._channel = self._transport_core.open_serial(self._ser, self._on_channel_data,
+                                                                 self._on_channel_error, ring)
+            else:
+                # Запускаем поток для чтения данных
+                self._start_reading_thread()
         except serial.SerialException as e:
             self._handle_error(f"Ошибка открытия порта: {e}")
             raise
@@ -59,6 +80,9 @@ class SerialPort:
         """Закрывает последовательный порт и останавливает поток чтения."""
         # Сигнализируем о завершении чтения
         self._close_event.set()
+        if self._channel:
+            self._channel.close()
+            self._channel = None
 
         if self._serial_thread and self._serial_thread.is_alive():
             self._serial_thread.join(timeout=1.0)
@@ -81,10 +105,19 @@ class SerialPort:
         """
         return bool(self._ser and self._ser.is_open)
 
+    @property
+    def overrun_bytes(self) -> int:
+        """Количество байт, потерянных из-за переполнения кольцевого буфера."""
+        return getattr(self._data_queue, "overrun_bytes", 0)
+
     def _start_reading_thread(self):
         """Запускает поток для чтения данных из последовательного порта."""
         self._close_event.clear()
-        self._serial_thread = threading.Thread(target=self._read_serial, daemon=True)
+        if isinstance(self._data_queue, RingBuffer):
+            target = self._read_serial_ring
+        else:
+            target = self._read_serial
+        self._serial_thread = threading.Thread(target=target, daemon=True)
         self._serial_thread.start()
 
     def _read_serial(self):
@@ -96,7 +129,7 @@ class SerialPort:
                     data = self._ser.read(self._ser.in_waiting or 1)
                     if data:
                         try:
-                            self._data_queue.put(data, timeout=0.1)
+                            self._data_queue.put((time.monotonic_ns(), data), timeout=0.1)
                         except queue.Full:
                             self._handle_error("Очередь данных переполнена. Данные потеряны.")
             except serial.SerialException as e:
@@ -108,6 +141,60 @@ class SerialPort:
                 self.close_port()
                 break
 
+    def _read_serial_ring(self):
+        """Читает данные из последовательного порта прямо в память кольцевого буфера."""
+        ring = self._data_queue
+        fd = getattr(self._ser, "fd", None)
+        # На POSIX читаем дескриптор порта напрямую, иначе через readinto pyserial
+        read_into = self._read_fd_into if fd is not None and hasattr(os, "readv") else self._read_waiting_into
+        while not self._close_event.is_set():
+            try:
+                if self._ser and self._ser.is_open:
+                    ring.write_from(read_into)
+            except (serial.SerialException, OSError) as e:
+                self._handle_error(f"Ошибка чтения данных: {e}")
+                self.close_port()
+                break
+            except Exception as e:
+                self._handle_error(f"Неизвестная ошибка: {e}")
+                self.close_port()
+                break
+
+    def _read_fd_into(self, view) -> int:
+        """
+        Ожидает данные на дескрипторе порта не дольше таймаута порта и читает их в view.
+        :raises serial.SerialException: Если дескриптор готов, но данных нет (устройство отключено).
+        """
+        fd = self._ser.fd
+        ready, _, _ = select.select([fd], [], [], self._ser.timeout)
+        if not ready:
+            return 0
+        length = os.readv(fd, [view])
+        if not length:
+            raise serial.SerialException("Устройство отключено или порт закрыт")
+        return length
+
+    def _read_waiting_into(self, view) -> int:
+        """Читает в view уже принятые портом данные, но не меньше одного байта (pyserial readinto)."""
+        with view[:max(min(self._ser.in_waiting, len(view)), 1)] as part:
+            return self._ser.readinto(part)
+
+    def _on_channel_data(self, data: bytes):
+        """Передает данные из цикла событий в очередь, не блокируя цикл."""
+        try:
+            self._data_queue.put((time.monotonic_ns(), data), block=False)
+        except queue.Full:
+            self._handle_error("Очередь данных переполнена. Данные потеряны.")
+
+    def _on_channel_error(self, message: str):
+        """Обрабатывает ошибку чтения в цикле событий и закрывает порт."""
+        self._handle_error(message)
+        try:
+            self.close_port()
+        except Exception as e:
+            # Исключение не должно уходить в цикл событий, он общий для всех источников
+            self._handle_error(f"Ошибка закрытия порта: {e}")
+
     def _handle_error(self, message: str):
         """Обрабатывает ошибку, вызывая callback или выводя сообщение в консоль."""
         if self._on_error:
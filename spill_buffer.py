@@ -0,0 +1,164 @@
+import mmap
+import pickle
+import struct
+import tempfile
+import time
+
+
+class SpillBuffer:
+    """
+    Очередь элементов во временном файле на диске.
+    Элементы дописываются в конец файла, а читаются по порядку через отображение файла в память,
+    без повторного открытия и позиционирования. Когда все элементы прочитаны, файл обрезается.
+    Байтовые данные и порции с отметкой приема (time.monotonic_ns(), данные) пишутся как есть,
+    остальные элементы - через pickle.
+    Ведет метрики глубины сброса и отставания обработки.
+    """
+
+    # Заголовок записи: тип, длина данных, время записи (monotonic_ns), размер элемента для учета
+    # и отметка приема порции
+    HEADER = struct.Struct("<BIQIQ")
+    # Типы записей
+    KIND_BYTES = 0
+    KIND_PICKLE = 1
+    KIND_STAMPED = 2
+
+    def __init__(self, spill_dir: str = None):
+        """
+        Инициализация объекта SpillBuffer.
+        :param spill_dir: Директория временного файла, по умолчанию системная.
+        """
+        self._spill_dir = spill_dir
+        self._file = None
+        self._map = None
+        # Позиции чтения и записи в файле
+        self._read_pos = 0
+        self._write_pos = 0
+
+        # Глубина сброса: элементы и их размер, ожидающие чтения с диска
+        self.depth_items = 0
+        self.depth_bytes = 0
+        self.max_depth_bytes = 0
+        # Количество эпизодов сброса и длительность последнего догона в секундах
+        self.episodes = 0
+        self.last_catch_up = 0.0
+        self._episode_start_ns = 0
+        # Отставание обработки: время ожидания на диске последнего прочитанного элемента и максимум, в секундах
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self) -> int:
+        return self.depth_items
+
+    def append(self, item, size: int):
+        """
+        Дописывает элемент в конец файла.
+        :param item: Элемент очереди.
+        :param size: Размер элемента для учета глубины сброса.
+        """
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="cum_port_spill_", dir=self._spill_dir)
+        if not self.depth_items:
+            # Начало эпизода сброса
+            self.episodes += 1
+            self._episode_start_ns = time.monotonic_ns()
+        rx_ns = 0
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            kind, payload = self.KIND_BYTES, item
+        elif (isinstance(item, tuple) and len(item) == 2 and isinstance(item[0], int)
+              and isinstance(item[1], (bytes, bytearray, memoryview))):
+            kind, (rx_ns, payload) = self.KIND_STAMPED, item
+        else:
+            kind, payload = self.KIND_PICKLE, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        length = len(payload)
+        self._file.write(self.HEADER.pack(kind, length, time.monotonic_ns(), size, rx_ns))
+        self._file.write(payload)
+        self._write_pos += self.HEADER.size + length
+        self.depth_items += 1
+        self.depth_bytes += size
+        if self.depth_bytes > self.max_depth_bytes:
+            self.max_depth_bytes = self.depth_bytes
+
+    def pop(self):
+        """
+        Читает самый старый элемент.
+        :raises IndexError: Если на диске нет элементов.
+        """
+        if not self.depth_items:
+            raise IndexError("pop from empty SpillBuffer")
+        record_end = self._read_pos + self.HEADER.size
+        if self._map is None or len(self._map) < record_end:
+            self._remap()
+        kind, length, written_ns, size, rx_ns = self.HEADER.unpack_from(self._map, self._read_pos)
+        start = record_end
+        end = start + length
+        if len(self._map) < end:
+            self._remap()
+        payload = self._map[start:end]
+        self._read_pos = end
+        self.depth_items -= 1
+        self.depth_bytes -= size
+
+        now = time.monotonic_ns()
+        self.lag = (now - written_ns) / 1e9
+        if self.lag > self.max_lag:
+            self.max_lag = self.lag
+        if not self.depth_items:
+            # Обработка догнала поток
+            self.last_catch_up = (now - self._episode_start_ns) / 1e9
+            self.clear()
+        if kind == self.KIND_BYTES:
+            return payload
+        if kind == self.KIND_STAMPED:
+            return rx_ns, payload
+        return pickle.loads(payload)
+
+    def clear(self):
+        """Удаляет все элементы и обрезает файл."""
+        self.depth_items = 0
+        self.depth_bytes = 0
+        self._read_pos = 0
+        self._write_pos = 0
+        # Файл нельзя обрезать, пока он отображен в память (Windows)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+
+    def close(self):
+        """Закрывает и удаляет временный файл."""
+        self.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def oldest_age(self) -> float:
+        """Время ожидания на диске самого старого непрочитанного элемента в секундах."""
+        if not self.depth_items:
+            return 0.0
+        if self._map is None or len(self._map) < self._read_pos + self.HEADER.size:
+            self._remap()
+        written_ns = self.HEADER.unpack_from(self._map, self._read_pos)[2]
+        return (time.monotonic_ns() - written_ns) / 1e9
+
+    def get_stats(self) -> dict:
+        """Возвращает метрики сброса на диск."""
+        return {
+            "depth_items": self.depth_items,
+            "depth_bytes": self.depth_bytes,
+            "max_depth_bytes": self.max_depth_bytes,
+            "file_bytes": self._write_pos,
+            "episodes": self.episodes,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "last_catch_up": self.last_catch_up,
+        }
+
+    def _remap(self):
+        """Отображает в память все записанное в файл на текущий момент."""
+        self._file.flush()
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
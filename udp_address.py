@@ -0,0 +1,16 @@
+import argparse
+
+
+def parse_address(value: str) -> tuple:
+    """
+    Разбирает адрес UDP вида ip:port (тип аргумента командной строки).
+    :return: Кортеж (ip, порт).
+    :raises argparse.ArgumentTypeError: Если адрес или порт некорректны.
+    """
+    ip, _, port = value.rpartition(":")
+    if not ip:
+        raise argparse.ArgumentTypeError(f"Ожидается адрес вида ip:port: {value}")
+    try:
+        return ip, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Некорректный порт: {value}")
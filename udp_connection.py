@@ -1,24 +1,56 @@
 import selectors
 import socket
+import sys
 import threading
+import time
 import queue
 
+from ring_buffer import RingBuffer
+
+# Опция сокета со счетчиком отброшенных ядром датаграмм (есть только в Linux, в модуле socket не объявлена)
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40 if sys.platform.startswith("linux") else None)
+# Код ошибки Windows при получении датаграммы больше буфера
+WSAEMSGSIZE = 10040
+
 class UDPConnection:
     """Класс для работы с UDP соединением."""
 
-    def __init__(self, data_queue: queue.Queue, on_error=None):
-        """Инициализация объекта UDPConnection."""
+    def __init__(self, data_queue: queue.Queue, on_error=None, transport_core=None):
+        """
+        Инициализация объекта UDPConnection.
+        :param data_queue: Очередь для данных.
+        :param on_error: Callback для обработки ошибок.
+        :param transport_core: Общий цикл событий (TransportCore). Если задан, сокет читается
+                               в нем вместо отдельного потока.
+        """
         self._data_queue = data_queue  # Очередь для данных
         self._udp_thread = None  # Поток для чтения данных
         self._close_event = threading.Event()  # Событие для остановки потока
         self._on_error = on_error  # Callback для обработки ошибок
+        self._transport_core = transport_core  # Общий цикл событий
+        self._channel = None  # Канал приема в цикле событий
 
         # UDP сокет
         self._sock = None
         self._ip = None
         self._port = None
-        #
-        self.buffer_size = 1024
+        # Максимальный размер принимаемой датаграммы, больше этого размера датаграммы обрезаются
+        self.buffer_size = 65536
+        # Запрашиваемый размер приемного буфера сокета в ядре
+        self.rcvbuf_size = 4 * 1024 * 1024
+        # Размер буфера порции: принятые за одно пробуждение датаграммы уходят в очередь одной порцией
+        self.batch_size = 256 * 1024
+        # Максимальное количество датаграмм, вычитываемых за одно пробуждение
+        self.max_drain_datagrams = 1024
+
+        # Заранее выделенная память для приема датаграмм, выделяется при открытии соединения
+        self._batch_view = None
+        # Счетчик отброшенных ядром датаграмм передается в служебных данных, если ОС это поддерживает
+        self._ancbufsize = socket.CMSG_SPACE(4) if hasattr(socket, "CMSG_SPACE") else 0
+        self._use_recvmsg = hasattr(socket.socket, "recvmsg_into")
+
+        # Статистика приема
+        self.reset_stats()
 
     def open_connection(self, ip: str, port: int):
         """
@@ -32,6 +64,7 @@ class UDPConnection:
         try:
             # Создаем UDP сокет
             self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._setup_socket()
             self._sock.bind((ip, port))
             self._ip = ip
             self._port = port
@@ -39,8 +72,13 @@ class UDPConnection:
             # Устанавливаем неблокирующий режим
             self._sock.setblocking(False)
 
-            # Запускаем поток для чтения данных
-            self._start_reading_thread()
+            if self._transport_core:
+                # Сокет читается общим циклом событий по готовности данных
+                self._channel = self._transport_core.open_udp(self._sock, self._on_channel_data,
+                                                              self._handle_error)
+            else:
+                # Запускаем поток для чтения данных
+                self._start_reading_thread()
         except Exception as e:
             self._handle_error(f"Ошибка открытия UDP соединения: {e}")
             raise
@@ -48,6 +86,9 @@ class UDPConnection:
     def close_connection(self):
         """Закрывает UDP соединение и останавливает поток чтения."""
         self._close_event.set()  # Сигнализируем потоку о завершении
+        if self._channel:
+            self._channel.close()  # Канал цикла событий закрывается сразу
+            self._channel = None
 
         if self._udp_thread and self._udp_thread.is_alive():
             self._udp_thread.join(timeout=1.0)  # Ждем завершения потока
@@ -70,6 +111,49 @@ class UDPConnection:
         """
         return bool(self._sock is not None)
 
+    def reset_stats(self):
+        """Сбрасывает статистику приема."""
+        self.wakeups = 0
+        self.datagrams = 0
+        self.received_bytes = 0
+        self.max_drained = 0
+        self.truncated = 0
+        self.kernel_drops = 0
+        self.rcvbuf_actual = 0
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику приема за время открытия соединения."""
+        wakeups = self.wakeups
+        return {
+            "wakeups": wakeups,
+            "datagrams": self.datagrams,
+            "bytes": self.received_bytes,
+            "max_drained": self.max_drained,
+            "avg_drained": self.datagrams / wakeups if wakeups else 0.0,
+            "truncated": self.truncated,
+            "kernel_drops": self.kernel_drops,
+            "rcvbuf": self.rcvbuf_actual,
+        }
+
+    def _setup_socket(self):
+        """Настраивает приемный буфер сокета и учет отброшенных ядром датаграмм."""
+        self.reset_stats()
+        # Последняя датаграмма порции может начаться в самом конце буфера порции
+        batch_len = self.batch_size + self.buffer_size
+        if self._batch_view is None or len(self._batch_view) != batch_len:
+            self._batch_view = memoryview(bytearray(batch_len))
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf_size)
+        except OSError as e:
+            self._handle_error(f"Не удалось задать размер приемного буфера UDP: {e}")
+        # Ядро может ограничить размер буфера (в Linux net.core.rmem_max), запоминаем фактический
+        self.rcvbuf_actual = self._sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if SO_RXQ_OVFL is not None and self._use_recvmsg:
+            try:
+                self._sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            except OSError:
+                pass
+
     def _start_reading_thread(self):
         """Запускает поток для чтения данных из UDP сокета."""
         self._close_event.clear()
@@ -86,13 +170,8 @@ class UDPConnection:
                 if self._sock is None or not self.is_open():  # Проверка состояния сокета
                     break
                 events = selector.select(timeout=0.1)  # Ожидание данных с таймаутом
-                for key, _ in events:
-                    data, addr = key.fileobj.recvfrom(self.buffer_size)
-                    if data:
-                        try:
-                            self._data_queue.put(data, timeout=0.1)
-                        except queue.Full:
-                            self._handle_error("Очередь данных переполнена. Данные потеряны.")
+                if events:
+                    self._drain_socket()
             except BlockingIOError:
                     # Нет доступных данных, продолжаем цикл
                 continue
@@ -101,6 +180,89 @@ class UDPConnection:
                 self.close_connection()
                 break
 
+    def _drain_socket(self):
+        """
+        Вычитывает все ожидающие датаграммы в заранее выделенный буфер порции
+        и отправляет их в очередь одной порцией.
+        """
+        sock = self._sock
+        view = self._batch_view
+        buffer_size = self.buffer_size
+        batch_size = self.batch_size
+        pos = 0
+        drained = 0
+        # Время приема порции: момент пробуждения, после отправки части порции - момент ее отправки
+        rx_ns = time.monotonic_ns()
+        try:
+            while drained < self.max_drain_datagrams:
+                # Порция заполнена, отдаем ее и продолжаем прием с начала буфера
+                if pos > batch_size:
+                    self._put_batch(pos, rx_ns)
+                    pos = 0
+                    rx_ns = time.monotonic_ns()
+                pos += self._recv_datagram(sock, view[pos:pos + buffer_size])
+                drained += 1
+        except BlockingIOError:
+            # Датаграмм в сокете больше нет
+            pass
+        finally:
+            if pos:
+                self._put_batch(pos, rx_ns)
+            if drained:
+                self.wakeups += 1
+                self.datagrams += drained
+                if drained > self.max_drained:
+                    self.max_drained = drained
+
+    def _recv_datagram(self, sock, view) -> int:
+        """
+        Принимает одну датаграмму в view и учитывает обрезанные и отброшенные ядром датаграммы.
+        :return: Количество принятых байт.
+        :raises BlockingIOError: Если датаграмм в сокете нет.
+        """
+        if self._use_recvmsg:
+            length, ancdata, flags, _ = sock.recvmsg_into([view], self._ancbufsize)
+            if flags & socket.MSG_TRUNC:
+                self.truncated += 1
+            for level, cmsg_type, cmsg_data in ancdata:
+                # Ядро передает общее количество отброшенных датаграмм с момента открытия сокета
+                if level == socket.SOL_SOCKET and cmsg_type == SO_RXQ_OVFL and len(cmsg_data) >= 4:
+                    self.kernel_drops = int.from_bytes(cmsg_data[:4], sys.byteorder)
+            return length
+        try:
+            return sock.recv_into(view)
+        except OSError as e:
+            # В Windows датаграмма больше буфера приходит с ошибкой, буфер заполнен началом датаграммы
+            if getattr(e, "winerror", None) == WSAEMSGSIZE:
+                self.truncated += 1
+                return len(view)
+            raise
+
+    def _put_batch(self, length: int, rx_ns: int):
+        """
+        Отправляет принятые датаграммы в очередь.
+        :param length: Количество принятых байт в буфере порции.
+        :param rx_ns: Время приема порции (time.monotonic_ns()).
+        """
+        self.received_bytes += length
+        try:
+            if isinstance(self._data_queue, RingBuffer):
+                # В кольцевой буфер данные копируются без промежуточного объекта
+                self._data_queue.put((rx_ns, self._batch_view[:length]), timeout=0.1)
+            else:
+                self._data_queue.put((rx_ns, self._batch_view[:length].tobytes()), timeout=0.1)
+        except queue.Full:
+            self._handle_error("Очередь данных переполнена. Данные потеряны.")
+
+    def _on_channel_data(self, data: bytes):
+        """Передает датаграмму из цикла событий в очередь, не блокируя цикл."""
+        self.datagrams += 1
+        self.received_bytes += len(data)
+        try:
+            self._data_queue.put((time.monotonic_ns(), data), block=False)
+        except queue.Full:
+            self._handle_error("Очередь данных переполнена. Данные потеряны.")
+
     def _handle_error(self, message: str):
         """Обрабатывает ошибку, вызывая callback или выводя сообщение в консоль."""
         if self._on_error: